@@ -7,6 +7,6 @@ setup(
     author="Sai Navaneet",
     author_email="sainavaneet7@gmail.com",
     packages=find_packages(),  # Assumes your code is in a 'mambavla' directory
-    python_requires=">=3.6",
+    python_requires=">=3.8",
     install_requires=[],
 )
\ No newline at end of file
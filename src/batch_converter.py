@@ -3,19 +3,106 @@
 
 import os
 import sys
+import argparse
 from pathlib import Path
 
 # Add the src directory to the Python path
 sys.path.append(str(Path(__file__).parent))
 
-from utils.batch_processor import process_all_hdf5_files
-from config import DATASET_DIR, OUTPUT_DIR
+from utils.batch_processor import process_all_hdf5_files, get_hdf5_files
+from utils.episode_plan import parse_split_specs
+from utils.memory_governor import parse_memory_size
+from utils.success_features import parse_discount
+from config import get_default_config
 
-def main():
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    """Build the command line parser, every option defaults to the value in config.py."""
+    parser = argparse.ArgumentParser(description="Convert LIBERO HDF5 datasets to the LeRobot format.")
+    parser.add_argument("--input-dir", help="Directory containing the LIBERO HDF5 files")
+    parser.add_argument("--output-dir", help="Directory to write the LeRobot dataset to")
+    parser.add_argument("--workers", type=int, help="Number of HDF5 files converted in parallel")
+    parser.add_argument("--chunks-size", type=int, help="Episodes per chunk directory")
+    parser.add_argument("--codec", dest="video_codec", help="OpenCV fourcc of the video codec, e.g. mp4v")
+    parser.add_argument("--crf", dest="video_crf", type=int, help="Encode videos with ffmpeg/libx264 at this CRF")
+    parser.add_argument("--camera", dest="camera_keys", action="append", metavar="KEY",
+                        help="Only convert this *_rgb or *_depth camera stream (repeatable), defaults to all")
+    parser.add_argument("--compression", dest="parquet_compression",
+                        choices=["snappy", "gzip", "zstd", "brotli", "lz4", "none"], help="Parquet compression codec")
+    parser.add_argument("--write-threads", type=int, help="Write-behind threads per worker, 0 writes synchronously")
+    parser.add_argument("--encoder-processes", type=int,
+                        help="Processes per worker encoding images and videos from shared memory, 0 encodes in the reader")
+    parser.add_argument("--memory-budget", dest="memory_budget_bytes", type=parse_memory_size, metavar="SIZE",
+                        help="RAM the conversion may use, e.g. 16G; sizes workers and in-flight episodes to fit")
+    parser.add_argument("--tmp-dir", dest="local_tmp_dir", help="Local scratch directory for video encoding")
+    parser.add_argument("--dedup", dest="blob_store", action="store_true", default=None,
+                        help="Store output files once in <output>/.blobs and relink unchanged episodes")
+    parser.add_argument("--cache-dir", dest="episode_cache_dir",
+                        help="Local directory evicted episodes are spilled to as .npy files")
+    parser.add_argument("--cache-dir-size", dest="episode_cache_dir_bytes", type=parse_memory_size, metavar="SIZE",
+                        help="Spilled episodes kept per worker, e.g. 8G; the oldest are deleted first")
+    parser.add_argument("--images", dest="enable_image_saving", action="store_true", default=None,
+                        help="Save a PNG for every frame")
+    parser.add_argument("--no-images", dest="enable_image_saving", action="store_false",
+                        help="Do not save PNG frames")
+    parser.add_argument("--videos", dest="enable_video_creation", action="store_true", default=None,
+                        help="Encode an MP4 per camera and episode")
+    parser.add_argument("--no-videos", dest="enable_video_creation", action="store_false",
+                        help="Do not encode videos")
+    parser.add_argument("--max-retries", type=int, help="Retries of a failed episode before it is quarantined")
+    parser.add_argument("--retry-delay", type=float, metavar="SECONDS",
+                        help="Delay before the first retry, doubled for every further retry")
+    parser.add_argument("--no-progress", dest="enable_progress_bars", action="store_false", default=None,
+                        help="Disable progress bars")
+    parser.add_argument("--include", dest="include_tasks", action="append", metavar="GLOB",
+                        help="Only convert tasks whose name matches this glob (repeatable)")
+    parser.add_argument("--exclude", dest="exclude_tasks", action="append", metavar="GLOB",
+                        help="Skip tasks whose name matches this glob (repeatable)")
+    parser.add_argument("--demos", dest="demo_range", metavar="START:END",
+                        help="Only convert demos with a number in this half-open range, e.g. 0:5")
+    parser.add_argument("--max-episodes-per-task", type=int, help="Convert at most this many episodes per task")
+    parser.add_argument("--max-frames", dest="max_total_frames", type=int,
+                        help="Stop adding episodes once this many frames are selected")
+    parser.add_argument("--split", dest="splits", action="append", metavar="NAME=VALUE",
+                        help="Add a split with a ratio (e.g. val=0.1) or episodes per task (e.g. val=5), repeatable")
+    parser.add_argument("--split-seed", type=int, help="Seed of the stratified split shuffle")
+    parser.add_argument("--state", dest="state_keys", action="append", metavar="KEY",
+                        help="Observation key concatenated into observation.state, in order (repeatable)")
+    parser.add_argument("--state-column", dest="state_columns", action="append", metavar="KEY",
+                        help="Observation key also written as its own observation.<KEY> column (repeatable)")
+    parser.add_argument("--derive", dest="derived_features", action="append", metavar="FEATURE",
+                        choices=["delta_action", "state_velocity", "action_chunk", "normalized"],
+                        help="Derived feature written as extra parquet columns (repeatable)")
+    parser.add_argument("--chunk-horizon", dest="action_chunk_horizon", type=int,
+                        help="Future actions per action.chunk row")
+    parser.add_argument("--success-features", action="store_true", default=None,
+                        help="Write success, steps-to-success and discounted return columns")
+    parser.add_argument("--discount", dest="return_discount", type=parse_discount,
+                        help="Discount of the discounted returns, between 0 and 1")
+    parser.add_argument("--previews", action="store_true", default=None,
+                        help="Write a mosaic preview per episode and previews/index.html")
+    parser.add_argument("--preview-gif", action="store_true", default=None,
+                        help="Also write an animated GIF preview per episode")
+    return parser
+
+
+def parse_config(argv=None) -> dict:
+    """Build the runtime configuration from config.py defaults and command line overrides."""
+    args = build_arg_parser().parse_args(argv)
+    config = get_default_config()
+    config.update({key: value for key, value in vars(args).items() if value is not None})
+    if args.splits is not None:
+        config["splits"] = parse_split_specs(args.splits)
+    return config
+
+
+def main(argv=None):
     """Main function to run the batch conversion process."""
+    config = parse_config(argv)
+    
     # Define paths
-    input_dir = DATASET_DIR
-    output_dir = OUTPUT_DIR
+    input_dir = config["input_dir"]
+    output_dir = config["output_dir"]
     
     # Check if input directory exists
     if not os.path.exists(input_dir):
@@ -23,48 +110,50 @@ def main():
         return
     
     # Check if there are HDF5 files in the input directory
-    hdf5_files = [f for f in os.listdir(input_dir) if f.endswith('.hdf5')]
+    hdf5_files = get_hdf5_files(input_dir, config["include_tasks"], config["exclude_tasks"])
     if not hdf5_files:
         print(f"Error: No HDF5 files found in {input_dir}")
         return
     
     # print(f"Found {len(hdf5_files)} HDF5 files to process:")
-    for i, file_name in enumerate(hdf5_files):
-        print(f"  {i+1}. {file_name}")
+    for i, file_path in enumerate(hdf5_files):
+        print(f"  {i+1}. {os.path.basename(file_path)}")
     
     # Process all HDF5 files with progress bars
     try:
-        chunks_metadata = process_all_hdf5_files(input_dir, output_dir)
+        files_metadata = process_all_hdf5_files(input_dir, output_dir, config=config)
         
-        if chunks_metadata:
+        if files_metadata:
             print("\n" + "="*60)
             print("BATCH CONVERSION COMPLETED SUCCESSFULLY!")
             print("="*60)
             
             # Print summary statistics
-            total_episodes = sum(chunk["episodes_count"] for chunk in chunks_metadata)
-            total_frames = sum(chunk["total_frames"] for chunk in chunks_metadata)
+            total_episodes = sum(file_metadata["episodes_count"] for file_metadata in files_metadata)
+            total_frames = sum(file_metadata["total_frames"] for file_metadata in files_metadata)
+            chunk_names = sorted({chunk_name for file_metadata in files_metadata for chunk_name in file_metadata["chunk_names"]})
             
             print(f"\nSummary:")
-            print(f"  Total chunks created: {len(chunks_metadata)}")
+            print(f"  Total files converted: {len(files_metadata)}")
+            print(f"  Total chunks created: {len(chunk_names)}")
             print(f"  Total episodes: {total_episodes}")
             print(f"  Total frames: {total_frames}")
             print(f"  Output directory: {output_dir}")
             
-            print(f"\nChunk details:")
-            for chunk in chunks_metadata:
-                print(f"  {chunk['chunk_name']}: {chunk['task_name']} ({chunk['episodes_count']} episodes)")
+            print(f"\nFile details:")
+            for file_metadata in files_metadata:
+                print(f"  {file_metadata['hdf5_file']}: {file_metadata['task_name']} ({file_metadata['episodes_count']} episodes)")
             
             # Show directory structure
             print(f"\nDirectory structure created:")
-            for chunk in chunks_metadata:
-                chunk_dir = os.path.join(output_dir, "data", chunk["chunk_name"])
+            for chunk_name in chunk_names:
+                chunk_dir = os.path.join(output_dir, "data", chunk_name)
                 if os.path.exists(chunk_dir):
                     parquet_files = [f for f in os.listdir(chunk_dir) if f.endswith('.parquet')]
-                    print(f"  {chunk['chunk_name']}: {len(parquet_files)} parquet files")
+                    print(f"  {chunk_name}: {len(parquet_files)} parquet files")
             
         else:
-            print("❌ No chunks were successfully processed.")
+            print("❌ No files were successfully processed.")
             
     except Exception as e:
         print(f"Error during batch conversion: {str(e)}")
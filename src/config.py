@@ -13,25 +13,171 @@ SLEEP_TIME = 0.001           # Sleep time between operations
 VIDEO_FPS = 20.0             # Video frame rate
 VIDEO_CODEC = 'mp4v'         # Video codec
 VIDEO_PIX_FMT = 'yuv420p'    # Video pixel format
+VIDEO_CRF = None             # Constant rate factor (None = OpenCV encoder, requires ffmpeg when set)
 
+# Camera Streams
+CAMERA_KEYS = None           # obs/<key> streams to convert, None = every *_rgb and *_depth dataset
+DEPTH_SCALE = 1000.0         # Float depth is stored as uint16 depth * DEPTH_SCALE in lossless 16-bit FFV1 videos
 
+# Output Variants
+# Each variant is a dict with any of: name, output_dir, image_height, image_width,
+# video_codec, video_crf, save_images. Every demo is read once and written to all variants.
+# An empty list writes a single variant to OUTPUT_DIR.
+OUTPUT_VARIANTS = []
 
 
+
+
+# Chunking
+CHUNKS_SIZE = 1000           # Episodes per chunk, episode i is stored in chunk i // CHUNKS_SIZE
+
 # Processing Configuration
 BATCH_SIZE = 1               # Number of files to process simultaneously
 ENABLE_PROGRESS_BARS = True  # Enable/disable progress bars
 ENABLE_VIDEO_CREATION = True # Enable/disable video creation
 ENABLE_IMAGE_SAVING = True   # Enable/disable image saving
+PARQUET_COMPRESSION = 'snappy'  # Parquet codec: snappy, gzip, zstd, brotli, lz4 or none
+
+# Write-behind Output
+WRITE_THREADS = 4                           # Writer threads per worker (0 = write synchronously)
+MAX_INFLIGHT_WRITE_BYTES = 256 * 1024 * 1024  # Queued bytes before the converter waits for the writers
+LOCAL_TMP_DIR = None                        # Local scratch directory for video encoding (None = system temp)
+
+# Memory Budget
+# RAM the whole conversion may use, e.g. 16 * 1024 ** 3 (None = no limit). Workers, queued
+# writes, encoder ring slots and the episode cache are sized from the pre-scanned demo sizes to
+# fit, and fewer files are converted at once while the measured resident memory nears the budget
+MEMORY_BUDGET_BYTES = None
+
+# Encoder Processes
+ENCODER_PROCESSES = 0       # Processes per worker encoding images/videos from shared memory (0 = encode in the reader)
+ENCODER_RING_SLOTS = None   # Episodes of frames in shared memory at once (None = 2 per encoder process)
+
+# Deduplicating Output
+# Store every output file once in <output>/.blobs and hardlink it into place; episodes whose
+# source file and settings did not change since an earlier run are relinked without converting
+BLOB_STORE = False
+
+# Episode Cache
+EPISODE_CACHE_BYTES = None               # Extracted demos kept in memory per worker for retries (None = none, or one demo with a memory budget)
+EPISODE_CACHE_DIR = None                 # Local directory evicted demos are spilled to as .npy (None = drop them)
+EPISODE_CACHE_DIR_BYTES = 4 * 1024 ** 3  # Spilled demos kept per worker, oldest deleted first (None = no limit)
+
+# Subset Selection (None = no limit)
+DEMO_RANGE = None             # Half-open demo number range, e.g. "0:5" converts demo_0 to demo_4 of every file
+MAX_EPISODES_PER_TASK = None  # Maximum number of episodes converted per task
+MAX_TOTAL_FRAMES = None       # Stop adding episodes once this many frames are selected
+
+# Splits (None = a single train split)
+# Split name -> ratio (float) or episodes per task (int), e.g. {"train": 0.9, "val": 0.1}
+# or {"val": 5, "train": 1.0}. Ratios add up to 1, or to less without a "train" split, which then gets the rest.
+# Splits are stratified by task and written as contiguous episode ranges.
+SPLITS = None
+SPLIT_SEED = 0                # Seed of the per-task shuffle
+
+# Robot State
+# Observation keys (obs/<key>) concatenated, in order, into observation.state. The modality.json
+# state ranges follow this order. STATE_COLUMNS are also written as their own observation.<key> columns.
+STATE_KEYS = ["joint_states"]
+STATE_COLUMNS = []
+
+# Derived Features
+# Extra parquet columns computed once per episode: "delta_action" (action.delta), "state_velocity"
+# (observation.state.velocity), "action_chunk" (action.chunk of the next ACTION_CHUNK_HORIZON actions
+# and action.chunk_is_pad) and "normalized" (action.normalized and observation.state.normalized,
+# standardized with dataset stats from a low-dimensional pre-pass that are also written to stats.json)
+DERIVED_FEATURES = []
+ACTION_CHUNK_HORIZON = 16
+
+# Success Features
+# Write next.success, steps_to_success and discounted_return columns and a success_index per
+# episode in episodes.jsonl (null when the episode never succeeds), from the sparse rewards and dones
+SUCCESS_FEATURES = False
+RETURN_DISCOUNT = 0.99        # Discount of discounted_return
+
+# Episode Previews
+# A JPEG mosaic of strided frames per episode (one row per RGB camera) in previews/, plus
+# previews/index.html, for eyeballing a dataset without saving every frame as PNG
+PREVIEWS = False
+PREVIEW_FRAMES = 8            # Frames per camera row of the mosaic
+PREVIEW_TILE_SIZE = 96        # Height and width of a mosaic tile in pixels
+PREVIEW_GIF = False           # Also write an animated GIF of the episode
+PREVIEW_GIF_FPS = 4.0         # Frame rate of the GIF, frames are strided from the FPS source
+
+# HDF5 Export (export_hdf5.py)
+EXPORT_COMPRESSION = 'gzip'    # Filter of the exported datasets: gzip, lzf or none
+EXPORT_COMPRESSION_LEVEL = 4   # gzip level (0-9)
+
+# Source Rechunking (rechunk_hdf5.py)
+RECHUNK_COMPRESSION = 'lzf'          # Filter of the rewritten source datasets: gzip, lzf or none
+RECHUNK_COMPRESSION_LEVEL = 4        # gzip level (0-9)
+RECHUNK_PAGE_SIZE = 1024 * 1024      # File space page size for consolidated metadata (0 = no paging)
+
+# Dataset Merge (merge_datasets.py)
+MERGE_FILE_MODE = 'hardlink'  # How unchanged files reach the merged dataset: hardlink, copy or move
 
 # Data Schema Configuration
 TASK_DESCRIPTION_DEFAULT = 0  # Default task description index
 VALIDITY_DEFAULT = 1          # Default validity flag (1 = valid, 0 = invalid)
 
 # Error Handling
-MAX_RETRIES = 3              # Maximum retries for failed operations
-RETRY_DELAY = 1.0           # Delay between retries (seconds)
+MAX_RETRIES = 3              # Retries of a failed episode before it is quarantined
+RETRY_DELAY = 1.0           # Delay before the first retry (seconds), doubled for every further retry
 
 # This is COnfig file 
 
 DATASET_DIR = "/home/navaneet/libero-to-Lerobot/datasets/libero_object"
-OUTPUT_DIR = "/home/navaneet/libero-to-Lerobot/datasets/libero_object_lerobot_format5"
\ No newline at end of file
+OUTPUT_DIR = "/home/navaneet/libero-to-Lerobot/datasets/libero_object_lerobot_format5"
+
+
+def get_default_config():
+    """
+    Build the runtime configuration from the constants above.
+
+    The returned dict is passed through the conversion pipeline; batch_converter.py
+    overrides entries from the command line so settings do not require editing this file.
+    """
+    return {
+        "input_dir": DATASET_DIR,
+        "output_dir": OUTPUT_DIR,
+        "workers": BATCH_SIZE,
+        "chunks_size": CHUNKS_SIZE,
+        "video_codec": VIDEO_CODEC,
+        "video_crf": VIDEO_CRF,
+        "camera_keys": CAMERA_KEYS,
+        "enable_video_creation": ENABLE_VIDEO_CREATION,
+        "enable_image_saving": ENABLE_IMAGE_SAVING,
+        "enable_progress_bars": ENABLE_PROGRESS_BARS,
+        "parquet_compression": PARQUET_COMPRESSION,
+        "write_threads": WRITE_THREADS,
+        "max_inflight_write_bytes": MAX_INFLIGHT_WRITE_BYTES,
+        "local_tmp_dir": LOCAL_TMP_DIR,
+        "encoder_processes": ENCODER_PROCESSES,
+        "encoder_ring_slots": ENCODER_RING_SLOTS,
+        "memory_budget_bytes": MEMORY_BUDGET_BYTES,
+        "blob_store": BLOB_STORE,
+        "episode_cache_bytes": EPISODE_CACHE_BYTES,
+        "episode_cache_dir": EPISODE_CACHE_DIR,
+        "episode_cache_dir_bytes": EPISODE_CACHE_DIR_BYTES,
+        "include_tasks": [],
+        "exclude_tasks": [],
+        "demo_range": DEMO_RANGE,
+        "max_episodes_per_task": MAX_EPISODES_PER_TASK,
+        "max_total_frames": MAX_TOTAL_FRAMES,
+        "splits": SPLITS,
+        "split_seed": SPLIT_SEED,
+        "state_keys": STATE_KEYS,
+        "state_columns": STATE_COLUMNS,
+        "derived_features": DERIVED_FEATURES,
+        "action_chunk_horizon": ACTION_CHUNK_HORIZON,
+        "success_features": SUCCESS_FEATURES,
+        "return_discount": RETURN_DISCOUNT,
+        "previews": PREVIEWS,
+        "preview_frames": PREVIEW_FRAMES,
+        "preview_tile_size": PREVIEW_TILE_SIZE,
+        "preview_gif": PREVIEW_GIF,
+        "preview_gif_fps": PREVIEW_GIF_FPS,
+        "variants": OUTPUT_VARIANTS,
+        "max_retries": MAX_RETRIES,
+        "retry_delay": RETRY_DELAY,
+    }
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Export a converted LeRobot dataset back to LIBERO/robomimic HDF5 files.
+
+Reads meta/episodes.jsonl, the parquet files and the videos (or PNG frames) and writes one
+<task>_demo.hdf5 file per task with data/demo_N groups in the layout extract_demo_data reads.
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from utils.hdf5_export import export_to_hdf5
+from config import EXPORT_COMPRESSION, EXPORT_COMPRESSION_LEVEL
+
+
+def main(argv=None):
+    """Export the dataset and print a summary."""
+    parser = argparse.ArgumentParser(description="Export a LeRobot dataset to robomimic-style HDF5 files.")
+    parser.add_argument("dataset_dir", help="Root of the converted LeRobot dataset")
+    parser.add_argument("output_dir", help="Directory to write the HDF5 files to")
+    parser.add_argument("--compression", default=EXPORT_COMPRESSION, choices=["gzip", "lzf", "none"],
+                        help="Compression filter of the exported datasets")
+    parser.add_argument("--level", type=int, default=EXPORT_COMPRESSION_LEVEL, help="gzip compression level (0-9)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of task files exported in parallel")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(os.path.join(args.dataset_dir, "meta", "episodes.jsonl")):
+        print(f"Error: No meta/episodes.jsonl found in {args.dataset_dir}")
+        return 1
+
+    start_time = time.time()
+    results = export_to_hdf5(args.dataset_dir, args.output_dir,
+                             None if args.compression == "none" else args.compression, args.level, args.workers)
+    elapsed = time.time() - start_time
+
+    total_bytes = sum(result["total_bytes"] for result in results)
+    print(f"\nExported {sum(result['num_demos'] for result in results)} demos in {len(results)} files "
+          f"to {args.output_dir}")
+    print(f"  Frames: {sum(result['total_frames'] for result in results)}")
+    print(f"  Uncompressed size: {total_bytes / 1e6:.1f} MB ({total_bytes / 1e6 / max(elapsed, 1e-9):.1f} MB/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Dataset inventory for LIBERO HDF5 files.
+
+Reads only HDF5 metadata (shapes, dtypes, chunks, filters and attributes) and writes
+a JSON summary of demos, frames and bytes per camera without touching pixel data.
+"""
+
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from utils.batch_processor import get_hdf5_files
+from utils.inventory import build_inventory
+from config import DATASET_DIR
+
+
+def main(argv=None):
+    """Scan the input directory and print or save the inventory."""
+    parser = argparse.ArgumentParser(description="Summarize LIBERO HDF5 files from their metadata only.")
+    parser.add_argument("input_dir", nargs="?", default=DATASET_DIR, help="Directory containing HDF5 files")
+    parser.add_argument("--output", help="Write the JSON inventory to this file instead of stdout")
+    parser.add_argument("--workers", type=int, default=None, help="Number of scanning processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input_dir):
+        print(f"Error: Input directory not found at {args.input_dir}")
+        return 1
+
+    hdf5_files = get_hdf5_files(args.input_dir)
+    if not hdf5_files:
+        print(f"Error: No HDF5 files found in {args.input_dir}")
+        return 1
+
+    inventory = build_inventory(hdf5_files, args.workers)
+    inventory["input_dir"] = args.input_dir
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(inventory, f, indent=4)
+
+        print(f"Inventory of {args.input_dir}:")
+        print(f"  Files: {inventory['num_files']}")
+        print(f"  Demos: {inventory['total_demos']}")
+        print(f"  Frames: {inventory['total_frames']}")
+        print(f"  Uncompressed size: {inventory['total_bytes'] / 1e6:.1f} MB")
+        print(f"  Size on disk: {inventory['total_file_size'] / 1e6:.1f} MB")
+        for name, num_bytes in sorted(inventory["bytes_per_dataset"].items()):
+            print(f"    {name}: {num_bytes / 1e6:.1f} MB")
+        print(f"  Saved to: {args.output}")
+    else:
+        print(json.dumps(inventory, indent=4))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Merge independently converted LeRobot datasets (e.g. one per LIBERO suite) into one dataset.
+
+Episodes and tasks are renumbered, videos and PNG frames are hardlinked (or copied/moved)
+instead of re-encoded, and the metadata and stats are recomputed.
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from utils.dataset_merge import merge_datasets
+from config import MERGE_FILE_MODE
+
+
+def main(argv=None):
+    """Merge the datasets and print a summary."""
+    parser = argparse.ArgumentParser(description="Merge converted LeRobot datasets into one dataset.")
+    parser.add_argument("dataset_dirs", nargs="+", help="Roots of the converted datasets, in merge order")
+    parser.add_argument("--output-dir", required=True, help="Root of the merged dataset")
+    parser.add_argument("--file-mode", default=MERGE_FILE_MODE, choices=["hardlink", "copy", "move"],
+                        help="How videos, images and unchanged parquet files reach the merged dataset")
+    parser.add_argument("--chunks-size", type=int, help="Episodes per chunk, defaults to the first dataset's")
+    args = parser.parse_args(argv)
+
+    for dataset_dir in args.dataset_dirs:
+        if not os.path.exists(os.path.join(dataset_dir, "meta", "episodes.jsonl")):
+            print(f"Error: No meta/episodes.jsonl found in {dataset_dir}")
+            return 1
+
+    start_time = time.time()
+    try:
+        result = merge_datasets(args.dataset_dirs, args.output_dir, args.file_mode, args.chunks_size)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    elapsed = time.time() - start_time
+
+    print(f"\nMerged {len(args.dataset_dirs)} datasets into {args.output_dir} in {elapsed:.1f}s")
+    print(f"  Episodes: {result['total_episodes']}")
+    print(f"  Frames: {result['total_frames']}")
+    print(f"  Tasks: {result['total_tasks']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
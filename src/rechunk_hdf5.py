@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Rewrite LIBERO source HDF5 files for faster conversion reads.
+
+Every dataset is rewritten with frame-aligned chunks and the chosen compression filter, in a
+file with paged (consolidated) metadata. Files are processed in parallel and their read
+throughput is benchmarked before and after.
+"""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from utils.batch_processor import get_hdf5_files
+from utils.hdf5_rechunk import rechunk_hdf5_files
+from config import RECHUNK_COMPRESSION, RECHUNK_COMPRESSION_LEVEL, RECHUNK_PAGE_SIZE
+
+
+def main(argv=None):
+    """Rechunk the HDF5 files of the input directory and print the benchmark."""
+    parser = argparse.ArgumentParser(description="Rewrite LIBERO HDF5 files with frame-aligned chunks.")
+    parser.add_argument("input_dir", help="Directory containing the HDF5 files")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--output-dir", help="Write the rewritten files to this directory")
+    target.add_argument("--in-place", action="store_true", help="Replace the source files")
+    parser.add_argument("--include", dest="include_tasks", action="append", metavar="GLOB",
+                        help="Only rewrite tasks whose name matches this glob (repeatable)")
+    parser.add_argument("--exclude", dest="exclude_tasks", action="append", metavar="GLOB",
+                        help="Skip tasks whose name matches this glob (repeatable)")
+    parser.add_argument("--compression", default=RECHUNK_COMPRESSION, choices=["gzip", "lzf", "none"],
+                        help="Compression filter of the rewritten datasets")
+    parser.add_argument("--level", type=int, default=RECHUNK_COMPRESSION_LEVEL, help="gzip compression level (0-9)")
+    parser.add_argument("--page-size", type=int, default=RECHUNK_PAGE_SIZE,
+                        help="File space page size in bytes, 0 disables paged metadata")
+    parser.add_argument("--workers", type=int, default=1, help="Number of files rewritten in parallel")
+    parser.add_argument("--no-benchmark", dest="benchmark", action="store_false",
+                        help="Skip the read benchmark before and after")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input_dir):
+        print(f"Error: Input directory not found at {args.input_dir}")
+        return 1
+
+    hdf5_files = get_hdf5_files(args.input_dir, args.include_tasks, args.exclude_tasks)
+    if not hdf5_files:
+        print(f"Error: No HDF5 files found in {args.input_dir}")
+        return 1
+
+    results = rechunk_hdf5_files(hdf5_files, None if args.in_place else args.output_dir,
+                                 None if args.compression == "none" else args.compression, args.level,
+                                 args.page_size or None, args.workers, args.benchmark)
+
+    print(f"\nRechunked {len(results)} files")
+    print(f"  Size: {sum(r['file_size_before'] for r in results) / 1e6:.1f} MB -> "
+          f"{sum(r['file_size_after'] for r in results) / 1e6:.1f} MB")
+    if args.benchmark:
+        for key, label in [("read_before", "before"), ("read_after", "after")]:
+            num_bytes = sum(r[key]["bytes"] for r in results)
+            seconds = sum(r[key]["seconds"] for r in results)
+            print(f"  Read throughput {label}: {num_bytes / 1e6 / max(seconds, 1e-9):.1f} MB/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the write-behind output writer.
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from test_failed_episodes import create_libero_hdf5
+
+
+def test_async_writes():
+    """Test that queued buffers and moved files are complete after a flush."""
+    from utils.async_writer import AsyncWriter
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # A small in-flight limit makes the hand-offs wait for the writer threads
+        with AsyncWriter(num_threads=2, max_inflight_bytes=1000) as writer:
+            for i in range(20):
+                writer.write_bytes(os.path.join(temp_dir, f"file_{i}.bin"), bytes([i]) * 600)
+
+            local_path = os.path.join(temp_dir, "local.mp4")
+            with open(local_path, "wb") as f:
+                f.write(b"video")
+            writer.move_file(local_path, os.path.join(temp_dir, "videos.mp4"))
+            writer.flush()
+
+            assert writer._inflight_bytes == 0
+            for i in range(20):
+                with open(os.path.join(temp_dir, f"file_{i}.bin"), "rb") as f:
+                    assert f.read() == bytes([i]) * 600
+            assert not os.path.exists(local_path)
+            assert open(os.path.join(temp_dir, "videos.mp4"), "rb").read() == b"video"
+
+        assert not [name for name in os.listdir(temp_dir) if name.endswith(".tmp")]
+
+    print("✅ Write-behind buffers and files are complete after flush")
+    return True
+
+
+def test_async_write_errors():
+    """Test that a failed write is raised from flush."""
+    from utils.async_writer import AsyncWriter
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        writer = AsyncWriter(num_threads=1)
+        writer.write_bytes(os.path.join(temp_dir, "missing_dir", "file.bin"), b"data")
+        try:
+            writer.close()
+        except FileNotFoundError:
+            print("✅ Write errors are raised from flush")
+            return True
+
+    raise AssertionError("Write error was not raised")
+
+
+def test_output_file_modes():
+    """Test that videos moved from private temp files get the same mode as every other output."""
+    import stat
+    from utils.batch_processor import process_all_hdf5_files
+    from config import get_default_config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        output_dir = os.path.join(temp_dir, "output")
+        os.makedirs(input_dir)
+        create_libero_hdf5(os.path.join(input_dir, "a_task_demo.hdf5"), [4])
+
+        config = dict(get_default_config(), enable_progress_bars=False, write_threads=2)
+        process_all_hdf5_files(input_dir, output_dir, config=config)
+
+        # meta/info.json is written with a plain open()
+        default_mode = stat.S_IMODE(os.stat(os.path.join(output_dir, "meta", "info.json")).st_mode)
+        for name in ["data/chunk-000/episode_000000.parquet",
+                     "videos/chunk-000/observation.images.agentview_rgb/episode_000000.mp4",
+                     "images/agentview/episode_000000_timestamp_0.000.png"]:
+            assert stat.S_IMODE(os.stat(os.path.join(output_dir, name)).st_mode) == default_mode, name
+
+    print("✅ Output files share the umask-derived mode")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_async_writes() and test_async_write_errors() and test_output_file_modes()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Async writer tests passed!")
+    else:
+        print("❌ Async writer tests failed.")
+
+    sys.exit(0 if success else 1)
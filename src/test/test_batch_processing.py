@@ -109,6 +109,158 @@ def test_directory_structure_creation():
         return False
 
 
+def test_cli_config():
+    """Test that command line options override the config.py defaults."""
+    try:
+        from batch_converter import parse_config
+        from config import get_default_config
+        
+        defaults = get_default_config()
+        config = parse_config([
+            "--input-dir", "/data/libero_90", "--workers", "4", "--no-images", "--no-videos",
+            "--compression", "zstd", "--include", "KITCHEN_*", "--exclude", "*drawer*",
+            "--max-retries", "5", "--retry-delay", "0.5"
+        ])
+        
+        assert config["input_dir"] == "/data/libero_90"
+        assert config["output_dir"] == defaults["output_dir"]
+        assert config["workers"] == 4
+        assert config["enable_image_saving"] is False
+        assert config["enable_video_creation"] is False
+        assert config["parquet_compression"] == "zstd"
+        assert config["include_tasks"] == ["KITCHEN_*"]
+        assert config["exclude_tasks"] == ["*drawer*"]
+        assert config["max_retries"] == 5 and config["retry_delay"] == 0.5
+        assert parse_config([])["enable_image_saving"] == defaults["enable_image_saving"]
+        
+        print("✅ Command line options override config.py defaults")
+        return True
+        
+    except Exception as e:
+        print(f"❌ CLI config error: {e}")
+        raise
+
+
+def test_task_filters():
+    """Test that include/exclude task globs filter the HDF5 files."""
+    try:
+        from utils.batch_processor import get_hdf5_files
+        
+        import tempfile
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for task in ["pick_up_the_milk", "pick_up_the_butter", "open_the_drawer"]:
+                open(os.path.join(temp_dir, f"{task}_demo.hdf5"), "w").close()
+            
+            included = get_hdf5_files(temp_dir, include_tasks=["pick_up_*"])
+            excluded = get_hdf5_files(temp_dir, include_tasks=["pick_up_*"], exclude_tasks=["*milk"])
+        
+        assert [os.path.basename(path) for path in included] == ["pick_up_the_butter_demo.hdf5", "pick_up_the_milk_demo.hdf5"]
+        assert [os.path.basename(path) for path in excluded] == ["pick_up_the_butter_demo.hdf5"]
+        
+        print("✅ Task include/exclude globs filter HDF5 files")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Task filter error: {e}")
+        raise
+
+
+def test_episode_plan():
+    """Test that subset filters select demos with contiguous episode indices."""
+    try:
+        from utils.episode_plan import plan_episodes, parse_demo_range
+        from config import get_default_config
+        
+        def file_inventory(task, lengths):
+            return {
+                "file": f"{task}_demo.hdf5",
+                "task": {"task": task},
+                "demos": [{"demo_key": f"demo_{i}", "num_frames": length, "num_bytes": length * 10}
+                          for i, length in enumerate(lengths)],
+            }
+        
+        inventory = {"files": [file_inventory("milk", [5, 6, 7, 8]), file_inventory("butter", [3, 4, 5])]}
+        config = get_default_config()
+        
+        assert parse_demo_range("2:") == (2, None)
+        assert parse_demo_range(":3") == (0, 3)
+        
+        plan = plan_episodes(inventory, dict(config, demo_range="1:3"))
+        assert [[demo["demo_key"] for demo in file_plan["demos"]] for file_plan in plan["files"]] == [["demo_1", "demo_2"], ["demo_1", "demo_2"]]
+        assert [file_plan["episode_start"] for file_plan in plan["files"]] == [0, 2]
+        assert [demo["episode_index"] for demo in plan["files"][1]["demos"]] == [2, 3]
+        assert plan["total_frames"] == 6 + 7 + 4 + 5
+        
+        plan = plan_episodes(inventory, dict(config, max_episodes_per_task=1))
+        assert plan["total_episodes"] == 2
+        
+        # The frame budget drops everything after the first demo that does not fit
+        plan = plan_episodes(inventory, dict(config, max_total_frames=12))
+        assert plan["total_episodes"] == 2 and plan["total_frames"] == 11
+        assert len(plan["files"]) == 1
+        
+        print("✅ Subset filters select demos with contiguous episode indices")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Episode plan error: {e}")
+        raise
+
+
+def test_episode_splits():
+    """Test that stratified splits are seeded and written as contiguous episode ranges."""
+    try:
+        from utils.episode_plan import plan_episodes, allocate_split_counts, parse_split_specs
+        from config import get_default_config
+        
+        inventory = {"files": [
+            {"file": f"{task}_demo.hdf5", "task": {"task": task},
+             "demos": [{"demo_key": f"demo_{i}", "num_frames": 10, "num_bytes": 100} for i in range(10)]}
+            for task in ["milk", "butter"]
+        ]}
+        config = dict(get_default_config(), splits={"train": 0.8, "val": 0.2}, split_seed=3)
+        
+        assert allocate_split_counts(10, {"train": 0.8, "val": 0.2}) == {"train": 8, "val": 2}
+        assert allocate_split_counts(10, {"val": 3, "train": 1.0}) == {"val": 3, "train": 7}
+        assert allocate_split_counts(10, {"val": 3}) == {"val": 3}
+        # Ratios are fractions of the episodes, the rest goes to train
+        assert allocate_split_counts(10, {"val": 0.1}) == {"train": 9, "val": 1}
+        assert allocate_split_counts(10, {"train": 0.7, "val": 0.2, "test": 0.1}) == {"train": 7, "val": 2, "test": 1}
+        # An explicit train ratio is never topped up, the ratios must add up to 1
+        for splits in [{"train": 0.9, "val": 0.2}, {"train": 0.5, "val": 0.1}]:
+            try:
+                allocate_split_counts(10, splits)
+                assert False, f"ratios {splits} were accepted"
+            except ValueError:
+                pass
+        assert parse_split_specs(["val=1e-1", "test=2", "train=1"]) == {"val": 0.1, "test": 2, "train": 1}
+        
+        plan = plan_episodes(inventory, config)
+        assert plan["splits"] == {"train": "0:16", "val": "16:20"}
+        assert [(file_plan["split"], file_plan["task_name"], len(file_plan["demos"])) for file_plan in plan["files"]] == [
+            ("train", "milk", 8), ("train", "butter", 8), ("val", "milk", 2), ("val", "butter", 2)]
+        
+        episode_indices = [demo["episode_index"] for file_plan in plan["files"] for demo in file_plan["demos"]]
+        assert episode_indices == list(range(20))
+        assert [file_plan["part_index"] for file_plan in plan["files"]] == [0, 1, 2, 3]
+        
+        # Same seed, same split; the split of a task does not depend on the other tasks
+        val_demos = [demo["demo_key"] for demo in plan["files"][2]["demos"]]
+        assert val_demos == [demo["demo_key"] for demo in plan_episodes(inventory, config)["files"][2]["demos"]]
+        milk_only = {"files": inventory["files"][:1]}
+        assert val_demos == [demo["demo_key"] for demo in plan_episodes(milk_only, config)["files"][1]["demos"]]
+        
+        # A lone validation ratio still leaves train first
+        assert plan_episodes(inventory, dict(config, splits={"val": 0.2}))["splits"] == {"train": "0:16", "val": "16:20"}
+        
+        print(f"✅ Stratified splits: {plan['splits']}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Episode split error: {e}")
+        raise
+
+
 def main():
     """Run all batch processing tests."""
     print("Testing batch processing functionality...")
@@ -138,6 +290,30 @@ def main():
     if not test_directory_structure_creation():
         success = False
     
+    print()
+    
+    # Test command line configuration
+    if not test_cli_config():
+        success = False
+    
+    print()
+    
+    # Test task filters
+    if not test_task_filters():
+        success = False
+    
+    print()
+    
+    # Test subset selection
+    if not test_episode_plan():
+        success = False
+    
+    print()
+    
+    # Test stratified splits
+    if not test_episode_splits():
+        success = False
+    
     print()
     print("=" * 60)
     
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the deduplicating blob store and the relinking of unchanged episodes.
+"""
+
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from test_failed_episodes import create_libero_hdf5
+
+
+def list_files(output_dir):
+    """Relative path -> absolute path of every dataset file, without the blob store."""
+    files = {}
+    for root, dirs, names in os.walk(output_dir):
+        dirs[:] = [name for name in dirs if name != ".blobs"]
+        for name in names:
+            files[os.path.relpath(os.path.join(root, name), output_dir)] = os.path.join(root, name)
+    return files
+
+
+def test_blob_store_writer():
+    """Test that identical files are stored once and linked, and that links are replaced, not written into."""
+    from utils.blob_store import BlobStore, BlobStoreWriter
+    from utils.async_writer import AsyncWriter
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = BlobStore(os.path.join(temp_dir, ".blobs"))
+        with BlobStoreWriter(store, AsyncWriter(num_threads=2)) as writer:
+            writer.write_bytes(os.path.join(temp_dir, "a", "x.bin"), b"same")
+            writer.write_bytes(os.path.join(temp_dir, "b", "x.bin"), b"same")
+            writer.flush()
+            written = writer.take_written()
+            assert len(written) == 2 and len(set(written.values())) == 1
+            assert os.path.samefile(os.path.join(temp_dir, "a", "x.bin"), os.path.join(temp_dir, "b", "x.bin"))
+
+            writer.write_bytes(os.path.join(temp_dir, "a", "x.bin"), b"other")
+            writer.flush()
+        with open(os.path.join(temp_dir, "a", "x.bin"), 'rb') as f:
+            assert f.read() == b"other"
+        with open(os.path.join(temp_dir, "b", "x.bin"), 'rb') as f:
+            assert f.read() == b"same"
+
+    print("✅ Blob store keeps one object per content")
+    return True
+
+
+def test_unchanged_episodes_are_relinked():
+    """Test that variants share files and a re-run relinks episodes without converting them."""
+    import utils.batch_processor as batch_processor
+    from utils.batch_processor import process_all_hdf5_files
+    from config import get_default_config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        output_dir = os.path.join(temp_dir, "output")
+        second_dir = os.path.join(temp_dir, "output_copy")
+        os.makedirs(input_dir)
+        create_libero_hdf5(os.path.join(input_dir, "a_task_demo.hdf5"), [4, 5])
+        create_libero_hdf5(os.path.join(input_dir, "b_task_demo.hdf5"), [6])
+
+        config = dict(get_default_config(), enable_progress_bars=False, blob_store=True)
+        variants = [{"output_dir": output_dir, "image_height": 8, "image_width": 8},
+                    {"output_dir": second_dir, "image_height": 8, "image_width": 8}]
+        process_all_hdf5_files(input_dir, output_dir, variants=variants, config=config)
+        first_files = list_files(output_dir)
+        first_inodes = {name: os.stat(path).st_ino for name, path in first_files.items()}
+
+        # Both variants hold the same files, stored once
+        for name in ["data/chunk-000/episode_000001.parquet",
+                     "videos/chunk-000/observation.images.agentview_rgb/episode_000001.mp4"]:
+            assert os.path.samefile(os.path.join(output_dir, name), os.path.join(second_dir, name)), name
+
+        # Nothing changed: no demo is converted again and the outputs stay the same files
+        original = batch_processor.process_single_demo_for_chunk
+        batch_processor.process_single_demo_for_chunk = lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError("converted"))
+        try:
+            process_all_hdf5_files(input_dir, output_dir, variants=variants, config=dict(config, max_retries=0))
+        finally:
+            batch_processor.process_single_demo_for_chunk = original
+        assert not os.path.exists(os.path.join(output_dir, "meta", "failed_episodes.jsonl"))
+        with open(os.path.join(output_dir, "meta", "info.json")) as f:
+            assert json.load(f)["total_episodes"] == 3
+        data_files = {name for name in first_files if name.startswith(("data/", "videos/", "images/"))}
+        assert all(os.stat(first_files[name]).st_ino == first_inodes[name] for name in data_files)
+
+        # A changed parquet setting converts again, while the identical videos are shared with the first run
+        process_all_hdf5_files(input_dir, output_dir, variants=variants, config=dict(config, parquet_compression="gzip"))
+        parquet = "data/chunk-000/episode_000000.parquet"
+        video = "videos/chunk-000/observation.images.eye_in_hand_rgb/episode_000000.mp4"
+        assert os.stat(os.path.join(output_dir, parquet)).st_ino != first_inodes[parquet]
+        assert os.stat(os.path.join(output_dir, video)).st_ino == first_inodes[video]
+
+    print("✅ Unchanged episodes are relinked from the blob store")
+    return True
+
+
+def test_plain_run_over_linked_files():
+    """Test that a run without the blob store replaces the linked files instead of writing into the objects."""
+    from utils.batch_processor import process_all_hdf5_files
+    from utils.blob_store import hash_file
+    from config import get_default_config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        output_dir = os.path.join(temp_dir, "output")
+        os.makedirs(input_dir)
+        create_libero_hdf5(os.path.join(input_dir, "a_task_demo.hdf5"), [4, 5])
+
+        config = dict(get_default_config(), enable_progress_bars=False, previews=True, preview_tile_size=8)
+        process_all_hdf5_files(input_dir, output_dir, variants=[{"output_dir": output_dir}],
+                               config=dict(config, blob_store=True))
+        linked_files = list_files(output_dir)
+        linked_inodes = {name: os.stat(path).st_ino for name, path in linked_files.items()}
+
+        # Different images and compression, written in place without a writer
+        process_all_hdf5_files(input_dir, output_dir,
+                               variants=[{"output_dir": output_dir, "image_height": 16, "image_width": 16}],
+                               config=dict(config, write_threads=0, parquet_compression="gzip"))
+        for name in ["data/chunk-000/episode_000001.parquet", "images/agentview/episode_000001_timestamp_0.000.png",
+                     "videos/chunk-000/observation.images.agentview_rgb/episode_000001.mp4",
+                     "previews/episode_000001.jpg"]:
+            assert os.stat(os.path.join(output_dir, name)).st_ino != linked_inodes[name], name
+
+        objects_dir = os.path.join(output_dir, ".blobs", "objects")
+        for root, dirs, names in os.walk(objects_dir):
+            for name in names:
+                assert hash_file(os.path.join(root, name)) == name, name
+
+    print("✅ Plain runs leave the blob objects untouched")
+    return True
+
+
+if __name__ == "__main__":
+    success = (test_blob_store_writer() and test_unchanged_episodes_are_relinked()
+               and test_plain_run_over_linked_files())
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Blob store tests passed!")
+    else:
+        print("❌ Blob store tests failed.")
+
+    sys.exit(0 if success else 1)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test script to verify camera stream discovery and lossless depth videos.
+"""
+
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from test_failed_episodes import create_libero_hdf5
+
+
+def read_depth_video(video_path):
+    """Decode a 16-bit grayscale video into a (T, H, W) uint16 array."""
+    import cv2
+
+    capture = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_CONVERT_RGB, 0])
+    frames = []
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    return np.stack(frames)
+
+
+def test_camera_key_discovery():
+    """Test that *_rgb and *_depth datasets are found and selections are validated."""
+    from utils.image_processing import get_camera_keys, get_image_dir_name
+
+    obs_keys = ["joint_states", "eye_in_hand_rgb", "agentview_rgb", "agentview_depth", "ee_pos"]
+    assert get_camera_keys(obs_keys) == ["agentview_depth", "agentview_rgb", "eye_in_hand_rgb"]
+    assert get_camera_keys(obs_keys, ["eye_in_hand_rgb"]) == ["eye_in_hand_rgb"]
+    assert get_image_dir_name("agentview_rgb") == "agentview"
+    assert get_image_dir_name("agentview_depth") == "agentview_depth"
+    try:
+        get_camera_keys(obs_keys, ["wrist_rgb"])
+        assert False, "unknown camera stream was accepted"
+    except ValueError:
+        pass
+
+    print("✅ Camera streams discovered from the obs group")
+    return True
+
+
+def test_depth_stream_conversion():
+    """Test that a depth stream is written as a lossless 16-bit video and described in the metadata."""
+    import h5py
+    from PIL import Image
+    from utils.batch_processor import process_all_hdf5_files
+    from config import get_default_config, DEPTH_SCALE
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        output_dir = os.path.join(temp_dir, "output")
+        os.makedirs(input_dir)
+        hdf5_path = os.path.join(input_dir, "a_task_demo.hdf5")
+        create_libero_hdf5(hdf5_path, [4, 5], image_size=16, depth=True)
+
+        config = dict(get_default_config(), enable_progress_bars=False, write_threads=2)
+        process_all_hdf5_files(input_dir, output_dir,
+                               variants=[{"output_dir": output_dir, "image_height": 16, "image_width": 16}], config=config)
+
+        video_dir = os.path.join(output_dir, "videos", "chunk-000")
+        assert sorted(os.listdir(video_dir)) == ["observation.images.agentview_depth",
+                                                 "observation.images.agentview_rgb",
+                                                 "observation.images.eye_in_hand_rgb"]
+        with h5py.File(hdf5_path, 'r') as f:
+            expected = np.rint(f["data/demo_1/obs/agentview_depth"][:, :, :, 0] * DEPTH_SCALE).astype(np.uint16)
+        depth = read_depth_video(os.path.join(video_dir, "observation.images.agentview_depth", "episode_000001.mp4"))
+        assert np.array_equal(depth, expected)
+
+        png = Image.open(os.path.join(output_dir, "images", "agentview_depth", "episode_000001_timestamp_0.000.png"))
+        assert np.array_equal(np.array(png), expected[0])
+
+        with open(os.path.join(output_dir, "meta", "info.json")) as f:
+            info = json.load(f)
+        assert info["total_videos"] == 2 * 3
+        depth_feature = info["features"]["observation.images.agentview_depth"]
+        assert depth_feature["shape"] == [16, 16, 1] and depth_feature["video_info"]["video.is_depth_map"]
+        with open(os.path.join(output_dir, "meta", "modality.json")) as f:
+            assert sorted(json.load(f)["video"]) == ["agentview_depth", "agentview_rgb", "eye_in_hand_rgb"]
+
+        # A selection of streams only writes those
+        selected_dir = os.path.join(temp_dir, "selected")
+        process_all_hdf5_files(input_dir, selected_dir, variants=[{"output_dir": selected_dir}],
+                               config=dict(config, camera_keys=["agentview_rgb"], enable_image_saving=False))
+        assert os.listdir(os.path.join(selected_dir, "videos", "chunk-000")) == ["observation.images.agentview_rgb"]
+        with open(os.path.join(selected_dir, "meta", "info.json")) as f:
+            assert json.load(f)["total_videos"] == 2
+
+    print("✅ Depth stream encoded losslessly next to the RGB cameras")
+    return True
+
+
+def test_streams_across_files():
+    """Test that only streams of every file are converted and files missing a selected stream are rejected once."""
+    import time
+    from utils.batch_processor import process_all_hdf5_files
+    from config import get_default_config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        os.makedirs(input_dir)
+        create_libero_hdf5(os.path.join(input_dir, "a_task_demo.hdf5"), [4, 5], depth=True)
+        create_libero_hdf5(os.path.join(input_dir, "b_task_demo.hdf5"), [6])
+
+        # The depth stream of the first file is not in the second one, so it is skipped everywhere
+        config = dict(get_default_config(), enable_progress_bars=False, enable_image_saving=False,
+                      max_retries=3, retry_delay=10)
+        output_dir = os.path.join(temp_dir, "output")
+        process_all_hdf5_files(input_dir, output_dir, config=config)
+        assert sorted(os.listdir(os.path.join(output_dir, "videos", "chunk-000"))) == \
+            ["observation.images.agentview_rgb", "observation.images.eye_in_hand_rgb"]
+        assert not os.path.exists(os.path.join(output_dir, "meta", "failed_episodes.jsonl"))
+
+        # Selecting it rejects the second file without retrying its demos
+        selected_dir = os.path.join(temp_dir, "selected")
+        start = time.monotonic()
+        process_all_hdf5_files(input_dir, selected_dir,
+                               config=dict(config, camera_keys=["agentview_rgb", "agentview_depth"]))
+        assert time.monotonic() - start < 10
+        with open(os.path.join(selected_dir, "meta", "failed_episodes.jsonl")) as f:
+            failed = [json.loads(line) for line in f]
+        assert [entry["demo_key"] for entry in failed] == ["demo_0"]
+        assert "b_task_demo.hdf5 has no camera stream agentview_depth" in failed[0]["error"]
+        with open(os.path.join(selected_dir, "meta", "info.json")) as f:
+            assert json.load(f)["total_episodes"] == 2
+
+    print("✅ Camera streams resolved across all files")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_camera_key_discovery() and test_depth_stream_conversion() and test_streams_across_files()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Camera stream tests passed!")
+    else:
+        print("❌ Camera stream tests failed.")
+
+    sys.exit(0 if success else 1)
@@ -170,6 +170,48 @@ def test_metadata_file_structure():
     return True
 
 
+def test_streaming_episode_merge():
+    """Test that partial per-part episode files are merged into episodes.jsonl by chunks_size."""
+    from utils.metadata_generator import open_partial_episodes_file, append_episode_metadata, merge_partial_episodes
+    
+    print("\nTesting streaming episode merge...")
+    print("=" * 60)
+    
+    import tempfile
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Write part 1 before part 0, the merge must still follow part order
+        for part_index in (1, 0):
+            with open_partial_episodes_file(temp_dir, part_index) as partial_file:
+                for i in range(3):
+                    append_episode_metadata(partial_file, {
+                        "episode_index": part_index * 3 + i,
+                        "tasks": [f"task_{part_index}", "valid"],
+                        "length": 100 + i
+                    })
+        
+        # Chunks hold 4 episodes regardless of which part (source file) they came from
+        merged = merge_partial_episodes(temp_dir, chunks_size=4)
+        
+        with open(merged["episodes_path"]) as f:
+            episode_indices = [json.loads(line)["episode_index"] for line in f]
+        partial_dir_exists = os.path.exists(os.path.join(temp_dir, "meta", "partial"))
+    
+    if episode_indices != list(range(6)) or merged["total_frames"] != 2 * (100 + 101 + 102):
+        print("❌ Streaming merge produced wrong episodes!")
+        print(f"   Episode indices: {episode_indices}")
+        return False
+    
+    assert [chunk["global_episode_start"] for chunk in merged["chunks_info"]] == [0, 4]
+    assert [chunk["episodes_count"] for chunk in merged["chunks_info"]] == [4, 2]
+    assert merged["chunks_info"][0]["task_names"] == ["task_0", "task_1"]
+    assert not partial_dir_exists
+    
+    print("✅ Partial episode files merged in order and grouped by chunks_size")
+    print(f"   Episode indices: {episode_indices}")
+    print(f"   Total frames: {merged['total_frames']}")
+    return True
+
+
 def main():
     """Run all tests."""
     success = True
@@ -186,6 +228,10 @@ def main():
     if not test_metadata_file_structure():
         success = False
     
+    # Test streaming episode merge
+    if not test_streaming_episode_merge():
+        success = False
+    
     print("\n" + "=" * 60)
     if success:
         print("🎉 All consecutive episode tests passed!")
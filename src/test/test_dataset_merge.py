@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script to verify merging independently converted datasets.
+"""
+
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from test_failed_episodes import create_libero_hdf5
+
+
+def test_merge_stats():
+    """Test that stats are combined like the stats of the concatenated frames."""
+    from utils.dataset_merge import merge_stats
+
+    a = np.array([[0.0, 1.0], [2.0, 3.0], [4.0, 8.0]])
+    b = np.array([[10.0, -1.0], [12.0, 5.0]])
+    describe = lambda values: {"action": {"mean": values.mean(0).tolist(), "std": values.std(0).tolist(),
+                                          "min": values.min(0).tolist(), "max": values.max(0).tolist()}}
+    merged = merge_stats([describe(a), describe(b)], [len(a), len(b)])["action"]
+    expected = describe(np.concatenate([a, b]))["action"]
+    for key in ["mean", "std", "min", "max"]:
+        assert np.allclose(merged[key], expected[key]), key
+
+    print("✅ Stats merged from per-dataset stats")
+    return True
+
+
+def test_merge_datasets():
+    """Test that merged datasets get contiguous indices and splits, unioned tasks and linked videos."""
+    import pandas as pd
+    from utils.batch_processor import process_all_hdf5_files
+    from utils.dataset_merge import merge_datasets
+    from config import get_default_config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = dict(get_default_config(), enable_progress_bars=False, write_threads=0,
+                      splits={"val": 1, "train": 1.0}, previews=True, preview_tile_size=8)
+        suites = {"suite_a": {"a_task": [4, 5], "c_task": [6, 7]}, "suite_b": {"b_task": [8, 9, 10]}}
+        for suite, tasks in suites.items():
+            input_dir = os.path.join(temp_dir, "input", suite)
+            os.makedirs(input_dir)
+            for task_name, demo_lengths in tasks.items():
+                create_libero_hdf5(os.path.join(input_dir, f"{task_name}_demo.hdf5"), demo_lengths)
+            output_dir = os.path.join(temp_dir, suite)
+            process_all_hdf5_files(input_dir, output_dir,
+                                   variants=[{"output_dir": output_dir, "image_height": 8, "image_width": 8}], config=config)
+
+        merged_dir = os.path.join(temp_dir, "merged")
+        result = merge_datasets([os.path.join(temp_dir, "suite_a"), os.path.join(temp_dir, "suite_b")], merged_dir)
+        assert result["total_episodes"] == 7 and result["total_frames"] == 49
+
+        with open(os.path.join(merged_dir, "meta", "info.json")) as f:
+            info = json.load(f)
+        assert info["total_episodes"] == 7 and info["total_videos"] == 14 and info["total_tasks"] == 4
+        assert info["splits"] == {"val": "0:3", "train": "3:7"}
+
+        with open(os.path.join(merged_dir, "meta", "tasks.jsonl")) as f:
+            task_indices = {entry["task"]: entry["task_index"] for entry in map(json.loads, f)}
+        assert task_indices == {"a_task": 0, "b_task": 1, "c_task": 2, "valid": 3}
+
+        with open(os.path.join(merged_dir, "meta", "episodes.jsonl")) as f:
+            episodes = [json.loads(line) for line in f]
+        assert [episode["episode_index"] for episode in episodes] == list(range(7))
+
+        # Every episode keeps its frames and points at the merged task index
+        for episode in episodes:
+            df = pd.read_parquet(os.path.join(merged_dir, "data", "chunk-000", f"episode_{episode['episode_index']:06d}.parquet"))
+            assert len(df) == episode["length"]
+            assert (df["episode_index"] == episode["episode_index"]).all()
+            assert (df["task_index"] == task_indices[episode["tasks"][0]]).all()
+
+        # Videos are hardlinked, not copied
+        source_video = os.path.join(temp_dir, "suite_b", "videos", "chunk-000", "observation.images.agentview_rgb", "episode_000000.mp4")
+        merged_videos = [os.path.join(root, name) for root, _, names in os.walk(os.path.join(merged_dir, "videos")) for name in names]
+        assert len(merged_videos) == 14
+        assert any(os.path.samefile(source_video, path) for path in merged_videos)
+
+        # Previews follow the renumbered episodes and are indexed again
+        previews = sorted(os.listdir(os.path.join(merged_dir, "previews")))
+        assert previews == [f"episode_{i:06d}.jpg" for i in range(7)] + ["index.html"]
+        with open(os.path.join(merged_dir, "previews", "index.html")) as f:
+            index = f.read()
+        assert all(f'src="episode_{i:06d}.jpg"' in index for i in range(7))
+
+        try:
+            merge_datasets([os.path.join(temp_dir, "suite_a")], merged_dir)
+            assert False, "merged into an existing dataset"
+        except ValueError:
+            pass
+
+    print("✅ Datasets merged with contiguous episodes, splits and unioned tasks")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_merge_stats() and test_merge_datasets()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Dataset merge tests passed!")
+    else:
+        print("❌ Dataset merge tests failed.")
+
+    sys.exit(0 if success else 1)
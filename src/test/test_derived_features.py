@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the derived action/state features written at conversion time.
+"""
+
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from test_failed_episodes import create_libero_hdf5
+
+
+def test_action_chunks():
+    """Test that strided action chunks match a per-frame loop with end padding."""
+    from utils.derived_features import get_action_chunks, get_delta_actions
+
+    actions = np.arange(10, dtype=np.float64).reshape(5, 2)
+    action_chunks = get_action_chunks(actions, 3)
+    for t in range(5):
+        window = [actions[min(t + step, 4)] for step in range(3)]
+        assert np.array_equal(action_chunks["chunks"][t], np.concatenate(window))
+        assert action_chunks["is_pad"][t].tolist() == [t + step >= 5 for step in range(3)]
+
+    delta = get_delta_actions(actions)
+    assert np.array_equal(delta[0], [0.0, 0.0]) and np.array_equal(delta[1:], np.diff(actions, axis=0))
+
+    print("✅ Action chunks and deltas computed over the whole episode")
+    return True
+
+
+def test_derived_feature_columns():
+    """Test that conversion writes the derived columns, their features and the dataset stats."""
+    import h5py
+    import pandas as pd
+    from utils.batch_processor import process_all_hdf5_files
+    from utils.hdf5_export import export_to_hdf5
+    from config import get_default_config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        output_dir = os.path.join(temp_dir, "output")
+        os.makedirs(input_dir)
+        create_libero_hdf5(os.path.join(input_dir, "a_task_demo.hdf5"), [4, 5])
+        create_libero_hdf5(os.path.join(input_dir, "b_task_demo.hdf5"), [6])
+
+        config = dict(get_default_config(), enable_progress_bars=False, enable_video_creation=False,
+                      enable_image_saving=False, action_chunk_horizon=3,
+                      derived_features=["delta_action", "state_velocity", "action_chunk", "normalized"])
+        process_all_hdf5_files(input_dir, output_dir, config=config)
+
+        # Stats over every converted frame
+        all_actions = []
+        for name in ["a_task_demo.hdf5", "b_task_demo.hdf5"]:
+            with h5py.File(os.path.join(input_dir, name), 'r') as f:
+                all_actions += [f['data'][demo]['actions'][:] for demo in sorted(f['data'].keys())]
+        all_actions = np.concatenate(all_actions)
+        with open(os.path.join(output_dir, "meta", "stats.json")) as f:
+            stats = json.load(f)
+        assert np.allclose(stats["action"]["mean"], all_actions.mean(0))
+        assert np.allclose(stats["action"]["std"], all_actions.std(0))
+        assert len(stats["observation.state"]["mean"]) == 7
+
+        with open(os.path.join(output_dir, "meta", "info.json")) as f:
+            features = json.load(f)["features"]
+        assert features["action.chunk"]["shape"] == [21] and features["action.chunk_is_pad"]["shape"] == [3]
+        assert features["action.normalized"]["normalization"]["mean"] == stats["action"]["mean"]
+
+        df = pd.read_parquet(os.path.join(output_dir, "data", "chunk-000", "episode_000001.parquet"))
+        actions = np.stack(df["action"].to_numpy())
+        state = np.stack(df["observation.state"].to_numpy())
+        assert np.allclose(np.stack(df["action.delta"].to_numpy())[1:], np.diff(actions, axis=0))
+        assert np.allclose(np.stack(df["observation.state.velocity"].to_numpy()), np.gradient(state, 0.05, axis=0))
+        assert np.allclose(np.stack(df["action.chunk"].to_numpy())[-1], np.tile(actions[-1], 3))
+        assert np.stack(df["action.chunk_is_pad"].to_numpy()).sum() == 1 + 2
+        normalized = np.stack(df["action.normalized"].to_numpy())
+        assert np.allclose(normalized, (actions - stats["action"]["mean"]) / np.array(stats["action"]["std"]))
+
+        # Derived columns are marked and not exported as obs datasets
+        assert all(features[name]["derived"] for name in ["action.delta", "observation.state.velocity",
+                                                          "observation.state.normalized", "action.chunk"])
+        export_dir = os.path.join(temp_dir, "export")
+        export_to_hdf5(output_dir, export_dir)
+        with h5py.File(os.path.join(export_dir, "a_task_demo.hdf5"), 'r') as f:
+            assert "state.velocity" not in f["data/demo_1/obs"] and "state.normalized" not in f["data/demo_1/obs"]
+            assert "joint_states" in f["data/demo_1/obs"]
+
+    print("✅ Derived features written as parquet columns with their stats")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_action_chunks() and test_derived_feature_columns()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Derived features tests passed!")
+    else:
+        print("❌ Derived features tests failed.")
+
+    sys.exit(0 if success else 1)
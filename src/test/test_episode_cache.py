@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the episode cache in front of extract_demo_data.
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from test_failed_episodes import create_libero_hdf5
+
+def make_episode(value, num_bytes=1000):
+    """Create a fake extracted episode of the given size."""
+    return (np.full(num_bytes // 2, value, dtype=np.uint8), np.full(num_bytes // 2, value, dtype=np.uint8))
+
+
+def test_lru_eviction():
+    """Test that the least recently used episodes are evicted by bytes."""
+    from utils.episode_cache import EpisodeCache
+
+    cache = EpisodeCache(max_bytes=2500)
+    cache.put("a", make_episode(1))
+    cache.put("b", make_episode(2))
+    assert cache.get("a") is not None  # "b" is now the least recently used
+    cache.put("c", make_episode(3))
+
+    assert cache.get("b") is None
+    assert cache.get("a")[0][0] == 1 and cache.get("c")[0][0] == 3
+    assert cache.current_bytes == 2000
+
+    loads = []
+    arrays = cache.get_or_load("d", lambda: loads.append("d") or make_episode(4))
+    arrays = cache.get_or_load("d", lambda: loads.append("d") or make_episode(4))
+    assert loads == ["d"] and arrays[1][0] == 4
+
+    print(f"✅ LRU eviction by bytes ({cache.hits} hits, {cache.misses} misses)")
+    return True
+
+
+def test_spill_dir():
+    """Test that evicted episodes are served from the spill directory."""
+    from utils.episode_cache import EpisodeCache
+
+    with tempfile.TemporaryDirectory() as spill_dir:
+        cache = EpisodeCache(max_bytes=1500, spill_dir=spill_dir)
+        cache.put(("file.hdf5", "/data/demo_0"), make_episode(1))
+        cache.put(("file.hdf5", "/data/demo_1"), make_episode(2))
+
+        arrays = cache.get(("file.hdf5", "/data/demo_0"))
+        assert cache.spill_hits == 1
+        assert np.array_equal(arrays[0], make_episode(1)[0])
+
+        # Episodes larger than the memory limit only live on disk
+        cache.put("large", make_episode(5, num_bytes=4000))
+        assert cache.get("large")[0].size == 2000
+        assert cache.current_bytes <= 1500
+
+        cache.clear()
+        assert cache.get("large") is None
+
+    print("✅ Evicted episodes are reloaded from the spill directory")
+    return True
+
+
+def test_spill_dir_limit():
+    """Test that the spill directory is bounded and emptied once a source file is converted."""
+    from utils.episode_cache import EpisodeCache
+    from utils.batch_processor import process_all_hdf5_files
+    from config import get_default_config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spill_dir = os.path.join(temp_dir, "spill")
+        source_path = os.path.realpath(os.path.join(temp_dir, "a_task_demo.hdf5"))
+        cache = EpisodeCache(max_bytes=0, spill_dir=spill_dir, spill_max_bytes=2500)
+        for i in range(3):
+            cache.put((source_path, f"/data/demo_{i}"), make_episode(i))
+        assert len(os.listdir(spill_dir)) == 2 and cache.spill_bytes == 2000
+        assert cache.get((source_path, "/data/demo_0")) is None
+        assert cache.get((source_path, "/data/demo_2")) is not None
+
+        cache.discard_source(source_path)
+        assert os.listdir(spill_dir) == [] and cache.spill_bytes == 0
+
+        # A conversion leaves nothing behind in the spill directory
+        input_dir = os.path.join(temp_dir, "input")
+        os.makedirs(input_dir)
+        create_libero_hdf5(os.path.join(input_dir, "a_task_demo.hdf5"), [4, 5])
+        config = dict(get_default_config(), enable_progress_bars=False, enable_image_saving=False,
+                      enable_video_creation=False, episode_cache_bytes=0, episode_cache_dir=spill_dir)
+        process_all_hdf5_files(input_dir, os.path.join(temp_dir, "output"), config=config)
+        assert os.listdir(spill_dir) == []
+
+    print("✅ Spill directory bounded and emptied per file")
+    return True
+
+
+def test_regenerated_source_misses():
+    """Test that arrays spilled for a source file are not served after the file is regenerated."""
+    import h5py
+    from utils.episode_cache import EpisodeCache, get_episode_cache_key
+    from utils.hdf5_processor import extract_demo_data
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        hdf5_path = os.path.join(temp_dir, "a_task_demo.hdf5")
+        cache = EpisodeCache(max_bytes=0, spill_dir=os.path.join(temp_dir, "spill"))
+        camera_keys = ["agentview_rgb"]
+
+        create_libero_hdf5(hdf5_path, [4])
+        with h5py.File(hdf5_path, 'r') as f:
+            cache.put(get_episode_cache_key(f["data/demo_0"], camera_keys), extract_demo_data(f["data/demo_0"], camera_keys))
+            assert cache.get(get_episode_cache_key(f["data/demo_0"], camera_keys)) is not None
+
+        # A new cache (i.e. a new run) over the same spill directory after the source changed
+        create_libero_hdf5(hdf5_path, [6])
+        cache = EpisodeCache(max_bytes=0, spill_dir=os.path.join(temp_dir, "spill"))
+        with h5py.File(hdf5_path, 'r') as f:
+            assert cache.get(get_episode_cache_key(f["data/demo_0"], camera_keys)) is None
+
+    print("✅ Regenerated source files miss the spilled arrays")
+    return True
+
+
+if __name__ == "__main__":
+    success = (test_lru_eviction() and test_spill_dir() and test_spill_dir_limit()
+               and test_regenerated_source_misses())
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Episode cache tests passed!")
+    else:
+        print("❌ Episode cache tests failed.")
+
+    sys.exit(0 if success else 1)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script to verify per-episode retries, quarantine and index compaction.
+"""
+
+import sys
+import os
+import json
+import glob
+import tempfile
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+def create_libero_hdf5(path, demo_lengths, image_size=8, broken_demos=(), depth=False):
+    """Create a LIBERO-style HDF5 file; demos in broken_demos miss their joint states, depth adds agentview_depth."""
+    import h5py
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    task_name = os.path.basename(path).replace("_demo.hdf5", "")
+    with h5py.File(path, 'w') as f:
+        data_group = f.create_group("data")
+        data_group.attrs["problem_info"] = json.dumps({"language_instruction": task_name.replace("_", " ")})
+        for i, length in enumerate(demo_lengths):
+            demo_group = data_group.create_group(f"demo_{i}")
+            demo_group.create_dataset("actions", data=rng.normal(size=(length, 7)))
+            demo_group.create_dataset("rewards", data=np.eye(1, length, length - 1)[0])
+            demo_group.create_dataset("dones", data=np.eye(1, length, length - 1, dtype=np.uint8)[0])
+            obs = demo_group.create_group("obs")
+            for camera in ["agentview_rgb", "eye_in_hand_rgb"]:
+                obs.create_dataset(camera, data=rng.integers(0, 255, (length, image_size, image_size, 3), dtype=np.uint8))
+            if depth:
+                obs.create_dataset("agentview_depth", data=rng.uniform(0.1, 3.0, (length, image_size, image_size, 1)).astype(np.float32))
+            obs.create_dataset("ee_ori", data=rng.normal(size=(length, 3)))
+            obs.create_dataset("ee_pos", data=rng.normal(size=(length, 3)))
+            obs.create_dataset("ee_states", data=rng.normal(size=(length, 6)))
+            obs.create_dataset("gripper_states", data=rng.normal(size=(length, 2)))
+            if i not in broken_demos:
+                obs.create_dataset("joint_states", data=rng.normal(size=(length, 7)))
+
+
+def test_quarantine_and_compaction():
+    """Test that a failing demo is quarantined and later episodes are renumbered across chunks."""
+    import pandas as pd
+    from utils.batch_processor import process_all_hdf5_files
+    from config import get_default_config
+
+    print("Testing failed episode quarantine...")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        output_dir = os.path.join(temp_dir, "output")
+        os.makedirs(input_dir)
+        create_libero_hdf5(os.path.join(input_dir, "a_task_demo.hdf5"), [4, 5, 6], broken_demos=(1,))
+        create_libero_hdf5(os.path.join(input_dir, "b_task_demo.hdf5"), [3, 4])
+
+        config = dict(get_default_config(), enable_progress_bars=False, enable_video_creation=False,
+                      max_retries=1, retry_delay=0.0, write_threads=2, chunks_size=2)
+        process_all_hdf5_files(input_dir, output_dir,
+                               variants=[{"output_dir": output_dir, "image_height": 8, "image_width": 8}], config=config)
+
+        with open(os.path.join(output_dir, "meta", "failed_episodes.jsonl")) as f:
+            failed = [json.loads(line) for line in f]
+        assert [(entry["hdf5_file"], entry["demo_key"], entry["attempts"]) for entry in failed] == [("a_task_demo.hdf5", "demo_1", 2)]
+
+        with open(os.path.join(output_dir, "meta", "episodes.jsonl")) as f:
+            episodes = [json.loads(line) for line in f]
+        assert [episode["episode_index"] for episode in episodes] == [0, 1, 2, 3]
+        assert [episode["length"] for episode in episodes] == [4, 6, 3, 4]
+
+        # Files follow the new indices and chunks, and the parquet column matches the file name
+        parquet_paths = sorted(glob.glob(os.path.join(output_dir, "data", "*", "*.parquet")))
+        assert [os.path.relpath(path, os.path.join(output_dir, "data")) for path in parquet_paths] == [
+            os.path.join(f"chunk-{i // 2:03d}", f"episode_{i:06d}.parquet") for i in range(4)]
+        assert sorted(os.listdir(os.path.join(output_dir, "data"))) == ["chunk-000", "chunk-001"]
+        for i, parquet_path in enumerate(parquet_paths):
+            assert set(pd.read_parquet(parquet_path)["episode_index"]) == {i}
+        image_names = os.listdir(os.path.join(output_dir, "images", "agentview"))
+        assert sorted({name.split("_timestamp")[0] for name in image_names}) == [f"episode_{i:06d}" for i in range(4)]
+        assert len(image_names) == 4 + 6 + 3 + 4
+
+        with open(os.path.join(output_dir, "meta", "info.json")) as f:
+            info = json.load(f)
+        assert info["total_episodes"] == 4 and info["splits"] == {"train": "0:4"}
+        assert info["total_chunks"] == 2 and info["chunks_size"] == 2
+
+    print("✅ Failed demo quarantined, episode indices stay contiguous")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_quarantine_and_compaction()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Failed episode test passed!")
+    else:
+        print("❌ Failed episode test failed.")
+
+    sys.exit(0 if success else 1)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the shared-memory frame transport to encoder processes.
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from test_failed_episodes import create_libero_hdf5
+
+
+def test_frame_ring():
+    """Test that frames round-trip through ring slots and slots are recycled."""
+    import queue
+    from utils.frame_transport import FrameRing
+
+    ring = FrameRing(num_slots=2, slot_bytes=1024)
+    try:
+        frames = {"agentview_rgb": np.arange(5 * 4 * 4 * 3, dtype=np.uint8).reshape(5, 4, 4, 3),
+                  "agentview_depth": np.full((5, 4, 4), 1234, dtype=np.uint16)}
+        assert ring.fits(frames)
+        assert not ring.fits({"big": np.zeros(2048, dtype=np.uint8)})
+
+        slot = ring.acquire(timeout=1)
+        descriptor = ring.write(slot, frames)
+        views = ring.view(descriptor)
+        assert all(np.array_equal(views[name], frames[name]) and views[name].dtype == frames[name].dtype
+                   for name in frames)
+        assert all(offset % 64 == 0 for _, _, _, offset in descriptor["arrays"])
+        del views
+
+        # Both slots taken: acquire waits until one is released
+        other = ring.acquire(timeout=1)
+        try:
+            ring.acquire(timeout=0.1)
+            assert False, "acquired more slots than the ring has"
+        except queue.Empty:
+            pass
+        ring.release(slot)
+        assert ring.acquire(timeout=1) == slot
+        ring.release(slot)
+        ring.release(other)
+    finally:
+        ring.close()
+
+    print("✅ Frames round-trip through recycled ring slots")
+    return True
+
+
+def test_encoder_processes_match_in_process():
+    """Test that encoding in encoder processes writes the same dataset as encoding in-process."""
+    from utils.batch_processor import process_all_hdf5_files
+    from config import get_default_config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        os.makedirs(input_dir)
+        create_libero_hdf5(os.path.join(input_dir, "a_task_demo.hdf5"), [4, 6, 5], depth=True)
+
+        outputs = {}
+        for encoder_processes in [0, 2]:
+            output_dir = os.path.join(temp_dir, f"output_{encoder_processes}")
+            config = dict(get_default_config(), enable_progress_bars=False, write_threads=0,
+                          encoder_processes=encoder_processes, encoder_ring_slots=2)
+            process_all_hdf5_files(input_dir, output_dir,
+                                   variants=[{"output_dir": output_dir, "image_height": 8, "image_width": 8}],
+                                   config=config)
+            files = {}
+            for root, _, names in os.walk(output_dir):
+                for name in names:
+                    path = os.path.join(root, name)
+                    files[os.path.relpath(path, output_dir)] = path
+            outputs[encoder_processes] = files
+
+        assert sorted(outputs[0]) == sorted(outputs[2])
+        assert sum(name.endswith(".mp4") for name in outputs[2]) == 3 * 3
+        assert sum(name.endswith(".png") for name in outputs[2]) == 15 * 3
+        for name, path in outputs[0].items():
+            if name.endswith(".parquet") or name.endswith(".png"):
+                with open(path, 'rb') as a, open(outputs[2][name], 'rb') as b:
+                    assert a.read() == b.read(), name
+
+    print("✅ Encoder processes write the same dataset as in-process encoding")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_frame_ring() and test_encoder_processes_match_in_process()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Frame transport tests passed!")
+    else:
+        print("❌ Frame transport tests failed.")
+
+    sys.exit(0 if success else 1)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the LeRobot to HDF5 export round trip.
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from test_failed_episodes import create_libero_hdf5
+
+
+def test_export_round_trip():
+    """Test that an exported dataset has the source layout and converts back to the same table."""
+    import h5py
+    import pandas as pd
+    from utils.batch_processor import process_all_hdf5_files
+    from utils.hdf5_export import export_to_hdf5
+    from config import get_default_config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        output_dir = os.path.join(temp_dir, "output")
+        export_dir = os.path.join(temp_dir, "export")
+        reconverted_dir = os.path.join(temp_dir, "reconverted")
+        os.makedirs(input_dir)
+        create_libero_hdf5(os.path.join(input_dir, "a_task_demo.hdf5"), [4, 5], image_size=16, depth=True)
+        create_libero_hdf5(os.path.join(input_dir, "b_task_demo.hdf5"), [3], image_size=16, depth=True)
+
+        config = dict(get_default_config(), enable_progress_bars=False, write_threads=0,
+                      state_keys=["ee_pos", "ee_ori", "gripper_states"], state_columns=["joint_states", "ee_states"])
+        variants = [{"output_dir": output_dir, "image_height": 16, "image_width": 16}]
+        process_all_hdf5_files(input_dir, output_dir, variants=variants, config=config)
+
+        results = export_to_hdf5(output_dir, export_dir, compression="gzip", compression_level=1, workers=2)
+        assert [os.path.basename(result["hdf5_file"]) for result in results] == ["a_task_demo.hdf5", "b_task_demo.hdf5"]
+        assert [result["num_demos"] for result in results] == [2, 1]
+
+        with h5py.File(os.path.join(input_dir, "a_task_demo.hdf5"), 'r') as source, \
+                h5py.File(os.path.join(export_dir, "a_task_demo.hdf5"), 'r') as exported:
+            for name in ["actions", "rewards", "obs/ee_pos", "obs/ee_ori", "obs/gripper_states", "obs/joint_states", "obs/ee_states"]:
+                assert np.allclose(exported["data/demo_1"][name][:], source["data/demo_1"][name][:]), name
+            assert np.array_equal(exported["data/demo_1/dones"][:], source["data/demo_1/dones"][:])
+            assert np.allclose(exported["data/demo_1/obs/agentview_depth"][:], source["data/demo_1/obs/agentview_depth"][:], atol=1e-3)
+
+            rgb = exported["data/demo_1/obs/agentview_rgb"]
+            assert rgb.shape == (5, 16, 16, 3) and rgb.dtype == np.uint8
+            assert rgb.chunks == (1, 16, 16, 3) and rgb.compression == "gzip"
+            assert exported["data/demo_1"].attrs["num_samples"] == 5
+
+        # The exported files are valid converter input
+        process_all_hdf5_files(export_dir, reconverted_dir,
+                               variants=[{"output_dir": reconverted_dir, "save_images": False, "save_videos": False}],
+                               config=config)
+        for episode_name in ["episode_000000.parquet", "episode_000002.parquet"]:
+            original = pd.read_parquet(os.path.join(output_dir, "data", "chunk-000", episode_name))
+            reconverted = pd.read_parquet(os.path.join(reconverted_dir, "data", "chunk-000", episode_name))
+            for column in ["observation.state", "action", "observation.joint_states", "next.reward", "task_index"]:
+                assert np.allclose(np.stack(reconverted[column]), np.stack(original[column])), column
+
+    print("✅ Exported HDF5 files round-trip through the converter")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_export_round_trip()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 HDF5 export test passed!")
+    else:
+        print("❌ HDF5 export test failed.")
+
+    sys.exit(0 if success else 1)
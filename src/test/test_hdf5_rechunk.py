@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the source HDF5 rechunking tool.
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from test_failed_episodes import create_libero_hdf5
+
+
+def test_rechunk_keeps_data():
+    """Test that rechunked files hold the same data and attributes with frame-aligned chunks."""
+    import h5py
+    from utils.hdf5_rechunk import rechunk_hdf5_files
+    from utils.inventory import scan_hdf5_file
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        output_dir = os.path.join(temp_dir, "output")
+        os.makedirs(input_dir)
+        hdf5_files = [os.path.join(input_dir, f"{name}_demo.hdf5") for name in ["a_task", "b_task"]]
+        create_libero_hdf5(hdf5_files[0], [4, 6], image_size=16, depth=True)
+        create_libero_hdf5(hdf5_files[1], [3], image_size=16)
+
+        results = rechunk_hdf5_files(hdf5_files, output_dir, compression="gzip", compression_level=1, workers=2)
+        assert [os.path.basename(result["output_file"]) for result in results] == ["a_task_demo.hdf5", "b_task_demo.hdf5"]
+        assert all(result["read_before"]["bytes"] == result["read_after"]["bytes"] > 0 for result in results)
+
+        with h5py.File(hdf5_files[0], 'r') as source, h5py.File(results[0]["output_file"], 'r') as target:
+            assert target["data"].attrs["problem_info"] == source["data"].attrs["problem_info"]
+            for name in ["actions", "dones", "obs/agentview_rgb", "obs/agentview_depth", "obs/joint_states"]:
+                assert np.array_equal(target["data/demo_1"][name][:], source["data/demo_1"][name][:]), name
+                assert target["data/demo_1"][name].dtype == source["data/demo_1"][name].dtype
+            assert target["data/demo_1/obs/agentview_rgb"].chunks == (1, 16, 16, 3)
+            assert target["data/demo_1/actions"].chunks == (6, 7)
+            assert target["data/demo_1/actions"].compression == "gzip"
+
+        # The inventory still sees the same demos, and rewriting in place works
+        assert scan_hdf5_file(results[1]["output_file"])["demos"] == scan_hdf5_file(hdf5_files[1])["demos"]
+        rechunk_hdf5_files(hdf5_files[1:], None, compression="lzf", page_size=None, benchmark=False)
+        with h5py.File(hdf5_files[1], 'r') as f:
+            assert f["data/demo_0/obs/eye_in_hand_rgb"].compression == "lzf"
+        assert not os.path.exists(hdf5_files[1] + ".tmp")
+
+    print("✅ Rechunked files keep their data with frame-aligned chunks")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_rechunk_keeps_data()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 HDF5 rechunk test passed!")
+    else:
+        print("❌ HDF5 rechunk test failed.")
+
+    sys.exit(0 if success else 1)
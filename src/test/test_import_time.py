@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark the startup cost of the converter with `python -X importtime`.
+
+Importing the utils package must stay cheap because it happens in every worker
+process; h5py, pandas, cv2, PIL and tqdm are only imported by the stages using them.
+"""
+
+import sys
+import os
+import subprocess
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+SRC_DIR = str(Path(__file__).parent.parent)
+HEAVY_MODULES = ["h5py", "pandas", "cv2", "PIL", "tqdm"]
+
+
+def measure_import_time(statement):
+    """Run an import statement with -X importtime, return {module: cumulative microseconds}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=SRC_DIR, capture_output=True, text=True, check=True
+    )
+    
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if cumulative.strip().isdigit():
+            timings[module.strip()] = int(cumulative.strip())
+    return timings
+
+
+def test_lazy_startup():
+    """Test that importing the converter modules does not import the heavy libraries."""
+    print("Benchmarking converter startup...")
+    print("=" * 60)
+    
+    for statement in ["import utils", "import utils.batch_processor", "import batch_converter"]:
+        timings = measure_import_time(statement)
+        module = statement.split()[-1]
+        heavy = [name for name in timings if name.split(".")[0] in HEAVY_MODULES]
+        
+        print(f"  {statement}: {timings.get(module, 0) / 1000:.1f} ms")
+        if heavy:
+            print(f"❌ {statement} imported heavy modules: {sorted(set(name.split('.')[0] for name in heavy))}")
+        assert not heavy, f"{statement} imported {heavy}"
+    
+    print("✅ No heavy modules imported at startup")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_lazy_startup()
+    
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Startup benchmark passed!")
+    else:
+        print("❌ Startup benchmark failed.")
+    
+    sys.exit(0 if success else 1)
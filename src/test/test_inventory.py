@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the metadata-only HDF5 inventory.
+"""
+
+import sys
+import os
+import json
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+def create_test_hdf5(path, demo_lengths):
+    """Create a small LIBERO-style HDF5 file with the given demo lengths."""
+    import h5py
+    import numpy as np
+    
+    with h5py.File(path, 'w') as f:
+        data_group = f.create_group("data")
+        data_group.attrs["problem_info"] = json.dumps({"language_instruction": "pick up the milk"})
+        for i, length in enumerate(demo_lengths):
+            demo_group = data_group.create_group(f"demo_{i}")
+            demo_group.create_dataset("actions", data=np.zeros((length, 7)))
+            demo_group.create_dataset("obs/agentview_rgb", data=np.zeros((length, 8, 8, 3), dtype=np.uint8),
+                                      chunks=(1, 8, 8, 3), compression="gzip")
+
+
+def test_inventory_totals():
+    """Test that the inventory counts demos, frames and bytes from metadata."""
+    from utils.inventory import build_inventory
+    
+    print("Testing HDF5 inventory...")
+    print("=" * 60)
+    
+    import tempfile
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = [os.path.join(temp_dir, "a_demo.hdf5"), os.path.join(temp_dir, "b_demo.hdf5")]
+        create_test_hdf5(paths[0], [5, 7])
+        create_test_hdf5(paths[1], [3])
+        
+        inventory = build_inventory(paths, num_workers=2)
+    
+    assert inventory["num_files"] == 2
+    assert inventory["total_demos"] == 3
+    assert inventory["total_frames"] == 15
+    assert inventory["max_demo_frames"] == 7
+    assert inventory["bytes_per_dataset"]["obs/agentview_rgb"] == 15 * 8 * 8 * 3
+    
+    layout = inventory["files"][0]["datasets"]["obs/agentview_rgb"]
+    assert layout["chunks"] == [1, 8, 8, 3]
+    assert layout["compression"] == "gzip"
+    assert inventory["files"][0]["task"]["language_instruction"] == "pick up the milk"
+    
+    print(f"✅ {inventory['total_demos']} demos, {inventory['total_frames']} frames")
+    print(f"✅ agentview_rgb layout: {layout}")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_inventory_totals()
+    
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Inventory test passed!")
+    else:
+        print("❌ Inventory test failed.")
+    
+    sys.exit(0 if success else 1)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that the memory governor sizes and adapts the conversion to a RAM budget.
+"""
+
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from test_failed_episodes import create_libero_hdf5
+
+
+def test_plan_memory():
+    """Test that workers and in-flight buffers are sized from the largest demo."""
+    from utils.memory_governor import plan_memory, parse_memory_size, WORKER_BASE_BYTES, EPISODE_MEMORY_FACTOR
+    from config import get_default_config
+
+    assert parse_memory_size("16G") == 16 * 1024 ** 3 and parse_memory_size("512MiB") == 512 * 1024 ** 2
+    assert parse_memory_size("1000") == 1000
+
+    mb = 1024 ** 2
+    inventory = {"files": [{"demos": [{"num_bytes": 50 * mb}, {"num_bytes": 100 * mb}]}]}
+    min_worker_bytes = WORKER_BASE_BYTES + 100 * mb * (EPISODE_MEMORY_FACTOR + 1)
+    config = dict(get_default_config(), workers=8, encoder_processes=0,
+                  max_inflight_write_bytes=256 * mb, episode_cache_bytes=512 * mb)
+
+    # Room for three minimal workers: no spare memory for queued writes or the cache
+    memory_plan = plan_memory(inventory, dict(config, memory_budget_bytes=3 * min_worker_bytes + mb))
+    assert memory_plan["workers"] == 3 and memory_plan["episode_bytes"] == 100 * mb
+    assert memory_plan["max_inflight_write_bytes"] == 100 * mb + mb // 3 and memory_plan["episode_cache_bytes"] == 0
+
+    # A generous budget keeps the configured limits
+    memory_plan = plan_memory(inventory, dict(config, workers=2, memory_budget_bytes=64 * 1024 ** 3))
+    assert memory_plan["workers"] == 2
+    assert memory_plan["max_inflight_write_bytes"] == 256 * mb and memory_plan["episode_cache_bytes"] == 512 * mb
+
+    # Too small for one worker still converts
+    assert plan_memory(inventory, dict(config, memory_budget_bytes=mb))["workers"] == 1
+
+    print("✅ Workers and buffers sized to the memory budget")
+    return True
+
+
+def test_governor_adapts():
+    """Test that the worker limit follows the measured memory."""
+    from utils.memory_governor import MemoryGovernor
+
+    class FakeGovernor(MemoryGovernor):
+        def sample(self, running):
+            self.worker_peak_bytes = 100
+            return self.measured
+
+    governor = FakeGovernor(1000, max_workers=4, initial_workers=3)
+    governor.measured = 950
+    assert governor.get_worker_limit(3) == 2
+    assert governor.get_worker_limit(3) == 2  # no further drop while a file above the limit still runs
+    assert governor.get_worker_limit(2) == 1  # until it finishes
+    assert governor.get_worker_limit(1) == 1  # never below one worker
+    governor.measured = 500
+    assert governor.get_worker_limit(1) == 2
+    assert governor.get_worker_limit(1) == 2  # only grows while the workers are busy
+    governor.measured = 650
+    assert governor.get_worker_limit(2) == 2  # no room for another worker below the low watermark
+
+    assert MemoryGovernor(10 ** 12, 2, 2).sample(0) is None or MemoryGovernor(10 ** 12, 2, 2).sample(0) > 0
+
+    print("✅ Worker limit adapts to the resident memory")
+    return True
+
+
+def test_conversion_with_memory_budget():
+    """Test that a budgeted multi-worker conversion converts every episode."""
+    from utils.batch_processor import process_all_hdf5_files
+    from config import get_default_config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        output_dir = os.path.join(temp_dir, "output")
+        os.makedirs(input_dir)
+        for task_name, demo_lengths in [("a_task", [4, 5]), ("b_task", [6]), ("c_task", [3, 3])]:
+            create_libero_hdf5(os.path.join(input_dir, f"{task_name}_demo.hdf5"), demo_lengths)
+
+        config = dict(get_default_config(), enable_progress_bars=False, enable_image_saving=False,
+                      workers=2, memory_budget_bytes=8 * 1024 ** 3)
+        process_all_hdf5_files(input_dir, output_dir, config=config)
+
+        with open(os.path.join(output_dir, "meta", "info.json")) as f:
+            info = json.load(f)
+        assert info["total_episodes"] == 5 and info["total_frames"] == 21
+
+    print("✅ Budgeted conversion converted every episode")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_plan_memory() and test_governor_adapts() and test_conversion_with_memory_budget()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Memory governor tests passed!")
+    else:
+        print("❌ Memory governor tests failed.")
+
+    sys.exit(0 if success else 1)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script to verify output variant handling.
+"""
+
+import sys
+import os
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+def test_default_variant():
+    """Test that a single default variant is created when none are configured."""
+    from utils.variants import normalize_variants
+
+    print("Testing default variant...")
+    print("=" * 60)
+
+    variants = normalize_variants("/tmp/lerobot_output", [])
+
+    assert len(variants) == 1
+    assert variants[0]["output_dir"] == "/tmp/lerobot_output"
+    assert variants[0]["save_images"] is True
+
+    print(f"✅ Default variant: {variants[0]}")
+    return True
+
+
+def test_named_variants():
+    """Test that named variants get their own output directories and settings."""
+    from utils.variants import normalize_variants, get_variant_video_info
+
+    print("\nTesting named variants...")
+    print("=" * 60)
+
+    variants = normalize_variants("/tmp/lerobot_output", [
+        {"name": "full"},
+        {"name": "small", "image_height": 64, "image_width": 64, "video_codec": "FFV1", "save_images": False},
+    ])
+
+    assert [v["output_dir"] for v in variants] == ["/tmp/lerobot_output/full", "/tmp/lerobot_output/small"]
+    assert get_variant_video_info(variants[1]) == {"shape": [64, 64, 3], "codec": "ffv1", "crf": None}
+
+    try:
+        normalize_variants("/tmp/lerobot_output", [{"name": "a", "output_dir": "/tmp/x"}, {"name": "b", "output_dir": "/tmp/x"}])
+    except ValueError as e:
+        print(f"✅ Duplicate output directories rejected: {e}")
+    else:
+        print("❌ Duplicate output directories were accepted")
+        return False
+
+    for variant in variants:
+        print(f"✅ {variant['name']}: {variant['output_dir']}")
+    return True
+
+
+def test_resize_frames():
+    """Test that frame stacks are resized and untouched when already the right size."""
+    import numpy as np
+    from utils.image_processing import resize_frames
+
+    print("\nTesting frame resizing...")
+    print("=" * 60)
+
+    frames = np.zeros((4, 128, 128, 3), dtype=np.uint8)
+
+    assert resize_frames(frames, 128, 128) is frames
+    assert resize_frames(frames, 64, 32).shape == (4, 64, 32, 3)
+
+    print("✅ Frame stacks resized correctly")
+    return True
+
+
+def main():
+    """Run all tests."""
+    success = True
+
+    for test in (test_default_variant, test_named_variants, test_resize_frames):
+        if not test():
+            success = False
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 All output variant tests passed!")
+    else:
+        print("❌ Some tests failed.")
+
+    return success
+
+
+if __name__ == "__main__":
+    main()
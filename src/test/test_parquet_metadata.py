@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the statistics, page index, bloom filters and metadata of episode parquet files.
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from test_failed_episodes import create_libero_hdf5
+
+
+def test_episode_parquet_metadata():
+    """Test that episode files carry filter metadata and meta/_metadata prunes by task."""
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from utils.batch_processor import process_all_hdf5_files
+    from utils.parquet_writer import supports_bloom_filters, supports_page_index, supports_sorting_columns
+    from config import get_default_config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        output_dir = os.path.join(temp_dir, "output")
+        os.makedirs(input_dir)
+        create_libero_hdf5(os.path.join(input_dir, "a_task_demo.hdf5"), [4, 5])
+        create_libero_hdf5(os.path.join(input_dir, "b_task_demo.hdf5"), [6, 7, 8], broken_demos=[1])
+
+        config = dict(get_default_config(), enable_progress_bars=False, enable_video_creation=False,
+                      enable_image_saving=False, max_retries=0, retry_delay=0)
+        process_all_hdf5_files(input_dir, output_dir, config=config)
+
+        # b_task demo_2 was renumbered from episode 4 to 3 by the compaction
+        parquet_file = pq.ParquetFile(os.path.join(output_dir, "data", "chunk-000", "episode_000003.parquet"))
+        metadata = parquet_file.schema_arrow.metadata
+        assert metadata[b"episode_index"] == b"3" and metadata[b"task_index"] == b"1"
+        assert metadata[b"task_name"] == b"b_task" and metadata[b"length"] == b"8"
+        assert metadata[b"source_file"] == b"b_task_demo.hdf5" and metadata[b"source_demo"] == b"demo_2"
+
+        row_group = parquet_file.metadata.row_group(0)
+        if supports_sorting_columns():
+            assert row_group.sorting_columns[0].column_index == parquet_file.schema_arrow.get_field_index("index")
+        columns = {row_group.column(i).path_in_schema: row_group.column(i) for i in range(row_group.num_columns)}
+        assert columns["episode_index"].statistics.min == columns["episode_index"].statistics.max == 3
+        if supports_page_index():
+            assert columns["task_index"].has_column_index and columns["task_index"].has_offset_index
+        if supports_bloom_filters():
+            assert columns["episode_index"].bloom_filter_length > 0 and columns["task_index"].bloom_filter_length > 0
+
+        # The summary file alone is enough to find the frames of a task
+        dataset = ds.parquet_dataset(os.path.join(output_dir, "meta", "_metadata"))
+        matching = [fragment for fragment in dataset.get_fragments()
+                    if fragment.subset(ds.field("task_index") == 1).num_row_groups]
+        assert sorted(os.path.basename(fragment.path) for fragment in matching) == \
+            ["episode_000002.parquet", "episode_000003.parquet"]
+        assert dataset.to_table(filter=ds.field("task_index") == 1).num_rows == 6 + 8
+
+    print("✅ Episode parquet files carry statistics, page index, bloom filters and metadata")
+    return True
+
+
+def test_write_options_on_older_pyarrow():
+    """Test that options the installed pyarrow lacks are left out instead of failing every write."""
+    import io
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import utils.parquet_writer as parquet_writer
+
+    table = pa.table({"index": [0, 1], "episode_index": [3, 3], "task_index": [1, 1]})
+    original = parquet_writer.get_parquet_writer_options
+    # The writer options of pyarrow 10
+    parquet_writer.get_parquet_writer_options = lambda: frozenset(["compression", "write_statistics"])
+    try:
+        options = parquet_writer.get_parquet_write_options(table)
+    finally:
+        parquet_writer.get_parquet_writer_options = original
+    assert set(options) == {"compression", "write_statistics"}
+
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, **options)
+    assert pq.read_table(io.BytesIO(buffer.getvalue())).equals(table)
+
+    print("✅ Parquet options limited to what pyarrow supports")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_episode_parquet_metadata() and test_write_options_on_older_pyarrow()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Parquet metadata test passed!")
+    else:
+        print("❌ Parquet metadata test failed.")
+
+    sys.exit(0 if success else 1)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the episode preview mosaics, GIFs and HTML index.
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from test_failed_episodes import create_libero_hdf5
+
+
+def test_mosaic_layout():
+    """Test that the mosaic has one row per camera and one column per sampled frame."""
+    from utils.previews import build_mosaic, build_gif_frames, get_strided_indices
+
+    assert get_strided_indices(10, 4).tolist() == [0, 3, 6, 9]
+    assert get_strided_indices(3, 8).tolist() == [0, 1, 2]
+
+    tiles = np.random.default_rng(0).integers(0, 255, (2, 3, 4, 5, 3), dtype=np.uint8)
+    mosaic = build_mosaic(tiles)
+    assert mosaic.shape == (2 * 4, 3 * 5, 3)
+    assert np.array_equal(mosaic[4:8, 10:15], tiles[1, 2])
+
+    gif_frames = build_gif_frames(tiles)
+    assert gif_frames.shape == (3, 4, 2 * 5, 3)
+    assert np.array_equal(gif_frames[2, :, 5:10], tiles[1, 2])
+
+    print("✅ Preview tiles laid out in one reshape")
+    return True
+
+
+def test_previews_written():
+    """Test that previews follow the renumbered episodes and are listed in the index."""
+    from PIL import Image
+    from utils.batch_processor import process_all_hdf5_files
+    from config import get_default_config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        output_dir = os.path.join(temp_dir, "output")
+        os.makedirs(input_dir)
+        create_libero_hdf5(os.path.join(input_dir, "a_task_demo.hdf5"), [4, 12, 6], broken_demos=[1])
+
+        config = dict(get_default_config(), enable_progress_bars=False, enable_video_creation=False,
+                      enable_image_saving=False, max_retries=0, retry_delay=0,
+                      previews=True, preview_gif=True, preview_frames=4, preview_tile_size=16, preview_gif_fps=10.0)
+        process_all_hdf5_files(input_dir, output_dir, config=config)
+
+        previews_dir = os.path.join(output_dir, "previews")
+        assert sorted(os.listdir(previews_dir)) == ["episode_000000.gif", "episode_000000.jpg",
+                                                    "episode_000001.gif", "episode_000001.jpg", "index.html"]
+
+        # demo_2 (6 frames) became episode 1: two camera rows of four frames, a GIF of every other frame
+        with Image.open(os.path.join(previews_dir, "episode_000001.jpg")) as mosaic:
+            assert mosaic.size == (4 * 16, 2 * 16)
+        with Image.open(os.path.join(previews_dir, "episode_000001.gif")) as gif:
+            assert gif.size == (2 * 16, 16) and gif.n_frames == 3
+
+        with open(os.path.join(previews_dir, "index.html")) as f:
+            index = f.read()
+        assert 'src="episode_000000.jpg"' in index and 'src="episode_000001.jpg"' in index
+        assert "6 frames" in index
+
+    print("✅ Previews written and indexed")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_mosaic_layout() and test_previews_written()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Preview tests passed!")
+    else:
+        print("❌ Preview tests failed.")
+
+    sys.exit(0 if success else 1)
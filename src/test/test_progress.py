@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that the frame progress counters add up to the planned frames.
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from test_failed_episodes import create_libero_hdf5
+
+
+def run_monitored(input_dir, output_dir, config):
+    """Convert and return the final counters and total of the conversion's ProgressMonitor."""
+    import utils.batch_processor as batch_processor
+    from utils.batch_processor import process_all_hdf5_files
+    from utils.progress import ProgressMonitor, read_progress
+
+    monitors = []
+
+    class RecordingMonitor(ProgressMonitor):
+        def __enter__(self):
+            monitors.append(self)
+            return super().__enter__()
+
+    original = batch_processor.ProgressMonitor
+    batch_processor.ProgressMonitor = RecordingMonitor
+    try:
+        process_all_hdf5_files(input_dir, output_dir, config=config)
+    finally:
+        batch_processor.ProgressMonitor = original
+    return read_progress(monitors[0].counters), monitors[0].total_frames
+
+
+def test_final_counters():
+    """Test that converted, relinked and quarantined demos account for every planned frame."""
+    from config import get_default_config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        output_dir = os.path.join(temp_dir, "output")
+        os.makedirs(input_dir)
+        create_libero_hdf5(os.path.join(input_dir, "a_task_demo.hdf5"), [4, 5, 6], broken_demos=(1,))
+        create_libero_hdf5(os.path.join(input_dir, "b_task_demo.hdf5"), [3])
+
+        # The broken demo is retried once and quarantined: its frames leave the total, none are read twice
+        config = dict(get_default_config(), enable_progress_bars=False, enable_image_saving=False,
+                      enable_video_creation=False, max_retries=1, retry_delay=0.0, blob_store=True)
+        progress, total_frames = run_monitored(input_dir, output_dir, config)
+        assert total_frames == 18
+        assert progress["skipped"]["frames"] == 5
+        assert progress["episodes"]["frames"] == progress["read"]["frames"] == 13
+
+        # A re-run relinks every converted episode without reading it
+        progress, total_frames = run_monitored(input_dir, output_dir, config)
+        assert progress["episodes"]["frames"] == 13 and progress["read"]["frames"] == 0
+        assert progress["episodes"]["frames"] == total_frames - progress["skipped"]["frames"]
+
+    print("✅ Progress counters reach the planned frames")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_final_counters()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Progress tests passed!")
+    else:
+        print("❌ Progress tests failed.")
+
+    sys.exit(0 if success else 1)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the configurable composition of observation.state.
+"""
+
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from test_failed_episodes import create_libero_hdf5
+
+
+def test_build_episode_table():
+    """Test that the episode table is built column-wise with fixed-size list vectors."""
+    import pyarrow as pa
+    from utils.hdf5_processor import build_episode_table, compose_state
+
+    actions = np.arange(12, dtype=np.float64).reshape(4, 3)
+    state = compose_state({"ee_pos": np.ones((4, 3), dtype=np.float32), "gripper_states": np.zeros((4, 2))},
+                          ["gripper_states", "ee_pos"])
+    assert state.shape == (4, 5) and state.dtype == np.float64
+    assert state[0].tolist() == [0, 0, 1, 1, 1]
+
+    table = build_episode_table(actions, np.array([0, 0, 0, 1.0]), np.array([0, 0, 0, 1], dtype=np.uint8), 7, 2, state)
+    assert table.num_rows == 4
+    assert table.schema.field("observation.state").type == pa.list_(pa.float64(), 5)
+    assert table.column("action").to_pylist()[1] == [3.0, 4.0, 5.0]
+    assert table.column("index").to_pylist() == [0, 1, 2, 3]
+    assert table.column("episode_index").to_pylist() == [7] * 4
+    assert table.column("next.done").to_pylist() == [False, False, False, True]
+    assert np.allclose(table.column("timestamp").to_numpy(), [0.0, 0.05, 0.1, 0.15])
+
+    print("✅ Episode table built from whole arrays")
+    return True
+
+
+def test_configured_state_keys():
+    """Test that the configured keys are concatenated in order and described in modality.json."""
+    import h5py
+    import pandas as pd
+    from utils.batch_processor import process_all_hdf5_files
+    from config import get_default_config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        output_dir = os.path.join(temp_dir, "output")
+        os.makedirs(input_dir)
+        hdf5_path = os.path.join(input_dir, "a_task_demo.hdf5")
+        create_libero_hdf5(hdf5_path, [4, 5])
+
+        config = dict(get_default_config(), enable_progress_bars=False, enable_video_creation=False,
+                      enable_image_saving=False, write_threads=0,
+                      state_keys=["ee_pos", "gripper_states"], state_columns=["joint_states"])
+        process_all_hdf5_files(input_dir, output_dir,
+                               variants=[{"output_dir": output_dir, "image_height": 8, "image_width": 8}], config=config)
+
+        df = pd.read_parquet(os.path.join(output_dir, "data", "chunk-000", "episode_000001.parquet"))
+        with h5py.File(hdf5_path, 'r') as f:
+            obs = f["data/demo_1/obs"]
+            expected_state = np.concatenate([obs["ee_pos"][:], obs["gripper_states"][:]], axis=1)
+            expected_joints = obs["joint_states"][:]
+        assert np.allclose(np.stack(df["observation.state"]), expected_state)
+        assert np.allclose(np.stack(df["observation.joint_states"]), expected_joints)
+
+        with open(os.path.join(output_dir, "meta", "modality.json")) as f:
+            modality = json.load(f)
+        assert modality["state"] == {
+            "ee_pos": {"start": 0, "end": 3},
+            "gripper_states": {"start": 3, "end": 5},
+            "joint_states": {"start": 0, "end": 7, "original_key": "observation.joint_states"},
+        }
+
+        with open(os.path.join(output_dir, "meta", "info.json")) as f:
+            features = json.load(f)["features"]
+        assert features["observation.state"]["shape"] == [5]
+        assert features["observation.state"]["names"][3] == "gripper_states_0"
+        assert features["observation.joint_states"]["shape"] == [7]
+
+        # Without a layout the metadata describes the joint states and the default cameras
+        import utils
+        modality = utils.create_modality_json()
+        assert modality["state"] == {"joints": {"start": 0, "end": 7}}
+        assert sorted(modality["video"]) == ["agentview_rgb", "eye_in_hand_rgb"]
+        assert len(utils.create_stats_json()["observation.state"]["mean"]) == 7
+
+        # Placeholder stats follow the composed state
+        with open(os.path.join(output_dir, "meta", "stats.json")) as f:
+            stats = json.load(f)
+        assert len(stats["observation.state"]["mean"]) == 5 and len(stats["action"]["mean"]) == 7
+
+        try:
+            process_all_hdf5_files(input_dir, output_dir, config=dict(config, state_keys=["joint_velocities"]))
+            assert False, "unknown state key was accepted"
+        except ValueError:
+            pass
+
+    print("✅ observation.state follows the configured keys")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_build_episode_table() and test_configured_state_keys()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 State composition tests passed!")
+    else:
+        print("❌ State composition tests failed.")
+
+    sys.exit(0 if success else 1)
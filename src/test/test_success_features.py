@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the success index, steps-to-success and discounted return columns.
+"""
+
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from test_failed_episodes import create_libero_hdf5
+
+
+def test_discounted_returns():
+    """Test that the blocked returns match a backward loop, also across block boundaries."""
+    from utils.success_features import get_discounted_returns, parse_discount
+
+    rewards = np.random.default_rng(0).random(1000)
+    # Small discounts need shorter blocks, their powers would underflow within 256 frames
+    for discount in [0.99, 0.5, 1.0, 0.0, 0.05, 1e-5]:
+        expected = np.zeros(len(rewards))
+        running = 0.0
+        for t in reversed(range(len(rewards))):
+            running = rewards[t] + discount * running
+            expected[t] = running
+        assert np.allclose(get_discounted_returns(rewards, discount), expected), discount
+
+    assert parse_discount("0.9") == 0.9
+    for value in ["1.5", "-0.1"]:
+        try:
+            parse_discount(value)
+            assert False, f"discount {value} was accepted"
+        except ValueError:
+            pass
+
+    print("✅ Discounted returns match the recursive definition")
+    return True
+
+
+def test_success_features():
+    """Test the success of sparse-reward episodes, with and without success."""
+    from utils.success_features import compute_success_features
+
+    features = compute_success_features(np.array([0, 0, 1, 1, 0.0]), np.zeros(5), 0.5)
+    assert features["success_index"] == 2
+    assert features["columns"]["next.success"].tolist() == [False, False, True, True, True]
+    assert features["columns"]["steps_to_success"].tolist() == [2, 1, 0, 0, 0]
+    assert np.allclose(features["columns"]["discounted_return"], [0.375, 0.75, 1.5, 1.0, 0.0])
+
+    features = compute_success_features(np.zeros(3), np.zeros(3), 0.5)
+    assert features["success_index"] is None
+    assert not features["columns"]["next.success"].any()
+    assert features["columns"]["steps_to_success"].tolist() == [-1, -1, -1]
+
+    print("✅ Success index and steps to success found without scanning at train time")
+    return True
+
+
+def test_success_columns_written():
+    """Test that conversion writes the success columns and the episodes.jsonl success_index."""
+    import pandas as pd
+    from utils.batch_processor import process_all_hdf5_files
+    from config import get_default_config
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        output_dir = os.path.join(temp_dir, "output")
+        os.makedirs(input_dir)
+        create_libero_hdf5(os.path.join(input_dir, "a_task_demo.hdf5"), [4, 5])
+
+        config = dict(get_default_config(), enable_progress_bars=False, enable_video_creation=False,
+                      enable_image_saving=False, success_features=True, return_discount=0.9)
+        process_all_hdf5_files(input_dir, output_dir, config=config)
+
+        with open(os.path.join(output_dir, "meta", "episodes.jsonl")) as f:
+            episodes = [json.loads(line) for line in f]
+        # The test demos succeed in their last frame
+        assert [episode["success_index"] for episode in episodes] == [3, 4]
+
+        with open(os.path.join(output_dir, "meta", "info.json")) as f:
+            features = json.load(f)["features"]
+        assert features["discounted_return"]["discount"] == 0.9
+
+        df = pd.read_parquet(os.path.join(output_dir, "data", "chunk-000", "episode_000001.parquet"))
+        assert df["steps_to_success"].tolist() == [4, 3, 2, 1, 0]
+        assert df["next.success"].tolist() == [False] * 4 + [True]
+        assert np.allclose(df["discounted_return"], 0.9 ** np.arange(4, -1, -1))
+
+    print("✅ Success columns and episode success index written")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_discounted_returns() and test_success_features() and test_success_columns_written()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("🎉 Success features tests passed!")
+    else:
+        print("❌ Success features tests failed.")
+
+    sys.exit(0 if success else 1)
@@ -117,6 +117,53 @@ def test_actual_files():
     return True
 
 
+def test_task_registry():
+    """Test that the task registry assigns stable, sorted task indices."""
+    from utils.task_registry import build_task_registry, load_task_registry, write_tasks_jsonl
+    from utils.batch_processor import get_task_index
+    
+    print("\nTesting task registry...")
+    print("=" * 60)
+    
+    task_infos = [
+        {"task": "pick_up_the_milk_and_place_it_in_the_basket"},
+        {"task": "pick_up_the_alphabet_soup_and_place_it_in_the_basket"},
+        {"task": "KITCHEN_SCENE10_close_the_top_drawer_of_the_cabinet"},
+    ]
+    registry = build_task_registry(task_infos)
+    
+    expected = [
+        "KITCHEN_SCENE10_close_the_top_drawer_of_the_cabinet",
+        "pick_up_the_alphabet_soup_and_place_it_in_the_basket",
+        "pick_up_the_milk_and_place_it_in_the_basket",
+        "valid",
+    ]
+    assert list(registry) == expected
+    assert [get_task_index(task, registry) for task in expected] == [0, 1, 2, 3]
+    
+    try:
+        get_task_index("unknown_task", registry)
+    except KeyError:
+        print("✅ Unknown tasks are rejected instead of mapped to task 0")
+    else:
+        print("❌ Unknown task was silently mapped to an index")
+        return False
+    
+    # A later run keeps the persisted indices and appends new tasks
+    import tempfile
+    with tempfile.TemporaryDirectory() as temp_dir:
+        write_tasks_jsonl(temp_dir, registry)
+        reloaded = build_task_registry([{"task": "aaa_new_task"}], load_task_registry(temp_dir))
+    
+    assert list(reloaded) == expected + ["aaa_new_task"]
+    assert get_task_index("aaa_new_task", reloaded) == 4
+    
+    for task, entry in reloaded.items():
+        print(f"✅ {entry['task_index']:2d}: {task}")
+    
+    return True
+
+
 def main():
     """Run all tests."""
     success = True
@@ -125,6 +172,10 @@ def main():
     if not test_task_name_extraction():
         success = False
     
+    # Test task registry
+    if not test_task_registry():
+        success = False
+    
     # Test with actual files
     if not test_actual_files():
         success = False
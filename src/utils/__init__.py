@@ -3,60 +3,131 @@ Utils package for the Libero to LeRobot format converter.
 
 This package contains utility modules for file operations, image processing,
 metadata generation, and HDF5 data processing.
+
+The public functions are resolved lazily on first access, so importing the package
+(e.g. in every worker process) does not pull in h5py, pandas, cv2, PIL or tqdm.
 """
 
-from .file_operations import create_directory_structure, ensure_output_directory
-from .image_processing import (
-    save_image_as_png,
-    create_video_from_images,
-    process_episode_images,
-    create_episode_videos
-)
-from .metadata_generator import (
-    create_info_json,
-    create_modality_json,
-    create_stats_json
-)
-from .hdf5_processor import (
-    extract_demo_data,
-    create_timestep_data,
-    process_single_demo_for_chunk,
-    get_demo_keys
-)
-from .batch_processor import (
-    get_hdf5_files,
-    extract_task_name_from_filename,
-    process_single_hdf5_file,
-    process_all_hdf5_files,
-    create_global_metadata
-)
-
-__all__ = [
+import importlib
+
+# Public name -> submodule that defines it
+_LAZY_ATTRIBUTES = {
     # File operations
-    'create_directory_structure',
-    'ensure_output_directory',
-    
+    'create_directory_structure': 'file_operations',
+    'ensure_output_directory': 'file_operations',
+
     # Image processing
-    'save_image_as_png',
-    'create_video_from_images',
-    'process_episode_images',
-    'create_episode_videos',
-    
+    'save_image_as_png': 'image_processing',
+    'create_video_from_images': 'image_processing',
+    'create_video_from_frames': 'image_processing',
+    'resize_frames': 'image_processing',
+    'process_episode_images': 'image_processing',
+    'create_episode_videos': 'image_processing',
+
     # Metadata generation
-    'create_info_json',
-    'create_modality_json',
-    'create_stats_json',
-    
+    'create_info_json': 'metadata_generator',
+    'create_modality_json': 'metadata_generator',
+    'create_stats_json': 'metadata_generator',
+
     # HDF5 processing
-    'extract_demo_data',
-    'create_timestep_data',
-    'process_single_demo_for_chunk',
-    'get_demo_keys',
-    
+    'extract_demo_data': 'hdf5_processor',
+    'get_state_layout': 'hdf5_processor',
+    'compose_state': 'hdf5_processor',
+    'build_episode_table': 'hdf5_processor',
+    'process_single_demo_for_chunk': 'hdf5_processor',
+    'get_demo_keys': 'hdf5_processor',
+
+    # Derived features
+    'compute_derived_features': 'derived_features',
+    'compute_low_dim_stats': 'derived_features',
+    'get_action_chunks': 'derived_features',
+
+    # Success features
+    'compute_success_features': 'success_features',
+    'get_discounted_returns': 'success_features',
+
+    # Episode previews
+    'build_episode_previews': 'previews',
+    'write_preview_index': 'previews',
+
+    # Memory budget
+    'plan_memory': 'memory_governor',
+    'MemoryGovernor': 'memory_governor',
+
     # Batch processing
-    'get_hdf5_files',
-    'extract_task_name_from_filename',
-    'process_single_hdf5_file',
-    'process_all_hdf5_files',
-    'create_global_metadata',
-] 
\ No newline at end of file
+    'get_hdf5_files': 'batch_processor',
+    'extract_task_name_from_filename': 'batch_processor',
+    'process_single_hdf5_file': 'batch_processor',
+    'process_all_hdf5_files': 'batch_processor',
+    'create_global_metadata': 'batch_processor',
+
+    # Output variants
+    'create_variant': 'variants',
+    'normalize_variants': 'variants',
+
+    # Task registry
+    'read_task_info': 'task_registry',
+    'load_task_registry': 'task_registry',
+    'build_task_registry': 'task_registry',
+    'write_tasks_jsonl': 'task_registry',
+
+    # Dataset inventory
+    'scan_hdf5_file': 'inventory',
+    'build_inventory': 'inventory',
+
+    # Write-behind output
+    'AsyncWriter': 'async_writer',
+    'create_async_writer': 'async_writer',
+
+    # Episode cache
+    'EpisodeCache': 'episode_cache',
+    'get_episode_cache': 'episode_cache',
+
+    # Deduplicating output
+    'BlobStore': 'blob_store',
+    'BlobStoreWriter': 'blob_store',
+    'get_blob_store': 'blob_store',
+    'remove_existing_file': 'blob_store',
+
+    # Shared-memory frame transport
+    'FrameRing': 'frame_transport',
+    'FrameEncoderPool': 'frame_transport',
+    'create_encoder_pool': 'frame_transport',
+
+    # HDF5 export
+    'export_task_file': 'hdf5_export',
+    'export_to_hdf5': 'hdf5_export',
+
+    # Parquet output
+    'write_episode_table': 'parquet_writer',
+    'write_parquet_summary': 'parquet_writer',
+
+    # Dataset merge
+    'merge_datasets': 'dataset_merge',
+    'merge_stats': 'dataset_merge',
+
+    # Source rechunking
+    'benchmark_read': 'hdf5_rechunk',
+    'rechunk_hdf5_file': 'hdf5_rechunk',
+    'rechunk_hdf5_files': 'hdf5_rechunk',
+
+    # Subset selection
+    'parse_demo_range': 'episode_plan',
+    'plan_episodes': 'episode_plan',
+    'parse_split_specs': 'episode_plan',
+    'assign_splits': 'episode_plan',
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,132 @@
+import os
+import stat
+import uuid
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+# Mode of newly created files, probed on first use (see get_default_file_mode)
+_default_file_mode = None
+_default_file_mode_lock = threading.Lock()
+
+
+def get_default_file_mode(directory: str) -> int:
+    """
+    Mode a newly created file gets, i.e. 0o666 under the process umask.
+
+    Probed once with a throwaway file in directory rather than through os.umask, which can
+    only be read by changing it for every thread of the process.
+    """
+    global _default_file_mode
+    with _default_file_mode_lock:
+        if _default_file_mode is None:
+            probe_path = os.path.join(directory, f".mode-probe-{uuid.uuid4().hex}")
+            fd = os.open(probe_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+            try:
+                _default_file_mode = stat.S_IMODE(os.fstat(fd).st_mode)
+            finally:
+                os.close(fd)
+                os.remove(probe_path)
+        return _default_file_mode
+
+
+class AsyncWriter:
+    """
+    Write-behind file writer backed by a thread pool.
+
+    Converter stages hand off finished byte buffers (or locally encoded temp files) and
+    continue immediately while the writer threads do the slow open/write/close on the output
+    volume. Hand-offs block once max_inflight_bytes are queued, which bounds the memory held
+    by pending buffers. Every file is written to a .tmp name and renamed into place, so a
+    file that exists is complete. Errors are raised from the next flush().
+    """
+
+    def __init__(self, num_threads: int = 4, max_inflight_bytes: int = 256 * 1024 * 1024):
+        self.max_inflight_bytes = max_inflight_bytes
+        self._executor = ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix="writer")
+        self._condition = threading.Condition()
+        self._inflight_bytes = 0
+        self._pending = 0
+        self._errors: List[BaseException] = []
+
+    def __enter__(self) -> "AsyncWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # Do not mask the original error, but never leave writes running
+            self._executor.shutdown(wait=True)
+
+    def write_bytes(self, path: str, data: bytes) -> None:
+        """Queue data to be written to path."""
+        self._submit(len(data), self._write_bytes, path, data)
+
+    def move_file(self, src_path: str, dst_path: str) -> None:
+        """Queue a move of a finished local file (e.g. an encoded video) to dst_path."""
+        self._submit(os.path.getsize(src_path), self._move_file, src_path, dst_path)
+
+    def submit(self, num_bytes: int, function, *args) -> None:
+        """Queue a custom write function, counted as num_bytes in flight until it returns."""
+        self._submit(num_bytes, function, *args)
+
+    def flush(self) -> None:
+        """Wait until every queued write has reached the output, then raise the first write error."""
+        with self._condition:
+            while self._pending:
+                self._condition.wait()
+            errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0]
+
+    def close(self) -> None:
+        """Flush and stop the writer threads."""
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def _submit(self, num_bytes: int, function, *args) -> None:
+        with self._condition:
+            # A buffer larger than the limit is admitted on its own rather than blocking forever
+            while self._inflight_bytes and self._inflight_bytes + num_bytes > self.max_inflight_bytes:
+                self._condition.wait()
+            self._inflight_bytes += num_bytes
+            self._pending += 1
+        self._executor.submit(self._run, num_bytes, function, *args)
+
+    def _run(self, num_bytes: int, function, *args) -> None:
+        try:
+            function(*args)
+        except BaseException as e:
+            with self._condition:
+                self._errors.append(e)
+        finally:
+            with self._condition:
+                self._inflight_bytes -= num_bytes
+                self._pending -= 1
+                self._condition.notify_all()
+
+    @staticmethod
+    def _write_bytes(path: str, data: bytes) -> None:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _move_file(src_path: str, dst_path: str) -> None:
+        tmp_path = dst_path + ".tmp"
+        shutil.move(src_path, tmp_path)
+        # Local temp files are private (e.g. mkstemp's 0600), outputs get the mode of any written file
+        os.chmod(tmp_path, get_default_file_mode(os.path.dirname(tmp_path)))
+        os.replace(tmp_path, dst_path)
+
+
+def create_async_writer(config: Dict[str, Any]) -> Optional[AsyncWriter]:
+    """Create the writer configured by config["write_threads"], None means synchronous writes."""
+    if not config["write_threads"]:
+        return None
+    return AsyncWriter(config["write_threads"], config["max_inflight_write_bytes"])
@@ -1,42 +1,117 @@
 import os
 import glob
+import time
+import fnmatch
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import ExitStack
 from pathlib import Path
-from typing import List, Dict, Any
-from tqdm import tqdm
+from typing import List, Dict, Any, Optional, Tuple
 from .file_operations import ensure_output_directory
-from .hdf5_processor import get_demo_keys, process_single_demo_for_chunk
-from .metadata_generator import create_info_json, create_modality_json, create_stats_json
-from config import FPS, TIMESTEP_DURATION, IMAGE_HEIGHT, IMAGE_WIDTH, IMAGE_CHANNELS, JOINT_COUNT
+from .hdf5_processor import get_demo_keys, get_state_layout, process_single_demo_for_chunk
+from .metadata_generator import (
+    create_info_json,
+    create_modality_json,
+    create_stats_json,
+    open_partial_episodes_file,
+    append_episode_metadata,
+    merge_partial_episodes,
+    read_partial_episodes,
+    write_partial_episodes,
+    write_failed_episodes
+)
+from .variants import normalize_variants, get_variant_video_info
+from .image_processing import DEFAULT_CAMERA_KEYS, get_camera_keys, get_image_dir_name, get_video_key, is_depth_stream
+from .inventory import build_inventory
+from .episode_plan import plan_episodes
+from .progress import ProgressMonitor, set_progress_counters, record_progress
+from .async_writer import create_async_writer
+from .episode_cache import get_episode_cache
+from .frame_transport import create_encoder_pool, get_episode_frame_bytes
+from .blob_store import BlobStoreWriter, get_blob_store, get_episode_key
+from .parquet_writer import write_parquet_summary
+from .derived_features import validate_derived_features, compute_low_dim_stats, get_derived_features_info
+from .success_features import get_success_features_info
+from .previews import write_preview_index
+from .memory_governor import GOVERNOR_POLL_SECONDS, plan_memory, create_memory_governor
+from .episode_compaction import compact_episodes, remove_episode_files, index_episode_images, remap_split_ranges
+from .task_registry import (
+    extract_task_name_from_filename,
+    read_task_info,
+    load_task_registry,
+    build_task_registry,
+    write_tasks_jsonl
+)
+from config import FPS, TIMESTEP_DURATION, IMAGE_HEIGHT, IMAGE_WIDTH, IMAGE_CHANNELS, JOINT_COUNT, CHUNKS_SIZE, DEPTH_SCALE, get_default_config
 
-def get_hdf5_files(input_dir: str) -> List[str]:
-    """Get all HDF5 files from the input directory."""
+def get_hdf5_files(input_dir: str, include_tasks: Optional[List[str]] = None,
+                   exclude_tasks: Optional[List[str]] = None) -> List[str]:
+    """
+    Get all HDF5 files from the input directory.
+    
+    Args:
+        input_dir (str): Directory containing HDF5 files
+        include_tasks (List[str], optional): Task name globs, only matching files are kept
+        exclude_tasks (List[str], optional): Task name globs, matching files are dropped
+    """
     pattern = os.path.join(input_dir, "*.hdf5")
     hdf5_files = glob.glob(pattern)
+    
+    def matches(hdf5_path: str, task_patterns: List[str]) -> bool:
+        task_name = extract_task_name_from_filename(hdf5_path)
+        return any(fnmatch.fnmatchcase(task_name, task_pattern) for task_pattern in task_patterns)
+    
+    if include_tasks:
+        hdf5_files = [path for path in hdf5_files if matches(path, include_tasks)]
+    if exclude_tasks:
+        hdf5_files = [path for path in hdf5_files if not matches(path, exclude_tasks)]
+    
     # Sort files to ensure consistent ordering
     hdf5_files.sort()
     return hdf5_files
 
 
-def extract_task_name_from_filename(filename: str) -> str:
-    """Extract task name from HDF5 filename."""
-    # Remove path and extension
-    basename = os.path.basename(filename)
-    task_name = basename.replace("_demo.hdf5", "")
-    return task_name
+def resolve_camera_keys(inventory_files: List[Dict[str, Any]],
+                        selected_keys: Optional[List[str]] = None) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Choose the camera streams of a conversion from the obs datasets of every inventoried file.
 
+    Without selected_keys the streams every file has are converted; streams only some files
+    have are dropped with a warning. Selected streams must exist in at least one file, and
+    files that lack one of them are rejected.
 
-def create_chunk_directory_structure(base_dir: str, chunk_index: int) -> str:
-    """Create directory structure for a specific chunk."""
+    Returns:
+        Tuple[List[str], Dict[str, str]]: The camera keys and the path -> error of rejected files
+    """
+    streams_by_file = {
+        entry["file"]: set(get_camera_keys([name[len("obs/"):] for name in entry["datasets"] if name.startswith("obs/")]))
+        for entry in inventory_files
+    }
+    all_streams = set().union(*streams_by_file.values()) if streams_by_file else set()
+    
+    if selected_keys is None:
+        camera_keys = sorted(set.intersection(*streams_by_file.values())) if streams_by_file else []
+        dropped = sorted(all_streams - set(camera_keys))
+        if dropped:
+            print(f"⚠️ Skipping camera streams that not every file has: {', '.join(dropped)}")
+        return camera_keys, {}
+    
+    camera_keys = get_camera_keys(all_streams, selected_keys)
+    rejected = {}
+    for path, streams in streams_by_file.items():
+        missing = [key for key in camera_keys if key not in streams]
+        if missing:
+            rejected[path] = f"ValueError: {os.path.basename(path)} has no camera stream {', '.join(missing)}"
+    return camera_keys, rejected
+
+
+def create_chunk_directory_structure(base_dir: str, chunk_index: int, camera_keys: Optional[List[str]] = None) -> str:
+    """Create directory structure for a specific chunk, with directories for every camera stream."""
     chunk_name = f"chunk-{chunk_index:03d}"
+    camera_keys = DEFAULT_CAMERA_KEYS if camera_keys is None else camera_keys
     
-    dirs = [
-        os.path.join(base_dir, "data", chunk_name),
-        os.path.join(base_dir, "videos", chunk_name, "observation.images.agentview_rgb"),
-        os.path.join(base_dir, "videos", chunk_name, "observation.images.eye_in_hand_rgb"),
-        os.path.join(base_dir, "meta"),
-        os.path.join(base_dir, "images", "agentview"),
-        os.path.join(base_dir, "images", "eye_in_hand")
-    ]
+    dirs = [os.path.join(base_dir, "data", chunk_name), os.path.join(base_dir, "meta")]
+    dirs += [os.path.join(base_dir, "videos", chunk_name, get_video_key(camera_key)) for camera_key in camera_keys]
+    dirs += [os.path.join(base_dir, "images", get_image_dir_name(camera_key)) for camera_key in camera_keys]
     
     for dir_path in dirs:
         os.makedirs(dir_path, exist_ok=True)
@@ -44,126 +119,293 @@ def create_chunk_directory_structure(base_dir: str, chunk_index: int) -> str:
     return chunk_name
 
 
-def get_task_index(task_name: str) -> int:
-    """Get task index based on task name from the tasks.jsonl file."""
-    # This maps task names to their indices as they appear in tasks.jsonl (alphabetically sorted)
-    task_name_to_index = {
-        "pick_up_the_alphabet_soup_and_place_it_in_the_basket": 4,
-        "pick_up_the_bbq_sauce_and_place_it_in_the_basket": 9,
-        "pick_up_the_butter_and_place_it_in_the_basket": 6,
-        "pick_up_the_chocolate_pudding_and_place_it_in_the_basket": 1,
-        "pick_up_the_cream_cheese_and_place_it_in_the_basket": 8,
-        "pick_up_the_ketchup_and_place_it_in_the_basket": 7,
-        "pick_up_the_milk_and_place_it_in_the_basket": 3,
-        "pick_up_the_orange_juice_and_place_it_in_the_basket": 5,
-        "pick_up_the_salad_dressing_and_place_it_in_the_basket": 2,
-        "pick_up_the_tomato_sauce_and_place_it_in_the_basket": 0,
-        "valid": 10
-    }
-    return task_name_to_index.get(task_name, 0)  # Default to 0 if task not found
+def get_task_index(task_name: str, task_registry: Dict[str, Dict[str, Any]]) -> int:
+    """Get task index based on task name from the task registry."""
+    if task_name not in task_registry:
+        raise KeyError(f"Task '{task_name}' is not in the task registry")
+    return task_registry[task_name]["task_index"]
 
 
-def process_single_hdf5_file(hdf5_path: str, output_dir: str, chunk_index: int, 
-                            global_episode_index: int, pbar=None) -> Dict[str, Any]:
+def process_single_hdf5_file(hdf5_path: str, output_dir: str, part_index: int, 
+                            global_episode_index: int, pbar=None,
+                            variants: Optional[List[Dict[str, Any]]] = None,
+                            task_registry: Optional[Dict[str, Dict[str, Any]]] = None,
+                            config: Optional[Dict[str, Any]] = None,
+                            demo_keys: Optional[List[str]] = None) -> Dict[str, Any]:
     """
-    Process a single HDF5 file and create a chunk for it.
+    Process a single HDF5 file (or the demos of it selected for one part of the plan).
+    
+    Every episode goes to chunk episode_index // config["chunks_size"], independent of
+    the source file, so readers can compute paths arithmetically. The converted episodes
+    are listed in the partial episodes file of part_index.
+    
+    Output files go through a write-behind AsyncWriter (unless config["write_threads"] is 0)
+    that is flushed before the episodes are listed in the partial episodes files and before
+    returning, so the part is complete on disk once this function returns.
+    
+    A demo that raises is retried config["max_retries"] times with exponential backoff
+    starting at config["retry_delay"] seconds. If it still fails it is quarantined: listed
+    in the returned "failed_episodes" and skipped, while the file carries on. The gap it
+    leaves in the episode indices is closed by compact_episodes after conversion.
+    
+    With config["encoder_processes"] images and videos are encoded by a FrameEncoderPool fed
+    through shared memory while this process reads the next demos. The pool is waited for
+    at the same flush barrier, and an episode whose encoding failed goes through the retry
+    path again in this process.
+    
+    With config["blob_store"] every file is stored once in the BlobStore under output_dir
+    and hardlinked into place, and a demo whose episode key (source file, settings, indices)
+    was converted before is relinked from the store instead of being read and encoded.
     
     Args:
         hdf5_path (str): Path to the HDF5 file
         output_dir (str): Base output directory
-        chunk_index (int): Index for this chunk
-        global_episode_index (int): Starting episode index for this chunk
+        part_index (int): Index of this part of the episode plan, names its partial episodes file
+        global_episode_index (int): Global episode index of the first demo
         pbar: Optional progress bar for updating progress
+        variants (List[Dict[str, Any]], optional): Output variants, defaults to a single one in output_dir
+        task_registry (Dict[str, Dict[str, Any]], optional): Task registry, built from this file if not given
+        config (Dict[str, Any], optional): Runtime configuration, defaults to get_default_config()
+        demo_keys (List[str], optional): Demos to convert in this order, defaults to all demos of the file
     
     Returns:
-        Dict[str, Any]: Metadata about the processed chunk
+        Dict[str, Any]: Metadata about the processed file
     """
     import h5py
+    from tqdm import tqdm
     
     # print(f"\n{'='*60}")
-    # print(f"Processing chunk {chunk_index:03d}: {os.path.basename(hdf5_path)}")
+    # print(f"Processing {os.path.basename(hdf5_path)}")
     # print(f"{'='*60}")
     
-    # Create chunk-specific directory structure
-    chunk_name = create_chunk_directory_structure(output_dir, chunk_index)
+    if config is None:
+        config = get_default_config()
+    if variants is None:
+        variants = normalize_variants(output_dir, config=config)
+    
+    # Chunks whose directories exist in every variant
+    created_chunks = set()
     
     # Extract task name from filename
     task_name = extract_task_name_from_filename(hdf5_path)
     
     # Get task index based on task name
-    task_index = get_task_index(task_name)
-    
-    # Initialize metadata for this chunk
-    episodes_data = []
-    
-    with h5py.File(hdf5_path, 'r') as f:
+    if task_registry is None:
+        task_registry = build_task_registry([read_task_info(hdf5_path)], load_task_registry(output_dir))
+    task_index = get_task_index(task_name, task_registry)
+    
+    episodes_count = 0
+    total_frames = 0
+    written_indices = []
+    failed_episodes = []
+    episode_metadata_by_index = {}
+    
+    with ExitStack() as partial_files_stack, h5py.File(hdf5_path, 'r') as f:
+        # Episodes are appended to each variant's partial file once their files are written
+        partial_files = [partial_files_stack.enter_context(open_partial_episodes_file(variant["output_dir"], part_index))
+                         for variant in variants]
+        
+        writer = create_async_writer(config)
+        cache = get_episode_cache(config)
+        if cache is not None:
+            # Demos of a converted file are not read again, nor should they fill the spill directory
+            partial_files_stack.callback(cache.discard_source, hdf5_path)
+        store = get_blob_store(output_dir, config)
+        if store is not None:
+            writer = BlobStoreWriter(store, writer)
+        if writer is not None:
+            partial_files_stack.enter_context(writer)
+        pending_episodes = []
+        # Episode key and stored files of the converted episodes, recorded once they are flushed
+        stored_episodes = {}
+        unchanged_count = 0
+        
         # Access the data group
         data_group = f['data']
         
-        # Get all demo keys
-        demo_keys = get_demo_keys(data_group)
+        # Get all demo keys unless a subset was selected
+        if demo_keys is None:
+            demo_keys = get_demo_keys(data_group)
+        
+        # Camera streams of this file, unless the caller fixed them
+        if config["camera_keys"] is None and demo_keys:
+            config = dict(config, camera_keys=get_camera_keys(data_group[demo_keys[0]]['obs'].keys()))
+        
+        # Encoder processes, with ring slots sized for the longest demo of this file
+        encoder = None
+        if config["encoder_processes"] and any(variant["save_images"] or variant["save_videos"] for variant in variants):
+            slot_bytes = get_episode_frame_bytes([data_group[demo_key] for demo_key in demo_keys], config["camera_keys"])
+            encoder = create_encoder_pool(config, slot_bytes, store.store_dir if store is not None else None)
+        if encoder is not None:
+            partial_files_stack.enter_context(encoder)
+        
+        def convert_demo(demo_key, episode_index, chunk_index, encoder):
+            nonlocal unchanged_count
+            # An episode converted before with the same input and settings is only relinked
+            if store is not None:
+                episode_key = get_episode_key(hdf5_path, demo_key, episode_index, task_index, variants, config)
+                episode_metadata = store.restore_episode(episode_key)
+                if episode_metadata is not None:
+                    unchanged_count += 1
+                    record_progress("episodes", episode_metadata["length"])
+                    return episode_metadata, None
+            
+            # Process the demo with global episode index, retrying with backoff
+            for attempt in range(config["max_retries"] + 1):
+                try:
+                    demo_group = data_group[demo_key]
+                    if store is not None:
+                        writer.take_written()  # Files of a failed attempt are not part of the episode
+                    episode_metadata = process_single_demo_for_chunk(demo_group, episode_index, output_dir, chunk_index, task_name, task_index, variants, config, writer, cache, encoder)
+                    if store is not None:
+                        stored_episodes[episode_index] = {"key": episode_key, "files": writer.take_written()}
+                    return episode_metadata, None
+                except Exception as e:
+                    error = e
+                    if attempt < config["max_retries"]:
+                        delay = config["retry_delay"] * 2 ** attempt
+                        print(f"⚠️ {os.path.basename(hdf5_path)} {demo_key} failed ({e}), retrying in {delay:.1f}s")
+                        time.sleep(delay)
+            return None, error
+        
+        def quarantine_demo(demo_key, error):
+            record_progress("skipped", data_group[demo_key]["actions"].shape[0])
+            print(f"❌ Quarantined {os.path.basename(hdf5_path)} {demo_key} after {config['max_retries'] + 1} attempts: {error}")
+            failed_episodes.append({
+                "hdf5_file": os.path.basename(hdf5_path),
+                "demo_key": demo_key,
+                "task_name": task_name,
+                "attempts": config["max_retries"] + 1,
+                "error": f"{type(error).__name__}: {error}",
+            })
+        
+        def append_written_episodes():
+            nonlocal episodes_count, total_frames
+            if encoder is not None:
+                encoded_files = {}
+                encode_errors = encoder.wait(encoded_files)
+                for episode_index, files in encoded_files.items():
+                    if episode_index in stored_episodes:
+                        stored_episodes[episode_index]["files"].update(files)
+                for episode_index, encode_error in encode_errors.items():
+                    print(f"⚠️ Encoding episode {episode_index} failed ({encode_error}), converting it again in-process")
+                    record_progress("episodes", -episode_metadata_by_index[episode_index]["length"])
+                    demo_key = demo_keys[episode_index - global_episode_index]
+                    episode_metadata, error = convert_demo(demo_key, episode_index, episode_index // config["chunks_size"], None)
+                    if error is not None:
+                        quarantine_demo(demo_key, error)
+                        pending_episodes[:] = [pending for pending in pending_episodes if pending["episode_index"] != episode_index]
+                        written_indices.remove(episode_index)
+                        episodes_count -= 1
+                        total_frames -= episode_metadata_by_index.pop(episode_index)["length"]
+                        stored_episodes.pop(episode_index, None)
+            if writer is not None:
+                writer.flush()
+            for episode_metadata in pending_episodes:
+                stored = stored_episodes.pop(episode_metadata["episode_index"], None)
+                if stored is not None:
+                    store.record_episode(stored["key"], stored["files"], episode_metadata)
+            for episode_metadata in pending_episodes:
+                for partial_file in partial_files:
+                    append_episode_metadata(partial_file, episode_metadata)
+            pending_episodes.clear()
         
         # print(f"Found {len(demo_keys)} demos in {os.path.basename(hdf5_path)}")
         # print()  # Add spacing before demo progress bar
         
         # Progress bar for demos within this file
         with tqdm(total=len(demo_keys), 
-                  unit="demo", leave=False, position=1) as demo_pbar:
+                  unit="demo", leave=False, position=1, disable=not config["enable_progress_bars"]) as demo_pbar:
 
             for i, demo_key in enumerate(demo_keys):
-                demo_group = data_group[demo_key]
+                episode_index = global_episode_index + i
+                chunk_index = episode_index // config["chunks_size"]
                 
-                # Process the demo with global episode index
-                episode_metadata = process_single_demo_for_chunk(demo_group, global_episode_index + i, output_dir, chunk_index, task_name, task_index)
+                # Create chunk-specific directory structure in every variant
+                if chunk_index not in created_chunks:
+                    for variant in variants:
+                        create_chunk_directory_structure(variant["output_dir"], chunk_index, config["camera_keys"])
+                    created_chunks.add(chunk_index)
                 
-                episodes_data.append(episode_metadata)
+                episode_metadata, error = convert_demo(demo_key, episode_index, chunk_index, encoder)
                 
-                # Update demo progress bar
                 demo_pbar.update(1)
                 
+                if error is not None:
+                    quarantine_demo(demo_key, error)
+                    continue
+                
+                # Without a writer or encoder the files are already on disk, otherwise wait for the end of the file
+                pending_episodes.append(episode_metadata)
+                episode_metadata_by_index[episode_index] = episode_metadata
+                if writer is None and encoder is None:
+                    append_written_episodes()
+                written_indices.append(episode_index)
+                episodes_count += 1
+                total_frames += episode_metadata["length"]
+                
                 # Update main progress bar description
                 if pbar:
                     pbar.set_postfix_str(f"Current: Demo {i+1}/{len(demo_keys)}")
+        
+        # Flush barrier: every file of the chunk is written before it is reported as done
+        append_written_episodes()
     
-    # Return chunk metadata
-    chunk_metadata = {
-        "chunk_index": chunk_index,
-        "chunk_name": chunk_name,
+    # Return file metadata, the episodes themselves are in the partial files
+    file_metadata = {
+        "part_index": part_index,
+        "chunk_names": [f"chunk-{chunk_index:03d}" for chunk_index in sorted(created_chunks)],
         "hdf5_file": os.path.basename(hdf5_path),
         "task_name": task_name,
         "task_index": task_index,
-        "episodes_count": len(episodes_data),
-        "total_frames": sum(ep["length"] for ep in episodes_data),
-        "episodes_data": episodes_data,
-        "global_episode_start": global_episode_index,
-        "global_episode_end": global_episode_index + len(episodes_data) - 1
+        "episodes_count": episodes_count,
+        "total_frames": total_frames,
+        "global_episode_start": written_indices[0] if written_indices else None,
+        "global_episode_end": written_indices[-1] if written_indices else None,
+        "failed_episodes": failed_episodes
     }
     
-    print(f"✅ Completed chunk {chunk_index:03d} with {len(episodes_data)} episodes")
-    print(f"   Global episode range: {global_episode_index} to {global_episode_index + len(episodes_data) - 1}")
-    return chunk_metadata
+    print(f"✅ Completed {os.path.basename(hdf5_path)} with {episodes_count} episodes"
+          + (f" ({unchanged_count} unchanged)" if unchanged_count else ""))
+    if written_indices:
+        print(f"   Global episode range: {written_indices[0]} to {written_indices[-1]}")
+    return file_metadata
 
 
-def process_all_hdf5_files(input_dir: str, output_dir: str) -> List[Dict[str, Any]]:
+def process_all_hdf5_files(input_dir: str, output_dir: str,
+                           variants: Optional[List[Dict[str, Any]]] = None,
+                           config: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
     """
-    Process all HDF5 files in the input directory, creating individual chunks.
+    Process all HDF5 files in the input directory into chunks of config["chunks_size"] episodes.
+    
+    Each HDF5 file is read once and every demo is fanned out to all output variants.
+    Episode ranges are fixed by a metadata pre-scan, so files can be converted by
+    several worker processes and still get deterministic global episode indices.
+    The demo_range, max_episodes_per_task and max_total_frames filters of the config
+    are applied to the pre-scan, so skipped demos are never read. Demos that keep failing
+    (and every unconverted demo of a file that could not be processed) are listed in
+    meta/failed_episodes.jsonl, and the remaining episodes are renumbered so indices
+    stay contiguous.
     
     Args:
         input_dir (str): Directory containing HDF5 files
         output_dir (str): Directory to save the converted dataset
+        variants (List[Dict[str, Any]], optional): Output variants, defaults to config["variants"]
+        config (Dict[str, Any], optional): Runtime configuration, defaults to get_default_config()
     
     Returns:
-        List[Dict[str, Any]]: Metadata for all processed chunks
+        List[Dict[str, Any]]: Metadata for all processed files
     """
     # print(f"Starting batch processing of HDF5 files...")
     # print(f"Input directory: {input_dir}")
     # print(f"Output directory: {output_dir}")
     
-    # Ensure output directory exists
-    ensure_output_directory(output_dir)
+    if config is None:
+        config = get_default_config()
+    variants = normalize_variants(output_dir, config["variants"] if variants is None else variants, config)
     
     # Get all HDF5 files
-    hdf5_files = get_hdf5_files(input_dir)
+    hdf5_files = get_hdf5_files(input_dir, config["include_tasks"], config["exclude_tasks"])
     
     if not hdf5_files:
         print(f"No HDF5 files found in {input_dir}")
@@ -173,94 +415,252 @@ def process_all_hdf5_files(input_dir: str, output_dir: str) -> List[Dict[str, An
     # for i, file_path in enumerate(hdf5_files):
     #     print(f"  {i+1}. {os.path.basename(file_path)}")
     
-    # Process each HDF5 file as a separate chunk with progress bar
-    all_chunks_metadata = []
-    global_episode_index = 0
+    # Metadata-only pre-scan for frame counts and task attributes
+    inventory = build_inventory(hdf5_files)
+    
+    # observation.state layout from the dataset shapes, fails early on unknown state keys
+    state_layout = get_state_layout(inventory["files"][0]["datasets"], config["state_keys"], config["state_columns"])
+    validate_derived_features(config["derived_features"], config["state_keys"], config["action_chunk_horizon"])
+    if config["success_features"] and not 0 <= config["return_discount"] <= 1:
+        raise ValueError(f"The return discount must be between 0 and 1, got {config['return_discount']}")
+    
+    # Camera streams of all files, every worker writes the same ones
+    camera_keys, rejected_files = resolve_camera_keys(inventory["files"], config["camera_keys"])
+    
+    # Ensure output directories exist
+    for variant in variants:
+        ensure_output_directory(variant["output_dir"], camera_keys)
+    
+    # Select the demos to convert, with contiguous global episode indices
+    plan = plan_episodes(inventory, config)
+    file_plans = plan["files"]
+    
+    if not file_plans:
+        print(f"No demos in {input_dir} match the subset filters")
+        return []
     
-    # Main progress bar for files
+    # Dataset stats of the low-dimensional arrays, needed before any episode is normalized
+    feature_stats = None
+    if "normalized" in config["derived_features"]:
+        print(f"Computing action/state stats over {plan['total_frames']} frames...")
+        feature_stats = compute_low_dim_stats(file_plans, config["state_keys"])
+    
+    # Index all tasks up front so every suite gets stable, sorted task indices
+    task_registry = build_task_registry([file_plan["task"] for file_plan in file_plans],
+                                        load_task_registry(variants[0]["output_dir"]))
+    for variant in variants:
+        write_tasks_jsonl(variant["output_dir"], task_registry)
+    
+    num_workers = max(1, min(config["workers"], len(file_plans)))
+    # Per-demo progress bars from several processes would overwrite each other
+    file_config = dict(config, camera_keys=camera_keys, feature_stats=feature_stats)
+    
+    # Fit workers, queued writes, ring slots and the episode cache into the memory budget
+    memory_plan = None
+    if config["memory_budget_bytes"]:
+        memory_plan = plan_memory(inventory, dict(config, workers=num_workers))
+        file_config.update({key: memory_plan[key] for key in
+                            ("max_inflight_write_bytes", "encoder_ring_slots", "episode_cache_bytes")})
+        print(f"Memory budget {config['memory_budget_bytes'] / 1e9:.2f} GB: {memory_plan['workers']} of {num_workers} "
+              f"worker(s) to start, {memory_plan['episode_bytes'] / 1e6:.1f} MB largest demo, "
+              f"{memory_plan['episode_cache_bytes'] / 1e6:.0f} MB episode cache per worker")
+    governor = create_memory_governor(config, memory_plan, num_workers)
+    if num_workers > 1:
+        file_config["enable_progress_bars"] = False
+    
+    # Process each HDF5 file (one part of the plan) with progress bar
+    all_files_metadata = []
+    file_errors = {}
+    
+    # Files without a selected camera stream are rejected once instead of failing demo by demo
+    for file_plan in file_plans:
+        if file_plan["hdf5_path"] in rejected_files:
+            file_errors[file_plan["part_index"]] = rejected_files[file_plan["hdf5_path"]]
+            print(f"❌ Skipping {os.path.basename(file_plan['hdf5_path'])}: {rejected_files[file_plan['hdf5_path']]}")
+            for variant in variants:
+                write_partial_episodes(variant["output_dir"], file_plan["part_index"], [])
+    runnable_plans = [file_plan for file_plan in file_plans if file_plan["part_index"] not in file_errors]
+    
+    # Main progress bar, counted in frames so the ETA does not depend on file sizes
     print("\n" + "="*60)
     print("CONVERTING INTO LEROBOT DATASET FORMAT")
     print("="*60 + "\n")
-    
-    with tqdm(total=len(hdf5_files), desc="Processing HDF5 files", unit="file", position=0, leave=True) as pbar:
-
-        for chunk_index, hdf5_path in enumerate(hdf5_files):
-
-            try:
-                chunk_metadata = process_single_hdf5_file(
-                    hdf5_path, output_dir, chunk_index, global_episode_index, pbar
-                )
-                all_chunks_metadata.append(chunk_metadata)
-                
-                # Update global episode index for next chunk
-                global_episode_index += chunk_metadata["episodes_count"]
-                
-            except Exception as e:
-                print(f"❌ Error processing {os.path.basename(hdf5_path)}: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                continue
-            
-            # Update main progress bar
-            pbar.update(1)
-    
-    # Create global metadata combining all chunks
-    create_global_metadata(output_dir, all_chunks_metadata)
+    print(f"{len(file_plans)} files, {plan['total_episodes']} demos, {plan['total_frames']} frames, "
+          f"{plan['total_bytes'] / 1e6:.1f} MB to read, {num_workers} worker(s)\n")
+    
+    # Rejected files are not converted, so their frames are not part of the bar
+    runnable_demos = [demo for file_plan in runnable_plans for demo in file_plan["demos"]]
+    with ProgressMonitor(sum(demo["num_frames"] for demo in runnable_demos),
+                         sum(demo["num_bytes"] for demo in runnable_demos),
+                         disable=not config["enable_progress_bars"]) as monitor:
+        
+        if num_workers == 1:
+            for file_plan in runnable_plans:
+                try:
+                    file_metadata = process_single_hdf5_file(
+                        file_plan["hdf5_path"], output_dir, file_plan["part_index"], file_plan["episode_start"],
+                        None, variants, task_registry, file_config, [demo["demo_key"] for demo in file_plan["demos"]]
+                    )
+                    all_files_metadata.append(file_metadata)
+                    
+                except Exception as e:
+                    file_errors[file_plan["part_index"]] = f"{type(e).__name__}: {e}"
+                    print(f"❌ Error processing {os.path.basename(file_plan['hdf5_path'])}: {str(e)}")
+                    import traceback
+                    traceback.print_exc()
+                    continue
+        else:
+            with ProcessPoolExecutor(max_workers=num_workers, initializer=set_progress_counters,
+                                     initargs=(monitor.counters,)) as executor:
+                # Files are started as workers free up, as many at once as the memory governor allows
+                next_plan = 0
+                futures = {}
+                while next_plan < len(runnable_plans) or futures:
+                    worker_limit = num_workers if governor is None else governor.get_worker_limit(len(futures))
+                    while next_plan < len(runnable_plans) and len(futures) < worker_limit:
+                        file_plan = runnable_plans[next_plan]
+                        next_plan += 1
+                        futures[executor.submit(process_single_hdf5_file, file_plan["hdf5_path"], output_dir,
+                                                file_plan["part_index"], file_plan["episode_start"], None, variants,
+                                                task_registry, file_config,
+                                                [demo["demo_key"] for demo in file_plan["demos"]])] = file_plan
+                    
+                    done, _ = wait(futures, timeout=None if governor is None else GOVERNOR_POLL_SECONDS,
+                                   return_when=FIRST_COMPLETED)
+                    for future in done:
+                        file_plan = futures.pop(future)
+                        try:
+                            all_files_metadata.append(future.result())
+                        except Exception as e:
+                            file_errors[file_plan["part_index"]] = f"{type(e).__name__}: {e}"
+                            print(f"❌ Error processing {os.path.basename(file_plan['hdf5_path'])}: {str(e)}")
+                            import traceback
+                            traceback.print_exc()
+                            continue
+    
+    all_files_metadata.sort(key=lambda file_metadata: file_metadata["part_index"])
+    
+    # Quarantine list: demos that failed all retries plus the unconverted demos of failed files
+    failed_episodes = [failed for file_metadata in all_files_metadata for failed in file_metadata["failed_episodes"]]
+    written_by_part = {file_plan["part_index"]: {episode["episode_index"] for episode in read_partial_episodes(variants[0]["output_dir"], file_plan["part_index"])}
+                       for file_plan in file_plans}
+    unwritten = [(file_plan, demo) for file_plan in file_plans for demo in file_plan["demos"]
+                 if demo["episode_index"] not in written_by_part[file_plan["part_index"]]]
+    for file_plan, demo in unwritten:
+        if file_plan["part_index"] in file_errors:
+            failed_episodes.append({
+                "hdf5_file": os.path.basename(file_plan["hdf5_path"]),
+                "demo_key": demo["demo_key"],
+                "task_name": file_plan["task_name"],
+                "attempts": 1,
+                "error": file_errors[file_plan["part_index"]],
+            })
+    
+    # Drop what failed episodes left behind and close the gaps in the episode indices
+    part_indices = [file_plan["part_index"] for file_plan in file_plans]
+    chunks_size = config["chunks_size"]
+    splits = plan["splits"]
+    for variant in variants:
+        image_files = index_episode_images(variant["output_dir"]) if unwritten else {}
+        for file_plan, demo in unwritten:
+            remove_episode_files(variant["output_dir"], demo["episode_index"] // chunks_size, demo["episode_index"], image_files)
+        renumbering = compact_episodes(variant["output_dir"], part_indices, chunks_size, config["parquet_compression"])
+        write_failed_episodes(variant["output_dir"], failed_episodes)
+    if unwritten:
+        splits = remap_split_ranges(splits, renumbering)
+        for file_metadata in all_files_metadata:
+            if file_metadata["episodes_count"]:
+                file_metadata["global_episode_start"] = renumbering[file_metadata["global_episode_start"]]
+                file_metadata["global_episode_end"] = renumbering[file_metadata["global_episode_end"]]
+                file_metadata["chunk_names"] = sorted({
+                    f"chunk-{renumbering[episode_index] // chunks_size:03d}"
+                    for episode_index in written_by_part[file_metadata["part_index"]]
+                })
+    
+    # Create global metadata combining all parts (including partly converted ones), once per variant
+    derived_features_info = get_derived_features_info(state_layout, config["derived_features"],
+                                                      config["action_chunk_horizon"], feature_stats)
+    if config["success_features"]:
+        derived_features_info.update(get_success_features_info(config["return_discount"]))
+    for variant in variants:
+        create_global_metadata(variant["output_dir"], file_plans, variant, task_registry, splits, chunks_size,
+                               state_layout, camera_keys, derived_features_info, feature_stats)
     
     print(f"\n\n{'='*60}")
     print(f"Batch processing completed!")
-    print(f"Successfully processed {len(all_chunks_metadata)} chunks")
+    print(f"Successfully processed {len(all_files_metadata)} files")
+    if failed_episodes:
+        print(f"❌ {len(failed_episodes)} episodes failed and were listed in meta/failed_episodes.jsonl")
     print(f"{'='*60}\n")
     
-    return all_chunks_metadata
+    return all_files_metadata
 
 
-def create_global_metadata(output_dir: str, chunks_metadata: List[Dict[str, Any]]) -> None:
-    """Create global metadata files that combine information from all chunks."""
-    
-    # Collect all episodes from all chunks
-    all_episodes = []
-    all_tasks = set()  # Use set to avoid duplicates
-    
-    for chunk in chunks_metadata:
-        # Add episodes from this chunk
-        all_episodes.extend(chunk["episodes_data"])
-        
-        # Add task from this chunk
-        task_name = chunk["task_name"]
-        all_tasks.add(task_name)
-    
-    # Convert tasks set to list and add "valid" task
-    all_tasks_list = list(all_tasks) + ["valid"]
+def create_global_metadata(output_dir: str, files_metadata: Optional[List[Dict[str, Any]]] = None,
+                           variant: Optional[Dict[str, Any]] = None,
+                           task_registry: Optional[Dict[str, Dict[str, Any]]] = None,
+                           splits: Optional[Dict[str, str]] = None,
+                           chunks_size: int = CHUNKS_SIZE,
+                           state_layout: Optional[Dict[str, Any]] = None,
+                           camera_keys: Optional[List[str]] = None,
+                           derived_features_info: Optional[Dict[str, Dict[str, Any]]] = None,
+                           feature_stats: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Create global metadata files that combine information from all chunks.
+    
+    episodes.jsonl and the info.json totals are produced by streaming the per-part partial
+    episodes files written during conversion. Without files_metadata every partial file on
+    disk is merged, which rebuilds the metadata of an interrupted run. Only the part_index
+    of the files_metadata entries is used. splits maps split names to "start:end" episode
+    ranges and defaults to a single train split. state_layout (see get_state_layout) sets the
+    observation.state shape and the modality.json state ranges, it defaults to the joint states.
+    Every camera stream in camera_keys (defaults to agentview and eye_in_hand RGB) becomes a
+    video feature. derived_features_info adds the derived columns to the features (see
+    get_derived_features_info) and feature_stats replaces the placeholder stats.json.
+    """
+    part_indices = None if files_metadata is None else [file_metadata["part_index"] for file_metadata in files_metadata]
+    merged = merge_partial_episodes(output_dir, part_indices, chunks_size)
+    chunks_info = merged["chunks_info"]
+    
+    if task_registry is None:
+        task_registry = build_task_registry([{"task": task_name} for chunk in chunks_info for task_name in chunk["task_names"]],
+                                            load_task_registry(output_dir))
+    if variant is None:
+        variant = normalize_variants(output_dir)[0]
+    video_info = get_variant_video_info(variant)
+    if state_layout is None:
+        state_layout = get_state_layout({"obs/joint_states": {"shape": [JOINT_COUNT]}, "actions": {"shape": [JOINT_COUNT]}},
+                                        ["joint_states"])
+    if camera_keys is None:
+        camera_keys = DEFAULT_CAMERA_KEYS
+    
+    # Tasks ordered by their registry index, "valid" included
+    all_tasks_list = [entry["task"] for entry in sorted(task_registry.values(), key=lambda entry: entry["task_index"])]
     
     # Calculate global statistics
-    total_episodes = len(all_episodes)
-    total_frames = sum(ep["length"] for ep in all_episodes)
-    total_chunks = len(chunks_metadata)
-    
-    # Calculate chunks_size based on the number of episodes in each chunk
-    # Since each HDF5 file becomes a chunk, chunks_size should represent the number of demos per chunk
-    chunks_size = max(chunk["episodes_count"] for chunk in chunks_metadata) if chunks_metadata else 0
+    total_episodes = merged["total_episodes"]
+    total_frames = merged["total_frames"]
+    total_chunks = len(chunks_info)
     
     print(f"Creating global metadata...")
     print(f"  Total episodes: {total_episodes}")
     print(f"  Total frames: {total_frames}")
     print(f"  Total chunks: {total_chunks}")
     print(f"  Total tasks: {len(all_tasks_list)}")
-    print(f"  Chunks size (max episodes per chunk): {chunks_size}")
+    print(f"  Chunks size (episodes per chunk): {chunks_size}")
     
-    # Create episodes.jsonl
-    episodes_path = os.path.join(output_dir, "meta", "episodes.jsonl")
+    # episodes.jsonl was written by the streaming merge
+    episodes_path = merged["episodes_path"]
     import json
-    with open(episodes_path, 'w') as f:
-        for episode in all_episodes:
-            f.write(json.dumps(episode) + '\n')
     
     # Create tasks.jsonl
-    tasks_path = os.path.join(output_dir, "meta", "tasks.jsonl")
-    with open(tasks_path, 'w') as f:
-        for i, task in enumerate(all_tasks_list):
-            f.write(json.dumps({"task_index": i, "task": task}) + '\n')
+    tasks_path = write_tasks_jsonl(output_dir, task_registry)
+    
+    # Summary of the parquet footers, for filter pushdown without opening every episode
+    write_parquet_summary(output_dir)
+    
+    # HTML page of the episode previews, when they were written
+    preview_index_path = write_preview_index(output_dir)
     
     # Create global info.json
     global_info = {
@@ -269,61 +669,35 @@ def create_global_metadata(output_dir: str, chunks_metadata: List[Dict[str, Any]
         "total_episodes": total_episodes,
         "total_frames": total_frames,
         "total_tasks": len(all_tasks_list),
-        "total_videos": total_episodes * 2,  # agentview and eye_in_hand
+        "total_videos": total_episodes * len(camera_keys) if variant["save_videos"] else 0,
         "total_chunks": total_chunks,
         "chunks_size": chunks_size,
         "fps": FPS,
-        "splits": {
-            "train": f"0:{total_episodes}"
-        },
+        "splits": splits if splits is not None else {"train": f"0:{total_episodes}"},
         "data_path": "data/chunk-{episode_chunk:03d}/episode_{episode_index:06d}.parquet",
         "video_path": "videos/chunk-{episode_chunk:03d}/{video_key}/episode_{episode_index:06d}.mp4",
         "chunks_info": [
             {
                 "chunk_index": chunk["chunk_index"],
                 "chunk_name": chunk["chunk_name"],
-                "task_name": chunk["task_name"],
+                "task_names": chunk["task_names"],
                 "episodes_count": chunk["episodes_count"],
                 "total_frames": chunk["total_frames"],
                 "global_episode_start": chunk["global_episode_start"],
                 "global_episode_end": chunk["global_episode_end"]
             }
-            for chunk in chunks_metadata
+            for chunk in chunks_info
         ],
         "features": {
-            "observation.images.agentview_rgb": {
-                "dtype": "video",
-                "shape": [IMAGE_HEIGHT, IMAGE_WIDTH, IMAGE_CHANNELS],
-                "names": ["height", "width", "channel"],
-                "video_info": {
-                    "video.fps": FPS,
-                    "video.codec": "h264",
-                    "video.pix_fmt": "yuv420p",
-                    "video.is_depth_map": False,
-                    "has_audio": False
-                }
-            },
-            "observation.images.eye_in_hand_rgb": {
-                "dtype": "video",
-                "shape": [IMAGE_HEIGHT, IMAGE_WIDTH, IMAGE_CHANNELS],
-                "names": ["height", "width", "channel"],
-                "video_info": {
-                    "video.fps": FPS,
-                    "video.codec": "h264",
-                    "video.pix_fmt": "yuv420p",
-                    "video.is_depth_map": False,
-                    "has_audio": False
-                }
-            },
             "observation.state": {
                 "dtype": "float64",
-                "shape": [JOINT_COUNT],
-                "names": [f"motor_{i}" for i in range(JOINT_COUNT)]
+                "shape": [state_layout["state"][-1]["end"] if state_layout["state"] else 0],
+                "names": [f"{entry['key']}_{i}" for entry in state_layout["state"] for i in range(entry["end"] - entry["start"])]
             },
             "action": {
                 "dtype": "float64",
-                "shape": [JOINT_COUNT],
-                "names": [f"motor_{i}" for i in range(JOINT_COUNT)]
+                "shape": [state_layout["action_dim"]],
+                "names": [f"motor_{i}" for i in range(state_layout["action_dim"])]
             },
             "timestamp": {
                 "dtype": "float64",
@@ -360,6 +734,39 @@ def create_global_metadata(output_dir: str, chunks_metadata: List[Dict[str, Any]
         }
     }
     
+    # Separately written state columns, and no observation.state when no key is concatenated
+    for column in state_layout["columns"]:
+        global_info["features"][f"observation.{column['key']}"] = {
+            "dtype": "float64",
+            "shape": [column["dim"]],
+            "names": [f"{column['key']}_{i}" for i in range(column["dim"])]
+        }
+    if not state_layout["state"]:
+        del global_info["features"]["observation.state"]
+    global_info["features"].update(derived_features_info or {})
+    
+    # One video feature per camera stream, without videos the dataset only has tabular features
+    if variant["save_videos"]:
+        video_features = {}
+        for camera_key in camera_keys:
+            depth = is_depth_stream(camera_key)
+            video_features[get_video_key(camera_key)] = {
+                "dtype": "video",
+                "shape": video_info["shape"][:2] + [1] if depth else video_info["shape"],
+                "names": ["height", "width", "channel"],
+                "video_info": {
+                    "video.fps": FPS,
+                    "video.codec": "ffv1" if depth else video_info["codec"],
+                    "video.crf": None if depth else video_info["crf"],
+                    "video.pix_fmt": "gray16le" if depth else "yuv420p",
+                    "video.is_depth_map": depth,
+                    "has_audio": False
+                }
+            }
+            if depth:
+                video_features[get_video_key(camera_key)]["video_info"]["video.depth_scale"] = DEPTH_SCALE
+        global_info["features"] = dict(video_features, **global_info["features"])
+    
     # Save global info.json
     global_info_path = os.path.join(output_dir, "meta", "info.json")
     with open(global_info_path, 'w') as f:
@@ -375,13 +782,13 @@ def create_global_metadata(output_dir: str, chunks_metadata: List[Dict[str, Any]
     #     json.dump(info_data, f, indent=4)
     
     # Create modality.json
-    modality_data = create_modality_json()
+    modality_data = create_modality_json(state_layout, camera_keys)
     modality_path = os.path.join(output_dir, "meta", "modality.json")
     with open(modality_path, 'w') as f:
         json.dump(modality_data, f, indent=4)
     
     # Create stats.json
-    stats_data = create_stats_json()
+    stats_data = create_stats_json(feature_stats, state_layout)
     stats_path = os.path.join(output_dir, "meta", "stats.json")
     with open(stats_path, 'w') as f:
         json.dump(stats_data, f, indent=4)
@@ -392,6 +799,8 @@ def create_global_metadata(output_dir: str, chunks_metadata: List[Dict[str, Any]
     print(f"   global_info.json: {global_info_path}")
     print(f"   modality.json: {modality_path}")
     print(f"   stats.json: {stats_path}")
+    if preview_index_path:
+        print(f"   previews: {preview_index_path}")
     print(f"   Total chunks: {total_chunks}")
     print(f"   Total episodes: {total_episodes}")
     print(f"   Total frames: {total_frames}")
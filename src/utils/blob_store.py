@@ -0,0 +1,244 @@
+import os
+import json
+import uuid
+import hashlib
+import threading
+from typing import Dict, List, Any, Optional
+
+# Directory of the blob store under the output root
+BLOB_STORE_DIR = ".blobs"
+
+# Bumped whenever the converter's output for the same input and settings changes
+EPISODE_KEY_VERSION = 2
+
+# Read size when hashing files
+HASH_BLOCK_BYTES = 1024 * 1024
+
+# Configuration that shapes the written files of an episode
+EPISODE_KEY_SETTINGS = ("chunks_size", "camera_keys", "state_keys", "state_columns", "parquet_compression",
+                        "derived_features", "action_chunk_horizon", "feature_stats", "success_features",
+                        "return_discount", "previews", "preview_frames", "preview_tile_size", "preview_gif",
+                        "preview_gif_fps")
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def link_into_place(source_path: str, path: str) -> None:
+    """
+    Make path a hardlink of source_path.
+
+    The link is created under a temporary name and renamed over path, so an existing file
+    (possibly itself a link of another blob) is replaced and never written into.
+    """
+    if os.path.exists(path) and os.path.samefile(source_path, path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    os.link(source_path, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def remove_existing_file(path: str) -> None:
+    """
+    Remove a dataset file before it is written again in place.
+
+    A file of an earlier deduplicated run is a read-only hardlink of a blob object, so
+    writing into it would change (or fail to change) the object shared by every copy.
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class BlobStore:
+    """
+    Content-addressed store of output files, with a manifest per converted episode.
+
+    Every file is stored once as objects/<sha[:2]>/<sha> (read-only) and the dataset files
+    are hardlinks of these objects, so identical files across variants and re-runs take the
+    disk space of one. Episode manifests map an episode key (see get_episode_key) to the
+    digests of all files the episode produced, so an unchanged episode can be relinked
+    without reading or encoding anything. The store must be on the file system of the output.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        os.makedirs(os.path.join(store_dir, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(store_dir, "episodes"), exist_ok=True)
+
+    def object_path(self, digest: str) -> str:
+        """Path of the object with the given digest."""
+        return os.path.join(self.store_dir, "objects", digest[:2], digest)
+
+    def _add_object(self, digest: str, write) -> None:
+        object_path = self.object_path(digest)
+        if os.path.exists(object_path):
+            return
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        tmp_path = f"{object_path}.{uuid.uuid4().hex}.tmp"
+        write(tmp_path)
+        os.chmod(tmp_path, 0o444)
+        # Linking fails if another thread stored the same object first, whose file then stays
+        try:
+            os.link(tmp_path, object_path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+
+    def put_bytes(self, data: bytes, digest: Optional[str] = None) -> str:
+        """Store data unless an identical object exists, returning its digest."""
+        digest = digest or hashlib.sha256(data).hexdigest()
+
+        def write(tmp_path: str) -> None:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+
+        self._add_object(digest, write)
+        return digest
+
+    def put_file(self, path: str, digest: Optional[str] = None) -> str:
+        """Move a finished file into the store (or drop it if an identical object exists), returning its digest."""
+        import shutil
+
+        digest = digest or hash_file(path)
+        self._add_object(digest, lambda tmp_path: shutil.move(path, tmp_path))
+        if os.path.exists(path):
+            os.remove(path)
+        return digest
+
+    def link(self, digest: str, path: str) -> None:
+        """Hardlink the object into the dataset at path."""
+        link_into_place(self.object_path(digest), path)
+
+    def _manifest_path(self, episode_key: str) -> str:
+        return os.path.join(self.store_dir, "episodes", f"{episode_key}.json")
+
+    def record_episode(self, episode_key: str, files: Dict[str, str], episode_metadata: Dict[str, Any]) -> None:
+        """Remember the files (path -> digest) and metadata of a converted episode."""
+        manifest_path = self._manifest_path(episode_key)
+        with open(manifest_path + ".tmp", 'w') as f:
+            json.dump({"files": files, "episode": episode_metadata}, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def restore_episode(self, episode_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Relink the files of an episode converted before with the same key.
+
+        Returns:
+            Dict[str, Any]: The episode metadata, or None if the episode has to be converted
+        """
+        manifest_path = self._manifest_path(episode_key)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if not all(os.path.exists(self.object_path(digest)) for digest in manifest["files"].values()):
+            return None
+        for path, digest in manifest["files"].items():
+            self.link(digest, path)
+        return manifest["episode"]
+
+
+class BlobStoreWriter:
+    """
+    Output writer that stores every file in a BlobStore and hardlinks it into place.
+
+    It has the write_bytes/move_file/flush interface of AsyncWriter and wraps one when given,
+    so storing happens on the writer threads; without one files are stored synchronously.
+    Files are hashed by the calling thread, so the digests of everything written since the
+    last take_written() are known before the writes finish.
+    """
+
+    def __init__(self, store: BlobStore, writer=None):
+        self.store = store
+        self.writer = writer
+        self._written: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "BlobStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if self.writer is not None:
+            self.writer.__exit__(exc_type, exc_value, traceback)
+
+    def write_bytes(self, path: str, data: bytes) -> None:
+        """Store data and link it to path."""
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._written[path] = digest
+        self._run(len(data), self._store_bytes, path, data, digest)
+
+    def move_file(self, src_path: str, dst_path: str) -> None:
+        """Store a finished local file and link it to dst_path."""
+        digest = hash_file(src_path)
+        with self._lock:
+            self._written[dst_path] = digest
+        self._run(os.path.getsize(src_path), self._store_file, src_path, dst_path, digest)
+
+    def take_written(self) -> Dict[str, str]:
+        """Return and forget the path -> digest of every file written since the last call."""
+        with self._lock:
+            written, self._written = self._written, {}
+        return written
+
+    def flush(self) -> None:
+        """Wait until every file is stored and linked."""
+        if self.writer is not None:
+            self.writer.flush()
+
+    def close(self) -> None:
+        """Flush and stop the wrapped writer."""
+        if self.writer is not None:
+            self.writer.close()
+
+    def _run(self, num_bytes: int, function, *args) -> None:
+        if self.writer is None:
+            function(*args)
+        else:
+            self.writer.submit(num_bytes, function, *args)
+
+    def _store_bytes(self, path: str, data: bytes, digest: str) -> None:
+        self.store.put_bytes(data, digest)
+        self.store.link(digest, path)
+
+    def _store_file(self, src_path: str, dst_path: str, digest: str) -> None:
+        self.store.put_file(src_path, digest)
+        self.store.link(digest, dst_path)
+
+
+def get_blob_store(output_dir: str, config: Dict[str, Any]) -> Optional[BlobStore]:
+    """Open the blob store under the output root when config["blob_store"] is set."""
+    if not config["blob_store"]:
+        return None
+    return BlobStore(os.path.join(output_dir, BLOB_STORE_DIR))
+
+
+def get_episode_key(hdf5_path: str, demo_key: str, episode_index: int, task_index: int,
+                    variants: List[Dict[str, Any]], config: Dict[str, Any]) -> str:
+    """
+    Key of everything that determines the files of an episode.
+
+    The source demo is identified by its file's path, size and modification time rather than
+    its contents, so checking the key never reads the demo. The episode and task index,
+    the variants and the settings in EPISODE_KEY_SETTINGS complete the key.
+    """
+    stat = os.stat(hdf5_path)
+    key = {
+        "version": EPISODE_KEY_VERSION,
+        "source": [os.path.realpath(hdf5_path), stat.st_size, stat.st_mtime_ns, demo_key],
+        "episode_index": episode_index,
+        "task_index": task_index,
+        "variants": variants,
+        "settings": {name: config.get(name) for name in EPISODE_KEY_SETTINGS},
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
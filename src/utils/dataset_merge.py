@@ -0,0 +1,311 @@
+import os
+import json
+import shutil
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+from .blob_store import remove_existing_file
+from .episode_compaction import get_episode_data_path, get_episode_video_paths, index_episode_images
+from .hdf5_export import load_dataset_meta, read_episodes_jsonl
+from .metadata_generator import FAILED_EPISODES_FILE, write_partial_episodes, merge_partial_episodes
+from .parquet_writer import with_episode_metadata, write_episode_table, write_parquet_summary
+from .previews import get_preview_paths, write_preview_index
+from .task_registry import VALID_TASK, load_task_registry, build_task_registry, write_tasks_jsonl
+
+# Statistics that are combined across datasets, anything else in stats.json is dropped
+MERGED_STATS = ("mean", "std", "min", "max")
+
+
+def place_file(source_path: str, target_path: str, file_mode: str = "hardlink") -> None:
+    """
+    Put a file of an input dataset into the merged dataset without rewriting it.
+
+    file_mode is "hardlink" (falls back to a copy across file systems), "copy" or "move".
+    """
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    remove_existing_file(target_path)
+    if file_mode == "move":
+        shutil.move(source_path, target_path)
+    elif file_mode == "hardlink":
+        try:
+            os.link(source_path, target_path)
+        except OSError:
+            shutil.copy2(source_path, target_path)
+    elif file_mode == "copy":
+        shutil.copy2(source_path, target_path)
+    else:
+        raise ValueError(f"Unknown file mode {file_mode!r}, expected hardlink, copy or move")
+
+
+def parse_split_range(split_range: str) -> Tuple[int, int]:
+    """Parse a "start:end" split range."""
+    start, end = (int(value) for value in split_range.split(":"))
+    return start, end
+
+
+def order_episodes_by_split(datasets: List[Dict[str, Any]]) -> Tuple[List[Tuple[int, Dict[str, Any]]], Dict[str, str]]:
+    """
+    Order the episodes of all datasets so every split is one contiguous range again.
+
+    Splits are taken in the order they first appear (by start index) and, within a split,
+    datasets keep their input order. Episodes outside every split go last and get no split.
+
+    Returns:
+        Tuple: (dataset position, episode) pairs in merged order, and the merged split ranges
+    """
+    split_names = []
+    for dataset in datasets:
+        for name, _ in sorted(dataset["info"].get("splits", {}).items(), key=lambda item: parse_split_range(item[1])):
+            if name not in split_names:
+                split_names.append(name)
+
+    ordered = []
+    splits = {}
+    placed = set()
+    for name in split_names:
+        start = len(ordered)
+        for position, dataset in enumerate(datasets):
+            if name not in dataset["info"].get("splits", {}):
+                continue
+            split_start, split_end = parse_split_range(dataset["info"]["splits"][name])
+            for episode in dataset["episodes"]:
+                if split_start <= episode["episode_index"] < split_end and (position, episode["episode_index"]) not in placed:
+                    ordered.append((position, episode))
+                    placed.add((position, episode["episode_index"]))
+        if len(ordered) > start:
+            splits[name] = f"{start}:{len(ordered)}"
+
+    for position, dataset in enumerate(datasets):
+        ordered += [(position, episode) for episode in dataset["episodes"]
+                    if (position, episode["episode_index"]) not in placed]
+    return ordered, splits
+
+
+def merge_stats(stats_list: List[Dict[str, Any]], frame_counts: List[int]) -> Dict[str, Any]:
+    """
+    Combine per-dataset stats.json entries weighted by their frame counts.
+
+    Means are frame-weighted, standard deviations are pooled from the per-dataset variances
+    and means, min and max are element-wise. Features missing in any dataset are dropped.
+    """
+    counts = np.asarray(frame_counts, dtype=np.float64)
+    total = max(counts.sum(), 1.0)
+    merged = {}
+    for feature in stats_list[0]:
+        if not all(feature in stats and all(key in stats[feature] for key in MERGED_STATS) for stats in stats_list):
+            print(f"⚠️ Dropping stats of {feature}, not every dataset has them")
+            continue
+        means = np.array([stats[feature]["mean"] for stats in stats_list], dtype=np.float64)
+        stds = np.array([stats[feature]["std"] for stats in stats_list], dtype=np.float64)
+        weights = counts.reshape(-1, *([1] * (means.ndim - 1)))
+        mean = (weights * means).sum(axis=0) / total
+        variance = (weights * (stds ** 2 + (means - mean) ** 2)).sum(axis=0) / total
+        merged[feature] = {
+            "mean": mean.tolist(),
+            "std": np.sqrt(variance).tolist(),
+            "min": np.min([stats[feature]["min"] for stats in stats_list], axis=0).tolist(),
+            "max": np.max([stats[feature]["max"] for stats in stats_list], axis=0).tolist(),
+        }
+    return merged
+
+
+def check_compatible(datasets: List[Dict[str, Any]]) -> None:
+    """Raise a ValueError unless all datasets share fps, features and modality layout."""
+    first = datasets[0]
+    for dataset in datasets[1:]:
+        if dataset["info"]["fps"] != first["info"]["fps"]:
+            raise ValueError(f"{dataset['dataset_dir']} has fps {dataset['info']['fps']}, expected {first['info']['fps']}")
+        if dataset["info"]["features"] != first["info"]["features"]:
+            different = sorted(key for key in set(dataset["info"]["features"]) | set(first["info"]["features"])
+                               if dataset["info"]["features"].get(key) != first["info"]["features"].get(key))
+            raise ValueError(f"{dataset['dataset_dir']} has different features than {first['dataset_dir']}: {different}")
+        if dataset["modality"] != first["modality"]:
+            raise ValueError(f"{dataset['dataset_dir']} has a different modality.json than {first['dataset_dir']}")
+
+
+def get_parquet_compression(parquet_path: str) -> Optional[str]:
+    """Read the codec an existing parquet file was written with, so rewritten files keep it."""
+    import pyarrow.parquet as pq
+
+    metadata = pq.ParquetFile(parquet_path).metadata
+    if metadata.num_row_groups == 0 or metadata.num_columns == 0:
+        return None
+    codec = metadata.row_group(0).column(0).compression.lower()
+    return None if codec == "uncompressed" else codec
+
+
+def remap_episode_parquet(source_path: str, target_path: str, episode_index: int,
+                          task_mapping: np.ndarray) -> None:
+    """
+    Write an episode with a new episode_index and remapped task_index.
+
+    The table is only decompressed into Arrow buffers: the vector and float columns are
+    written back as they are and only the two integer columns are replaced, task_index
+    through a vectorized take on the old -> new task mapping.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(source_path)
+    column_index = table.schema.get_field_index("episode_index")
+    table = table.set_column(column_index, "episode_index", pa.array(np.full(table.num_rows, episode_index, dtype=np.int64)))
+    column_index = table.schema.get_field_index("task_index")
+    table = table.set_column(column_index, "task_index", pc.take(pa.array(task_mapping), table.column("task_index")))
+    metadata = {"episode_index": episode_index}
+    if table.schema.metadata and b"task_index" in table.schema.metadata:
+        metadata["task_index"] = int(task_mapping[int(table.schema.metadata[b"task_index"])])
+    table = with_episode_metadata(table, metadata)
+
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    write_episode_table(table, target_path, get_parquet_compression(source_path))
+
+
+def merge_datasets(dataset_dirs: List[str], output_dir: str, file_mode: str = "hardlink",
+                   chunks_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Combine independently converted LeRobot datasets into one dataset.
+
+    Episodes are renumbered in input order (grouped by split so split ranges stay contiguous)
+    and tasks are unioned by name into a fresh registry, the same indices a conversion of all
+    source files together would assign. Parquet files are rewritten with the new episode_index
+    and task_index only when one of them changes, otherwise they are placed like the videos,
+    PNG frames and previews: hardlinked, copied or moved (file_mode), never re-encoded.
+    info.json, episodes.jsonl and the preview index are recomputed and stats.json is
+    combined with merge_stats.
+
+    Args:
+        dataset_dirs (List[str]): Roots of the converted datasets, in merge order
+        output_dir (str): Root of the merged dataset, must not hold a dataset yet
+        file_mode (str): "hardlink", "copy" or "move" for files that are not rewritten
+        chunks_size (int, optional): Episodes per chunk, defaults to the first dataset's
+
+    Returns:
+        Dict[str, Any]: Episode, frame and task totals and the number of rewritten parquet files
+    """
+    if not dataset_dirs:
+        raise ValueError("No datasets to merge")
+    if os.path.realpath(output_dir) in {os.path.realpath(dataset_dir) for dataset_dir in dataset_dirs}:
+        raise ValueError("The merged dataset must not be written into one of its inputs")
+    if os.path.exists(os.path.join(output_dir, "meta", "episodes.jsonl")):
+        raise ValueError(f"{output_dir} already holds a dataset")
+    if file_mode not in ("hardlink", "copy", "move"):
+        raise ValueError(f"Unknown file mode {file_mode!r}, expected hardlink, copy or move")
+
+    datasets = []
+    for dataset_dir in dataset_dirs:
+        info, modality = load_dataset_meta(dataset_dir)
+        stats_path = os.path.join(dataset_dir, "meta", "stats.json")
+        stats = {}
+        if os.path.exists(stats_path):
+            with open(stats_path, 'r') as f:
+                stats = json.load(f)
+        datasets.append({
+            "dataset_dir": dataset_dir,
+            "info": info,
+            "modality": modality,
+            "stats": stats,
+            "episodes": read_episodes_jsonl(dataset_dir),
+            "task_registry": load_task_registry(dataset_dir),
+        })
+    check_compatible(datasets)
+    if chunks_size is None:
+        chunks_size = datasets[0]["info"]["chunks_size"]
+
+    # Tasks unioned by name, numbered as a conversion of all source files would
+    task_infos = [{key: value for key, value in entry.items() if key != "task_index"}
+                  for dataset in datasets for entry in dataset["task_registry"].values() if entry["task"] != VALID_TASK]
+    task_registry = build_task_registry(task_infos)
+    for dataset in datasets:
+        old_registry = dataset["task_registry"]
+        task_mapping = np.arange(max((entry["task_index"] for entry in old_registry.values()), default=-1) + 1, dtype=np.int64)
+        for task_name, entry in old_registry.items():
+            task_mapping[entry["task_index"]] = task_registry[task_name]["task_index"]
+        dataset["task_mapping"] = task_mapping
+        dataset["image_files"] = index_episode_images(dataset["dataset_dir"])
+
+    ordered, splits = order_episodes_by_split(datasets)
+    merged_episodes = []
+    rewritten = 0
+    for new_index, (position, episode) in enumerate(ordered):
+        dataset = datasets[position]
+        old_index = episode["episode_index"]
+        old_chunk = old_index // dataset["info"]["chunks_size"]
+        new_chunk = new_index // chunks_size
+
+        source_path = get_episode_data_path(dataset["dataset_dir"], old_chunk, old_index)
+        target_path = get_episode_data_path(output_dir, new_chunk, new_index)
+        task_mapping = dataset["task_mapping"]
+        if new_index == old_index and np.array_equal(task_mapping, np.arange(len(task_mapping))):
+            place_file(source_path, target_path, file_mode)
+        else:
+            remap_episode_parquet(source_path, target_path, new_index, task_mapping)
+            if file_mode == "move":
+                os.remove(source_path)
+            rewritten += 1
+
+        for video_path in get_episode_video_paths(dataset["dataset_dir"], old_chunk, old_index):
+            video_key = os.path.basename(os.path.dirname(video_path))
+            place_file(video_path, os.path.join(output_dir, "videos", f"chunk-{new_chunk:03d}", video_key,
+                                                f"episode_{new_index:06d}.mp4"), file_mode)
+
+        old_prefix = f"episode_{old_index:06d}_"
+        for image_path in dataset["image_files"].get(old_index, []):
+            image_dir = os.path.basename(os.path.dirname(image_path))
+            image_name = f"episode_{new_index:06d}_" + os.path.basename(image_path)[len(old_prefix):]
+            place_file(image_path, os.path.join(output_dir, "images", image_dir, image_name), file_mode)
+
+        new_preview_paths = get_preview_paths(output_dir, new_index)
+        for name, preview_path in get_preview_paths(dataset["dataset_dir"], old_index).items():
+            if os.path.exists(preview_path):
+                place_file(preview_path, new_preview_paths[name], file_mode)
+
+        merged_episodes.append(dict(episode, episode_index=new_index))
+
+    # episodes.jsonl and the chunk summaries go through the same streaming merge as a conversion
+    write_partial_episodes(output_dir, 0, merged_episodes)
+    merged = merge_partial_episodes(output_dir, [0], chunks_size)
+    write_tasks_jsonl(output_dir, task_registry)
+    write_parquet_summary(output_dir)
+    write_preview_index(output_dir)
+
+    info = dict(datasets[0]["info"])
+    info.update({
+        "total_episodes": merged["total_episodes"],
+        "total_frames": merged["total_frames"],
+        "total_tasks": len(task_registry),
+        "total_videos": sum(dataset["info"].get("total_videos", 0) for dataset in datasets),
+        "total_chunks": len(merged["chunks_info"]),
+        "chunks_size": chunks_size,
+        "splits": splits,
+        "chunks_info": merged["chunks_info"],
+    })
+    with open(os.path.join(output_dir, "meta", "info.json"), 'w') as f:
+        json.dump(info, f, indent=4)
+    with open(os.path.join(output_dir, "meta", "modality.json"), 'w') as f:
+        json.dump(datasets[0]["modality"], f, indent=4)
+    if all(dataset["stats"] for dataset in datasets):
+        stats = merge_stats([dataset["stats"] for dataset in datasets],
+                            [dataset["info"]["total_frames"] for dataset in datasets])
+        with open(os.path.join(output_dir, "meta", "stats.json"), 'w') as f:
+            json.dump(stats, f, indent=4)
+
+    # Quarantine lists of the inputs are kept, they refer to source files and not to episode indices
+    failed_lines = []
+    for dataset in datasets:
+        failed_path = os.path.join(dataset["dataset_dir"], FAILED_EPISODES_FILE)
+        if os.path.exists(failed_path):
+            with open(failed_path, 'r') as f:
+                failed_lines += [line if line.endswith('\n') else line + '\n' for line in f if line.strip()]
+    if failed_lines:
+        with open(os.path.join(output_dir, FAILED_EPISODES_FILE), 'w') as f:
+            f.writelines(failed_lines)
+
+    print(f"✅ Merged {len(datasets)} datasets into {output_dir}: {merged['total_episodes']} episodes, "
+          f"{merged['total_frames']} frames, {len(task_registry)} tasks ({rewritten} parquet files rewritten)")
+    return {
+        "output_dir": output_dir,
+        "total_episodes": merged["total_episodes"],
+        "total_frames": merged["total_frames"],
+        "total_tasks": len(task_registry),
+        "rewritten_parquet_files": rewritten,
+    }
@@ -0,0 +1,208 @@
+import numpy as np
+from typing import Dict, List, Any, Optional
+from config import TIMESTEP_DURATION
+
+# Derived features that can be enabled with config["derived_features"]
+DERIVED_FEATURES = ("delta_action", "state_velocity", "action_chunk", "normalized")
+
+# Standard deviations below this are treated as constant dimensions when normalizing
+NORMALIZATION_EPS = 1e-8
+
+
+def validate_derived_features(derived_features: List[str], state_keys: List[str], horizon: int) -> None:
+    """Raise a ValueError for unknown derived features or ones the configured state cannot provide."""
+    unknown = [name for name in derived_features if name not in DERIVED_FEATURES]
+    if unknown:
+        raise ValueError(f"Unknown derived features {unknown}, expected any of: {', '.join(DERIVED_FEATURES)}")
+    if "state_velocity" in derived_features and not state_keys:
+        raise ValueError("The state_velocity feature needs observation.state, set state_keys")
+    if "action_chunk" in derived_features and horizon < 1:
+        raise ValueError(f"The action chunk horizon must be at least 1, got {horizon}")
+
+
+def get_delta_actions(actions: np.ndarray) -> np.ndarray:
+    """Difference of every action to the previous one, zero for the first frame."""
+    actions = np.asarray(actions, dtype=np.float64).reshape(len(actions), -1)
+    return np.diff(actions, axis=0, prepend=actions[:1])
+
+
+def get_state_velocity(state: np.ndarray, timestep: float = TIMESTEP_DURATION) -> np.ndarray:
+    """Per-second rate of change of the state, central differences inside and one-sided at the ends."""
+    if len(state) < 2:
+        return np.zeros_like(state, dtype=np.float64)
+    return np.gradient(np.asarray(state, dtype=np.float64), timestep, axis=0)
+
+
+def get_action_chunks(actions: np.ndarray, horizon: int) -> Dict[str, np.ndarray]:
+    """
+    The next horizon actions of every frame, from a strided view over the episode.
+
+    The episode is padded with its last action so every frame has a full window.
+
+    Returns:
+        Dict[str, np.ndarray]: "chunks" (frames, horizon * action_dim) and "is_pad" (frames, horizon),
+            True where the window runs past the end of the episode
+    """
+    actions = np.asarray(actions, dtype=np.float64).reshape(len(actions), -1)
+    num_frames, action_dim = actions.shape
+    if num_frames == 0:
+        return {"chunks": np.empty((0, horizon * action_dim)), "is_pad": np.empty((0, horizon), dtype=bool)}
+
+    padded = np.concatenate([actions, np.repeat(actions[-1:], horizon - 1, axis=0)])
+    # (frames, action_dim, horizon) view without copying, laid out time-major when flattened
+    windows = np.lib.stride_tricks.sliding_window_view(padded, horizon, axis=0)
+    chunks = windows.transpose(0, 2, 1).reshape(num_frames, horizon * action_dim)
+    is_pad = np.arange(num_frames)[:, None] + np.arange(horizon)[None, :] >= num_frames
+    return {"chunks": chunks, "is_pad": is_pad}
+
+
+def normalize(values: np.ndarray, stats: Dict[str, Any]) -> np.ndarray:
+    """Standardize values with the mean and std of stats, constant dimensions are only centered."""
+    std = np.asarray(stats["std"], dtype=np.float64)
+    return (np.asarray(values, dtype=np.float64) - np.asarray(stats["mean"], dtype=np.float64)) / \
+        np.where(std < NORMALIZATION_EPS, 1.0, std)
+
+
+def compute_derived_features(actions: np.ndarray, state: Optional[np.ndarray], derived_features: List[str],
+                             horizon: int, feature_stats: Optional[Dict[str, Any]] = None) -> Dict[str, np.ndarray]:
+    """
+    Compute the enabled derived columns of an episode from its whole action and state arrays.
+
+    Args:
+        actions (np.ndarray): (frames, action_dim) actions
+        state (np.ndarray, optional): (frames, state_dim) observation.state, None without state keys
+        derived_features (List[str]): Enabled names of DERIVED_FEATURES
+        horizon (int): Actions per action chunk
+        feature_stats (Dict[str, Any], optional): Dataset stats of "action" and "observation.state"
+            (see compute_low_dim_stats), required for the normalized features
+
+    Returns:
+        Dict[str, np.ndarray]: Column name -> (frames, dim) array, in the order they are appended
+    """
+    columns = {}
+    if "delta_action" in derived_features:
+        columns["action.delta"] = get_delta_actions(actions)
+    if "state_velocity" in derived_features and state is not None:
+        columns["observation.state.velocity"] = get_state_velocity(state)
+    if "action_chunk" in derived_features:
+        action_chunks = get_action_chunks(actions, horizon)
+        columns["action.chunk"] = action_chunks["chunks"]
+        columns["action.chunk_is_pad"] = action_chunks["is_pad"]
+    if "normalized" in derived_features:
+        if feature_stats is None:
+            raise ValueError("The normalized features need the dataset stats, see compute_low_dim_stats")
+        columns["action.normalized"] = normalize(np.reshape(actions, (len(actions), -1)), feature_stats["action"])
+        if state is not None:
+            columns["observation.state.normalized"] = normalize(state, feature_stats["observation.state"])
+    return columns
+
+
+class RunningStats:
+    """Mean, std, min and max of (frames, dim) arrays added one episode at a time."""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = None
+        self.sum_squares = None
+        self.min = None
+        self.max = None
+
+    def add(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64).reshape(len(values), -1)
+        if len(values) == 0:
+            return
+        if self.sum is None:
+            self.sum = np.zeros(values.shape[1])
+            self.sum_squares = np.zeros(values.shape[1])
+            self.min = values.min(axis=0)
+            self.max = values.max(axis=0)
+        else:
+            self.min = np.minimum(self.min, values.min(axis=0))
+            self.max = np.maximum(self.max, values.max(axis=0))
+        self.count += len(values)
+        self.sum += values.sum(axis=0)
+        self.sum_squares += np.square(values).sum(axis=0)
+
+    def to_dict(self) -> Dict[str, List[float]]:
+        mean = self.sum / self.count
+        std = np.sqrt(np.maximum(self.sum_squares / self.count - np.square(mean), 0.0))
+        return {"mean": mean.tolist(), "std": std.tolist(), "min": self.min.tolist(), "max": self.max.tolist()}
+
+
+def compute_low_dim_stats(file_plans: List[Dict[str, Any]], state_keys: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Stats of action and observation.state over the planned demos, in the stats.json layout.
+
+    Only the action and state datasets are read, the camera frames are never touched.
+
+    Returns:
+        Dict[str, Any]: {"action": {...}, "observation.state": {...}} with mean, std, min and max lists,
+            observation.state only with state keys; None when no frames are planned
+    """
+    import h5py
+    from .hdf5_processor import compose_state
+
+    action_stats = RunningStats()
+    state_stats = RunningStats()
+    for file_plan in file_plans:
+        with h5py.File(file_plan["hdf5_path"], 'r') as f:
+            for demo in file_plan["demos"]:
+                demo_group = f['data'][demo["demo_key"]]
+                action_stats.add(demo_group['actions'][:])
+                if state_keys:
+                    state_stats.add(compose_state({key: demo_group['obs'][key][:] for key in state_keys}, state_keys))
+
+    if action_stats.count == 0:
+        return None
+    stats = {"action": action_stats.to_dict()}
+    if state_keys:
+        stats["observation.state"] = state_stats.to_dict()
+    return stats
+
+
+def get_derived_features_info(state_layout: Dict[str, Any], derived_features: List[str], horizon: int,
+                              feature_stats: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    info.json feature entries of the enabled derived columns.
+
+    Every entry is marked "derived", so readers that rebuild the source data (e.g. the HDF5
+    export) can skip it. Normalized features record the mean and std they were computed
+    with, so they can be mapped back and datasets normalized differently are not merged.
+    """
+    action_dim = state_layout["action_dim"]
+    state_dim = state_layout["state"][-1]["end"] if state_layout["state"] else 0
+    action_names = [f"motor_{i}" for i in range(action_dim)]
+    state_names = [f"{entry['key']}_{i}" for entry in state_layout["state"] for i in range(entry["end"] - entry["start"])]
+
+    features = {}
+    if "delta_action" in derived_features:
+        features["action.delta"] = {"dtype": "float64", "shape": [action_dim], "names": action_names, "derived": True}
+    if "state_velocity" in derived_features and state_dim:
+        features["observation.state.velocity"] = {"dtype": "float64", "shape": [state_dim], "names": state_names,
+                                                  "derived": True}
+    if "action_chunk" in derived_features:
+        features["action.chunk"] = {
+            "dtype": "float64",
+            "shape": [horizon * action_dim],
+            "names": [f"{name}_t{step}" for step in range(horizon) for name in action_names],
+            "horizon": horizon,
+            "derived": True
+        }
+        features["action.chunk_is_pad"] = {"dtype": "bool", "shape": [horizon], "derived": True}
+    if "normalized" in derived_features and feature_stats is not None:
+        features["action.normalized"] = {
+            "dtype": "float64",
+            "shape": [action_dim],
+            "names": action_names,
+            "normalization": {key: feature_stats["action"][key] for key in ("mean", "std")},
+            "derived": True
+        }
+        if state_dim:
+            features["observation.state.normalized"] = {
+                "dtype": "float64",
+                "shape": [state_dim],
+                "names": state_names,
+                "normalization": {key: feature_stats["observation.state"][key] for key in ("mean", "std")},
+                "derived": True
+            }
+    return features
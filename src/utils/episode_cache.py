@@ -0,0 +1,160 @@
+import os
+import hashlib
+import shutil
+import tempfile
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+EpisodeArrays = Tuple[np.ndarray, ...]
+
+# Cache of the current process, see get_episode_cache
+_cache = None
+
+
+class EpisodeCache:
+    """
+    LRU cache of extracted demo arrays, bounded by bytes.
+
+    Sits in front of extract_demo_data so retries and repeated passes over a demo do not
+    re-read it from the (possibly slow) source volume. With a spill_dir, evicted episodes
+    are saved as .npy files (e.g. on a local SSD) and loaded from there on the next hit
+    instead of being dropped. The episodes this cache spilled take at most spill_max_bytes,
+    the oldest are deleted first (None = no limit).
+    """
+
+    def __init__(self, max_bytes: int, spill_dir: Optional[str] = None, spill_max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self.current_bytes = 0
+        self.spill_bytes = 0
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Any, EpisodeArrays]" = OrderedDict()
+        # Key -> bytes of the episodes spilled by this cache, oldest first
+        self._spilled: "OrderedDict[Any, int]" = OrderedDict()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def get(self, key: Any) -> Optional[EpisodeArrays]:
+        """Get the arrays of an episode from memory or the spill directory, None on a miss."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        spill_path = self._get_spill_path(key)
+        if spill_path is not None and os.path.isdir(spill_path):
+            num_arrays = len([name for name in os.listdir(spill_path) if name.endswith(".npy")])
+            arrays = tuple(np.load(os.path.join(spill_path, f"{i}.npy")) for i in range(num_arrays))
+            self.spill_hits += 1
+            self._insert(key, arrays)
+            return arrays
+
+        self.misses += 1
+        return None
+
+    def put(self, key: Any, arrays: EpisodeArrays) -> None:
+        """Add the arrays of an episode, evicting the least recently used ones if needed."""
+        if key in self._entries:
+            self.current_bytes -= sum(array.nbytes for array in self._entries.pop(key))
+        self._insert(key, arrays)
+
+    def get_or_load(self, key: Any, loader: Callable[[], EpisodeArrays]) -> EpisodeArrays:
+        """Get the arrays of an episode, calling loader and caching its result on a miss."""
+        arrays = self.get(key)
+        if arrays is None:
+            arrays = loader()
+            self.put(key, arrays)
+        return arrays
+
+    def discard_source(self, source_path: str) -> None:
+        """Drop the cached and spilled episodes of a source file (see get_episode_cache_key), e.g. once it is converted."""
+        source_path = os.path.realpath(source_path)
+        for key in [key for key in self._entries if key[0] == source_path]:
+            self.current_bytes -= sum(array.nbytes for array in self._entries.pop(key))
+        for key in [key for key in self._spilled if key[0] == source_path]:
+            self._remove_spilled(key)
+
+    def clear(self) -> None:
+        """Drop every cached episode, including the spilled ones."""
+        self._entries.clear()
+        self._spilled.clear()
+        self.current_bytes = 0
+        self.spill_bytes = 0
+        if self.spill_dir and os.path.isdir(self.spill_dir):
+            for name in os.listdir(self.spill_dir):
+                shutil.rmtree(os.path.join(self.spill_dir, name), ignore_errors=True)
+
+    def _insert(self, key: Any, arrays: EpisodeArrays) -> None:
+        num_bytes = sum(array.nbytes for array in arrays)
+        if num_bytes > self.max_bytes:
+            # Too large to keep in memory, it can still live in the spill directory
+            self._spill(key, arrays)
+            return
+
+        self._entries[key] = arrays
+        self.current_bytes += num_bytes
+        while self.current_bytes > self.max_bytes:
+            old_key, old_arrays = self._entries.popitem(last=False)
+            self.current_bytes -= sum(array.nbytes for array in old_arrays)
+            self._spill(old_key, old_arrays)
+
+    def _get_spill_path(self, key: Any) -> Optional[str]:
+        if not self.spill_dir:
+            return None
+        return os.path.join(self.spill_dir, hashlib.sha1(repr(key).encode()).hexdigest())
+
+    def _spill(self, key: Any, arrays: EpisodeArrays) -> None:
+        spill_path = self._get_spill_path(key)
+        if spill_path is None or os.path.isdir(spill_path):
+            return
+        num_bytes = sum(array.nbytes for array in arrays)
+        if self.spill_max_bytes is not None and num_bytes > self.spill_max_bytes:
+            return
+        # Write to a temporary directory first so other processes never see a partial entry
+        tmp_path = tempfile.mkdtemp(dir=self.spill_dir)
+        for i, array in enumerate(arrays):
+            np.save(os.path.join(tmp_path, f"{i}.npy"), array)
+        try:
+            os.rename(tmp_path, spill_path)
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+        self._spilled[key] = num_bytes
+        self.spill_bytes += num_bytes
+        while self.spill_max_bytes is not None and self.spill_bytes > self.spill_max_bytes:
+            self._remove_spilled(next(iter(self._spilled)))
+
+    def _remove_spilled(self, key: Any) -> None:
+        self.spill_bytes -= self._spilled.pop(key)
+        shutil.rmtree(self._get_spill_path(key), ignore_errors=True)
+
+
+def get_episode_cache_key(demo_group: Any, camera_keys: List[str]) -> Tuple[Any, ...]:
+    """
+    Cache key of the arrays extracted from a demo.
+
+    The source file's size and modification time are part of the key, so a regenerated
+    source file never hits arrays spilled by an earlier run. The selected camera streams
+    change the arrays and are part of it too.
+    """
+    stat = os.stat(demo_group.file.filename)
+    return (os.path.realpath(demo_group.file.filename), stat.st_size, stat.st_mtime_ns, demo_group.name, tuple(camera_keys))
+
+
+def get_episode_cache(config: Dict[str, Any]) -> Optional[EpisodeCache]:
+    """Get the episode cache of this process, None when config["episode_cache_bytes"] is 0 (or None) and nothing is spilled."""
+    global _cache
+    max_bytes = config["episode_cache_bytes"] or 0
+    spill_dir = config["episode_cache_dir"]
+    spill_max_bytes = config["episode_cache_dir_bytes"]
+    if not max_bytes and not spill_dir:
+        return None
+    if (_cache is None or _cache.max_bytes != max_bytes or _cache.spill_dir != spill_dir
+            or _cache.spill_max_bytes != spill_max_bytes):
+        _cache = EpisodeCache(max_bytes, spill_dir, spill_max_bytes)
+    return _cache
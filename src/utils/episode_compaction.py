@@ -0,0 +1,138 @@
+import os
+import glob
+from typing import Dict, List, Any, Optional
+from .metadata_generator import read_partial_episodes, write_partial_episodes
+from .parquet_writer import with_episode_metadata, write_episode_table
+from .previews import get_preview_paths
+
+
+def get_episode_data_path(output_dir: str, chunk_index: int, episode_index: int) -> str:
+    """Get the parquet path of an episode."""
+    return os.path.join(output_dir, "data", f"chunk-{chunk_index:03d}", f"episode_{episode_index:06d}.parquet")
+
+
+def get_episode_video_paths(output_dir: str, chunk_index: int, episode_index: int) -> List[str]:
+    """Get the existing video paths of an episode, one per camera."""
+    pattern = os.path.join(output_dir, "videos", f"chunk-{chunk_index:03d}", "*", f"episode_{episode_index:06d}.mp4")
+    return sorted(glob.glob(pattern))
+
+
+def index_episode_images(output_dir: str) -> Dict[int, List[str]]:
+    """List the saved PNG frames by episode index, reading every image directory once."""
+    image_files = {}
+    for image_path in glob.glob(os.path.join(output_dir, "images", "*", "episode_*_timestamp_*.png")):
+        episode_index = int(os.path.basename(image_path).split("_")[1])
+        image_files.setdefault(episode_index, []).append(image_path)
+    return image_files
+
+
+def remove_episode_files(output_dir: str, chunk_index: int, episode_index: int,
+                         image_files: Optional[Dict[int, List[str]]] = None) -> None:
+    """Remove whatever a failed episode left behind: parquet, videos, PNG frames and previews."""
+    if image_files is None:
+        image_files = index_episode_images(output_dir)
+    paths = [get_episode_data_path(output_dir, chunk_index, episode_index)]
+    paths += get_episode_video_paths(output_dir, chunk_index, episode_index)
+    paths += image_files.get(episode_index, [])
+    paths += get_preview_paths(output_dir, episode_index).values()
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def move_episode_files(output_dir: str, old_chunk_index: int, old_episode_index: int,
+                       new_chunk_index: int, new_episode_index: int, compression: Optional[str] = "snappy",
+                       image_files: Optional[Dict[int, List[str]]] = None) -> None:
+    """
+    Renumber an episode on disk.
+
+    The parquet file is rewritten with the new episode_index column (and file metadata),
+    videos, PNG frames and previews are only renamed.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if image_files is None:
+        image_files = index_episode_images(output_dir)
+
+    old_path = get_episode_data_path(output_dir, old_chunk_index, old_episode_index)
+    new_path = get_episode_data_path(output_dir, new_chunk_index, new_episode_index)
+    table = pq.read_table(old_path)
+    column_index = table.schema.get_field_index("episode_index")
+    table = table.set_column(column_index, "episode_index",
+                             pa.array([new_episode_index] * table.num_rows, type=pa.int64()))
+    table = with_episode_metadata(table, {"episode_index": new_episode_index})
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+    write_episode_table(table, new_path, compression)
+    if new_path != old_path:
+        os.remove(old_path)
+
+    for old_video_path in get_episode_video_paths(output_dir, old_chunk_index, old_episode_index):
+        video_key = os.path.basename(os.path.dirname(old_video_path))
+        new_video_dir = os.path.join(output_dir, "videos", f"chunk-{new_chunk_index:03d}", video_key)
+        os.makedirs(new_video_dir, exist_ok=True)
+        os.replace(old_video_path, os.path.join(new_video_dir, f"episode_{new_episode_index:06d}.mp4"))
+
+    old_prefix = f"episode_{old_episode_index:06d}_"
+    new_prefix = f"episode_{new_episode_index:06d}_"
+    for old_image_path in image_files.get(old_episode_index, []):
+        image_name = new_prefix + os.path.basename(old_image_path)[len(old_prefix):]
+        os.replace(old_image_path, os.path.join(os.path.dirname(old_image_path), image_name))
+
+    new_preview_paths = get_preview_paths(output_dir, new_episode_index)
+    for name, old_preview_path in get_preview_paths(output_dir, old_episode_index).items():
+        if os.path.exists(old_preview_path):
+            os.replace(old_preview_path, new_preview_paths[name])
+
+
+def compact_episodes(output_dir: str, part_indices: List[int], chunks_size: int = 1000,
+                     compression: Optional[str] = "snappy") -> Dict[int, int]:
+    """
+    Close the gaps left by quarantined episodes so episode indices stay contiguous.
+
+    The episodes listed in the partial episodes files of the given parts keep their order
+    and are renumbered 0..N-1, moving to the chunk of their new index where needed. Only
+    episodes after the first gap are touched, so a run without failures costs nothing
+    beyond reading the partial files.
+
+    Returns:
+        Dict[int, int]: Old episode index -> new episode index of every written episode
+    """
+    episodes_by_part = {part_index: read_partial_episodes(output_dir, part_index) for part_index in part_indices}
+    written = sorted(episode["episode_index"] for episodes in episodes_by_part.values() for episode in episodes)
+    renumbering = {old_index: new_index for new_index, old_index in enumerate(written)}
+
+    moves = [(old_index, new_index) for old_index, new_index in renumbering.items() if new_index != old_index]
+    if not moves:
+        return renumbering
+
+    # New indices never exceed the old ones, so moving in ascending order never overwrites an episode
+    image_files = index_episode_images(output_dir)
+    for old_index, new_index in moves:
+        move_episode_files(output_dir, old_index // chunks_size, old_index, new_index // chunks_size, new_index,
+                           compression, image_files)
+
+    # Chunks past the new last episode may have been emptied
+    for chunk_dir in glob.glob(os.path.join(output_dir, "data", "chunk-*")) + glob.glob(os.path.join(output_dir, "videos", "chunk-*")):
+        for dir_path, _, _ in sorted(os.walk(chunk_dir), reverse=True):
+            if not os.listdir(dir_path):
+                os.rmdir(dir_path)
+
+    for part_index, episodes in episodes_by_part.items():
+        if episodes:
+            write_partial_episodes(output_dir, part_index,
+                                   [dict(episode, episode_index=renumbering[episode["episode_index"]]) for episode in episodes])
+
+    print(f"✅ Renumbered {len(moves)} episodes to keep episode indices contiguous")
+    return renumbering
+
+
+def remap_split_ranges(splits: Dict[str, str], renumbering: Dict[int, int]) -> Dict[str, str]:
+    """Map "start:end" split ranges of planned episode indices to the compacted indices."""
+    remapped = {}
+    for name, split_range in splits.items():
+        start, end = (int(value) for value in split_range.split(":"))
+        kept = [renumbering[index] for index in range(start, end) if index in renumbering]
+        if kept:
+            remapped[name] = f"{kept[0]}:{kept[-1] + 1}"
+    return remapped
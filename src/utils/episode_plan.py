@@ -0,0 +1,238 @@
+import random
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+# Split that takes the episodes left over by ratio splits adding up to less than 1, when not listed itself
+REMAINDER_SPLIT = "train"
+
+# Rounding slack when checking that split ratios add up to at most 1
+RATIO_TOLERANCE = 1e-9
+
+
+def parse_demo_range(demo_range: Union[str, Tuple[Optional[int], Optional[int]], None]) -> Optional[Tuple[int, Optional[int]]]:
+    """Parse a half-open demo number range like "0:10", ":5" or "20:" (or a (start, end) tuple)."""
+    if demo_range is None:
+        return None
+    if isinstance(demo_range, str):
+        if ":" not in demo_range:
+            raise ValueError(f"Demo range must look like START:END, got '{demo_range}'")
+        start, end = demo_range.split(":", 1)
+        demo_range = (int(start) if start.strip() else None, int(end) if end.strip() else None)
+    start, end = demo_range
+    return (start or 0, end)
+
+
+def get_demo_number(demo_key: str) -> int:
+    """Get the number of a demo key, e.g. 12 for "demo_12"."""
+    return int(demo_key.split("_")[-1])
+
+
+def parse_split_specs(split_specs: List[str]) -> Dict[str, Union[int, float]]:
+    """
+    Parse NAME=VALUE split specifications, e.g. ["train=0.9", "val=0.1"] or ["val=5", "train=1.0"].
+
+    Whole numbers are episode counts per task, any other number (e.g. 0.1 or 1e-1) is a
+    ratio, a fraction of a task's episodes.
+    """
+    splits = {}
+    for split_spec in split_specs:
+        if "=" not in split_spec:
+            raise ValueError(f"Split must look like NAME=VALUE, got '{split_spec}'")
+        name, value = split_spec.split("=", 1)
+        try:
+            splits[name.strip()] = int(value)
+        except ValueError:
+            splits[name.strip()] = float(value)
+    return splits
+
+
+def get_split_names(splits: Dict[str, Union[int, float]]) -> List[str]:
+    """Names of the splits in episode order, REMAINDER_SPLIT first when ratio splits leave it out."""
+    names = list(splits)
+    if REMAINDER_SPLIT not in splits and any(isinstance(value, float) for value in splits.values()):
+        names.insert(0, REMAINDER_SPLIT)
+    return names
+
+
+def allocate_split_counts(num_episodes: int, splits: Dict[str, Union[int, float]]) -> Dict[str, int]:
+    """
+    Divide the episodes of one task between the splits.
+
+    Per-task counts (ints) are taken first, in split order. Each ratio split (float) then gets
+    that fraction of the remaining episodes, rounded by largest remainder. When REMAINDER_SPLIT
+    is not listed it gets whatever the ratios leave over, so ["val=0.1"] puts 10% in val and
+    90% in train; when it is listed, the ratios must add up to 1. Ratios adding up to more
+    than 1 are rejected; without ratio splits the remaining episodes are dropped.
+    """
+    counts = {name: 0 for name in get_split_names(splits)}
+    remaining = num_episodes
+
+    for name, value in splits.items():
+        if isinstance(value, bool) or value < 0:
+            raise ValueError(f"Invalid value {value!r} for split '{name}'")
+        if isinstance(value, int):
+            counts[name] = min(value, remaining)
+            remaining -= counts[name]
+
+    ratios = {name: value for name, value in splits.items() if isinstance(value, float)}
+    total_ratio = sum(ratios.values())
+    if total_ratio > 1 + RATIO_TOLERANCE:
+        raise ValueError(f"Split ratios add up to {total_ratio:g}, more than 1")
+    if ratios and REMAINDER_SPLIT in splits and total_ratio < 1 - RATIO_TOLERANCE:
+        raise ValueError(f"Split ratios add up to {total_ratio:g}; with an explicit '{REMAINDER_SPLIT}' split "
+                         f"they must add up to 1, or leave '{REMAINDER_SPLIT}' out to give it the rest")
+    if ratios:
+        shares = {name: remaining * ratio for name, ratio in ratios.items()}
+        if REMAINDER_SPLIT not in splits:
+            shares[REMAINDER_SPLIT] = remaining * max(0.0, 1 - total_ratio)
+        for name, share in shares.items():
+            counts[name] += int(share)
+        leftover = remaining - sum(int(share) for share in shares.values())
+        # Stable sort keeps the split order for equal remainders
+        for name in sorted(shares, key=lambda name: int(shares[name]) - shares[name])[:leftover]:
+            counts[name] += 1
+
+    return counts
+
+
+def assign_splits(plan: Dict[str, Any], splits: Dict[str, Union[int, float]], seed: int = 0) -> Dict[str, Any]:
+    """
+    Assign the planned episodes to splits, stratified by task, and renumber them in split order.
+
+    The demos of every task are shuffled with a generator seeded by the seed and the task
+    name, so a task keeps its split assignment when other tasks are added or filtered out.
+    Episodes are then numbered split by split (files and demos in their original order
+    within a split), so every split is a contiguous episode range and can be written directly
+    in its final order. A file with episodes in several splits becomes one part per split.
+
+    Args:
+        plan (Dict[str, Any]): Result of plan_episodes
+        splits (Dict[str, Union[int, float]]): Split name -> ratio (float) or episodes per task (int)
+        seed (int): Seed of the shuffle
+
+    Returns:
+        Dict[str, Any]: The re-planned episodes with a "splits" dict of split name -> "start:end"
+    """
+    demos_by_task = {}
+    for file_plan in plan["files"]:
+        for demo in file_plan["demos"]:
+            demos_by_task.setdefault(file_plan["task_name"], []).append((file_plan["hdf5_path"], demo["demo_key"]))
+
+    split_of_demo = {}
+    for task_name, task_demos in demos_by_task.items():
+        shuffled = list(task_demos)
+        random.Random(f"{seed}:{task_name}").shuffle(shuffled)
+        start = 0
+        for name, count in allocate_split_counts(len(shuffled), splits).items():
+            for demo_id in shuffled[start:start + count]:
+                split_of_demo[demo_id] = name
+            start += count
+
+    files = []
+    split_ranges = {}
+    total_episodes = 0
+    total_frames = 0
+    total_bytes = 0
+
+    for name in get_split_names(splits):
+        split_start = total_episodes
+        for file_plan in plan["files"]:
+            demos = [demo for demo in file_plan["demos"]
+                     if split_of_demo.get((file_plan["hdf5_path"], demo["demo_key"])) == name]
+            if not demos:
+                continue
+            files.append(dict(file_plan,
+                              split=name,
+                              part_index=len(files),
+                              episode_start=total_episodes,
+                              demos=[dict(demo, episode_index=total_episodes + i) for i, demo in enumerate(demos)]))
+            total_episodes += len(demos)
+            total_frames += sum(demo["num_frames"] for demo in demos)
+            total_bytes += sum(demo["num_bytes"] for demo in demos)
+        if total_episodes > split_start:
+            split_ranges[name] = f"{split_start}:{total_episodes}"
+
+    return {
+        "files": files,
+        "splits": split_ranges,
+        "total_episodes": total_episodes,
+        "total_frames": total_frames,
+        "total_bytes": total_bytes,
+    }
+
+
+def plan_episodes(inventory: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Select the demos to convert and assign their global episode indices.
+
+    Works on the metadata pre-scan only, so filtering never reads pixel data. Files are
+    visited in order and demos in get_demo_keys order; the selected episodes get
+    contiguous global indices and files without selected demos are dropped.
+
+    Args:
+        inventory (Dict[str, Any]): Result of build_inventory
+        config (Dict[str, Any]): Runtime configuration with the demo_range, max_episodes_per_task
+            and max_total_frames filters (None disables a filter) and the optional splits and split_seed
+
+    Returns:
+        Dict[str, Any]: Per-file plans ({"hdf5_path", "task_name", "part_index", "episode_start",
+            "demos"}), the "splits" episode ranges and episode, frame and byte totals of the selection
+    """
+    demo_range = parse_demo_range(config["demo_range"])
+    max_episodes_per_task = config["max_episodes_per_task"]
+    max_total_frames = config["max_total_frames"]
+
+    episodes_per_task = {}
+    files = []
+    total_episodes = 0
+    total_frames = 0
+    total_bytes = 0
+    frame_budget_reached = False
+
+    for file_inventory in inventory["files"]:
+        task_name = file_inventory["task"]["task"]
+        demos = []
+
+        for demo in file_inventory["demos"]:
+            if demo_range is not None:
+                demo_number = get_demo_number(demo["demo_key"])
+                if demo_number < demo_range[0] or (demo_range[1] is not None and demo_number >= demo_range[1]):
+                    continue
+
+            if max_episodes_per_task is not None and episodes_per_task.get(task_name, 0) >= max_episodes_per_task:
+                break
+
+            # The frame budget keeps a prefix of the dataset, so it stops at the first demo that does not fit
+            if max_total_frames is not None and total_frames + demo["num_frames"] > max_total_frames:
+                frame_budget_reached = True
+                break
+
+            demos.append(dict(demo, episode_index=total_episodes + len(demos)))
+            episodes_per_task[task_name] = episodes_per_task.get(task_name, 0) + 1
+            total_frames += demo["num_frames"]
+            total_bytes += demo["num_bytes"]
+
+        if demos:
+            files.append({
+                "hdf5_path": file_inventory["file"],
+                "task_name": task_name,
+                "task": file_inventory["task"],
+                "part_index": len(files),
+                "episode_start": total_episodes,
+                "demos": demos,
+            })
+            total_episodes += len(demos)
+
+        if frame_budget_reached:
+            break
+
+    plan = {
+        "files": files,
+        "splits": {"train": f"0:{total_episodes}"},
+        "total_episodes": total_episodes,
+        "total_frames": total_frames,
+        "total_bytes": total_bytes,
+    }
+
+    if config["splits"]:
+        plan = assign_splits(plan, config["splits"], config["split_seed"])
+    return plan
@@ -1,23 +1,20 @@
 import os
-from typing import List
+from typing import List, Optional
+from .image_processing import DEFAULT_CAMERA_KEYS, get_image_dir_name, get_video_key
 
 
-def create_directory_structure(base_dir: str) -> None:
-    """Create the directory structure matching the target dataset."""
-    dirs = [
-        os.path.join(base_dir, "data", "chunk-000"),
-        os.path.join(base_dir, "videos", "chunk-000", "observation.images.agentview_rgb"),
-        os.path.join(base_dir, "videos", "chunk-000", "observation.images.eye_in_hand_rgb"),
-        os.path.join(base_dir, "meta"),
-        os.path.join(base_dir, "images", "agentview"),
-        os.path.join(base_dir, "images", "eye_in_hand")
-    ]
+def create_directory_structure(base_dir: str, camera_keys: Optional[List[str]] = None) -> None:
+    """Create the directory structure matching the target dataset, with directories for every camera stream."""
+    camera_keys = DEFAULT_CAMERA_KEYS if camera_keys is None else camera_keys
+    dirs = [os.path.join(base_dir, "data", "chunk-000"), os.path.join(base_dir, "meta")]
+    dirs += [os.path.join(base_dir, "videos", "chunk-000", get_video_key(camera_key)) for camera_key in camera_keys]
+    dirs += [os.path.join(base_dir, "images", get_image_dir_name(camera_key)) for camera_key in camera_keys]
     for dir_path in dirs:
         os.makedirs(dir_path, exist_ok=True)
 
 
-def ensure_output_directory(output_dir: str) -> None:
+def ensure_output_directory(output_dir: str, camera_keys: Optional[List[str]] = None) -> None:
     """Ensure the output directory exists and create the required structure."""
     if not os.path.exists(output_dir):
         os.makedirs(output_dir, exist_ok=True)
-    create_directory_structure(output_dir) 
\ No newline at end of file
+    create_directory_structure(output_dir, camera_keys) 
\ No newline at end of file
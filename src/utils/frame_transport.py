@@ -0,0 +1,232 @@
+import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Dict, List, Any, Optional
+import numpy as np
+from .image_processing import is_depth_stream
+from .progress import get_progress_counters, set_progress_counters
+from .blob_store import BlobStore, BlobStoreWriter
+
+# Arrays in a slot start at multiples of this many bytes
+SLOT_ALIGNMENT = 64
+
+
+class FrameRing:
+    """
+    Fixed-size slots in one shared memory block, recycled through a queue of free slots.
+
+    The producer copies the frames of an episode into a free slot once and hands a small
+    descriptor to a consumer process, which maps zero-copy numpy views of the slot and
+    releases it when done. Slots are only reused after their release, and acquire blocks
+    while all slots are in use, which bounds the frames in flight.
+    """
+
+    def __init__(self, num_slots: int, slot_bytes: int, context=None):
+        context = context or multiprocessing.get_context()
+        self.num_slots = num_slots
+        self.slot_bytes = slot_bytes
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, num_slots * slot_bytes))
+        self._owner = True
+        self.free_slots = context.Queue()
+        for slot in range(num_slots):
+            self.free_slots.put(slot)
+
+    @classmethod
+    def attach(cls, handle: Dict[str, Any]) -> 'FrameRing':
+        """Map a ring created in another process from its handle()."""
+        ring = cls.__new__(cls)
+        ring.num_slots = handle["num_slots"]
+        ring.slot_bytes = handle["slot_bytes"]
+        ring._shm = shared_memory.SharedMemory(name=handle["name"])
+        ring._owner = False
+        ring.free_slots = handle["free_slots"]
+        return ring
+
+    def handle(self) -> Dict[str, Any]:
+        """Everything another process needs to attach, pass it when starting the process."""
+        return {"name": self._shm.name, "num_slots": self.num_slots, "slot_bytes": self.slot_bytes,
+                "free_slots": self.free_slots}
+
+    def fits(self, arrays: Dict[str, np.ndarray]) -> bool:
+        """Check whether the arrays fit into one slot."""
+        return sum(-(-array.nbytes // SLOT_ALIGNMENT) * SLOT_ALIGNMENT for array in arrays.values()) <= self.slot_bytes
+
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        """Take a free slot, waiting until one is released. Raises queue.Empty on timeout."""
+        return self.free_slots.get(timeout=timeout)
+
+    def release(self, slot: int) -> None:
+        """Give a slot back once nothing reads from it anymore."""
+        self.free_slots.put(slot)
+
+    def write(self, slot: int, arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """
+        Copy arrays into a slot.
+
+        Returns:
+            Dict[str, Any]: Descriptor of the slot and the name, dtype, shape and offset of every array
+        """
+        if not self.fits(arrays):
+            raise ValueError(f"{sum(array.nbytes for array in arrays.values())} bytes do not fit a {self.slot_bytes} byte slot")
+
+        entries = []
+        offset = slot * self.slot_bytes
+        for name, array in arrays.items():
+            view = np.ndarray(array.shape, dtype=array.dtype, buffer=self._shm.buf, offset=offset)
+            view[...] = array
+            entries.append((name, array.dtype.str, array.shape, offset))
+            offset += -(-array.nbytes // SLOT_ALIGNMENT) * SLOT_ALIGNMENT
+        return {"slot": slot, "arrays": entries}
+
+    def view(self, descriptor: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """Map zero-copy views of the arrays of a descriptor. Drop them before the slot is released."""
+        return {name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=self._shm.buf, offset=offset)
+                for name, dtype, shape, offset in descriptor["arrays"]}
+
+    def close(self) -> None:
+        """Unmap the block; the creating process also frees it."""
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+# Ring and blob store of the current encoder process, attached by the pool initializer
+_ring = None
+_store = None
+
+
+def attach_encoder_process(handle: Dict[str, Any], counters, store_dir: Optional[str] = None) -> None:
+    """Process pool initializer of encoder processes: attach the ring, the progress counters and the blob store."""
+    global _ring, _store
+    _ring = FrameRing.attach(handle)
+    _store = BlobStore(store_dir) if store_dir else None
+    set_progress_counters(counters)
+
+
+def encode_from_ring(descriptor: Dict[str, Any], episode_index: int, chunk_index: int,
+                     variants: List[Dict[str, Any]], config: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Write the images and videos of an episode from its frames in the ring, then free the slot.
+
+    Returns:
+        Dict[str, str]: Path -> digest of the written files when a blob store is attached
+    """
+    from .hdf5_processor import write_episode_media
+
+    writer = BlobStoreWriter(_store) if _store is not None else None
+    try:
+        camera_frames = _ring.view(descriptor)
+        for variant in variants:
+            write_episode_media(variant, episode_index, chunk_index, camera_frames, config, writer)
+        del camera_frames
+    finally:
+        _ring.release(descriptor["slot"])
+    return writer.take_written() if writer is not None else {}
+
+
+class FrameEncoderPool:
+    """
+    Encoder processes that turn camera frames into images and videos, fed through a FrameRing.
+
+    The reading process writes the frames of each episode into the ring once and submits a
+    descriptor; encoder processes resize and encode straight from shared memory. Episodes
+    whose frames do not fit a slot are refused (submit returns False) and should be encoded
+    by the caller. With a store_dir the encoded files go through that BlobStore.
+    """
+
+    def __init__(self, num_processes: int, num_slots: int, slot_bytes: int, store_dir: Optional[str] = None):
+        context = multiprocessing.get_context()
+        self.ring = FrameRing(num_slots, slot_bytes, context)
+        self.executor = ProcessPoolExecutor(max_workers=num_processes, mp_context=context,
+                                            initializer=attach_encoder_process,
+                                            initargs=(self.ring.handle(), get_progress_counters(), store_dir))
+        self.futures = {}
+        self.broken = False
+
+    def submit(self, episode_index: int, chunk_index: int, camera_frames: Dict[str, np.ndarray],
+               variants: List[Dict[str, Any]], config: Dict[str, Any]) -> bool:
+        """
+        Queue the encoding of an episode, waiting for a free slot.
+
+        Returns False when the frames do not fit a slot or the pool broke (an encoder process
+        died), the caller then encodes the episode itself.
+        """
+        if self.broken or not self.ring.fits(camera_frames):
+            return False
+
+        while True:
+            try:
+                slot = self.ring.acquire(timeout=1.0)
+                break
+            except queue.Empty:
+                # A crashed encoder never releases its slot, do not wait for it forever
+                if any(future.done() and isinstance(future.exception(), BrokenProcessPool)
+                       for future in self.futures.values()):
+                    self.broken = True
+                    return False
+
+        descriptor = self.ring.write(slot, camera_frames)
+        try:
+            self.futures[episode_index] = self.executor.submit(encode_from_ring, descriptor, episode_index, chunk_index,
+                                                               variants, config)
+        except BrokenProcessPool:
+            self.ring.release(slot)
+            self.broken = True
+            return False
+        return True
+
+    def wait(self, written: Optional[Dict[int, Dict[str, str]]] = None) -> Dict[int, BaseException]:
+        """
+        Wait for every submitted episode, returning the errors of the failed ones by episode index.
+
+        The stored files (path -> digest) of the successful episodes are added to written when given.
+        """
+        errors = {}
+        for episode_index, future in self.futures.items():
+            error = future.exception()
+            if error is not None:
+                errors[episode_index] = error
+            elif written is not None:
+                written.setdefault(episode_index, {}).update(future.result())
+        self.futures.clear()
+        return errors
+
+    def close(self) -> None:
+        """Stop the encoder processes and free the ring, dropping episodes that have not started encoding."""
+        # shutdown(cancel_futures=True) needs Python 3.9
+        for future in self.futures.values():
+            future.cancel()
+        self.executor.shutdown(wait=True)
+        self.ring.close()
+
+    def __enter__(self) -> 'FrameEncoderPool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def get_episode_frame_bytes(demo_groups: List[Any], camera_keys: List[str]) -> int:
+    """Bytes one slot needs for the longest of the given demos, from the dataset metadata only."""
+    largest = 0
+    for demo_group in demo_groups:
+        num_bytes = 0
+        for camera_key in camera_keys:
+            dataset = demo_group['obs'][camera_key]
+            # Depth reaches the ring converted to uint16
+            itemsize = 2 if is_depth_stream(camera_key) else dataset.dtype.itemsize
+            num_bytes += dataset.size * itemsize + SLOT_ALIGNMENT
+        largest = max(largest, num_bytes)
+    return largest
+
+
+def create_encoder_pool(config: Dict[str, Any], slot_bytes: int,
+                        store_dir: Optional[str] = None) -> Optional[FrameEncoderPool]:
+    """Create the encoder pool of the runtime configuration, or None when encoding stays in-process."""
+    num_processes = config["encoder_processes"]
+    if not num_processes or slot_bytes <= 0:
+        return None
+    num_slots = config["encoder_ring_slots"] or 2 * num_processes
+    return FrameEncoderPool(num_processes, num_slots, slot_bytes, store_dir)
@@ -0,0 +1,321 @@
+import os
+import json
+import glob
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+from .image_processing import get_image_dir_name, is_depth_stream
+from .task_registry import VALID_TASK, load_task_registry
+
+# Low-dimensional datasets are stored in chunks of up to this many frames
+LOW_DIM_CHUNK_FRAMES = 4096
+
+
+def load_dataset_meta(dataset_dir: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Load info.json and modality.json (empty if missing) of a converted dataset."""
+    meta_dir = os.path.join(dataset_dir, "meta")
+    with open(os.path.join(meta_dir, "info.json"), 'r') as f:
+        info = json.load(f)
+    modality = {}
+    if os.path.exists(os.path.join(meta_dir, "modality.json")):
+        with open(os.path.join(meta_dir, "modality.json"), 'r') as f:
+            modality = json.load(f)
+    return info, modality
+
+
+def read_episodes_jsonl(dataset_dir: str) -> List[Dict[str, Any]]:
+    """Read meta/episodes.jsonl of a converted dataset."""
+    with open(os.path.join(dataset_dir, "meta", "episodes.jsonl"), 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def get_export_streams(dataset_dir: str, info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    List the camera streams of a converted dataset and where their frames are read from.
+
+    Streams with a video feature are decoded from their videos; without videos the PNG
+    frames are used, and a dataset with neither is exported without cameras.
+    """
+    streams = []
+    for feature_key, feature in info["features"].items():
+        if feature.get("dtype") == "video" and feature_key.startswith("observation.images."):
+            video_info = feature.get("video_info", {})
+            streams.append({
+                "camera_key": feature_key[len("observation.images."):],
+                "source": "video",
+                "depth": bool(video_info.get("video.is_depth_map")),
+                "depth_scale": video_info.get("video.depth_scale"),
+            })
+    if streams:
+        return streams
+
+    images_dir = os.path.join(dataset_dir, "images")
+    for dir_name in sorted(os.listdir(images_dir)) if os.path.isdir(images_dir) else []:
+        with os.scandir(os.path.join(images_dir, dir_name)) as entries:
+            if not any(entry.name.endswith(".png") for entry in entries):
+                continue
+        camera_key = dir_name if is_depth_stream(dir_name) else f"{dir_name}_rgb"
+        streams.append({"camera_key": camera_key, "source": "images", "depth": is_depth_stream(dir_name),
+                        "depth_scale": None})
+    return streams
+
+
+def to_numpy_vectors(column: Any) -> np.ndarray:
+    """Turn a (fixed-size) list column into a (frames, dim) array without per-row Python."""
+    column = column.combine_chunks()
+    return column.flatten().to_numpy(zero_copy_only=False).reshape(len(column), -1)
+
+
+def read_episode_table(dataset_dir: str, info: Dict[str, Any], chunk_index: int, episode_index: int) -> Dict[str, np.ndarray]:
+    """Read the parquet file of an episode into arrays, vector columns as (frames, dim)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    data_path = info["data_path"].format(episode_chunk=chunk_index, episode_index=episode_index)
+    table = pq.read_table(os.path.join(dataset_dir, data_path))
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name)
+        if pa.types.is_list(column.type) or pa.types.is_fixed_size_list(column.type) or pa.types.is_large_list(column.type):
+            columns[name] = to_numpy_vectors(column)
+        else:
+            columns[name] = column.to_numpy()
+    return columns
+
+
+def read_video_frames(video_path: str, depth: bool = False) -> np.ndarray:
+    """Decode a video into a (T, H, W, 3) RGB or, for depth, a (T, H, W) uint16 frame stack."""
+    import cv2
+
+    if depth:
+        capture = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_CONVERT_RGB, 0])
+    else:
+        capture = cv2.VideoCapture(video_path)
+
+    frames = []
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame if depth else cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    capture.release()
+
+    if not frames:
+        raise ValueError(f"Could not decode any frame from {video_path}")
+    return np.stack(frames)
+
+
+def read_image_frames(dataset_dir: str, camera_key: str, episode_index: int, num_frames: int) -> np.ndarray:
+    """Read the saved PNG frames of an episode, in timestamp order."""
+    from PIL import Image
+
+    pattern = os.path.join(dataset_dir, "images", get_image_dir_name(camera_key), f"episode_{episode_index:06d}_timestamp_*.png")
+    image_paths = sorted(glob.glob(pattern), key=lambda path: float(path.rsplit("timestamp_", 1)[1][:-len(".png")]))
+    if len(image_paths) != num_frames:
+        raise ValueError(f"Expected {num_frames} {camera_key} frames for episode {episode_index}, found {len(image_paths)}")
+    return np.stack([np.array(Image.open(path)) for path in image_paths])
+
+
+def read_stream_frames(dataset_dir: str, info: Dict[str, Any], stream: Dict[str, Any], chunk_index: int,
+                       episode_index: int, num_frames: int) -> np.ndarray:
+    """
+    Read the frames of a camera stream in the layout of the source HDF5 files.
+
+    RGB frames are (T, H, W, 3) uint8. Depth maps are (T, H, W, 1), converted back to float32
+    with the depth scale when the dataset records one.
+    """
+    if stream["source"] == "video":
+        video_path = info["video_path"].format(episode_chunk=chunk_index, episode_index=episode_index,
+                                               video_key=f"observation.images.{stream['camera_key']}")
+        frames = read_video_frames(os.path.join(dataset_dir, video_path), stream["depth"])
+    else:
+        frames = read_image_frames(dataset_dir, stream["camera_key"], episode_index, num_frames)
+
+    if stream["depth"]:
+        frames = frames.reshape(frames.shape[:3] + (1,))
+        if stream["depth_scale"]:
+            frames = (frames / stream["depth_scale"]).astype(np.float32)
+    return frames[:num_frames]
+
+
+def is_derived_column(name: str, features: Dict[str, Any]) -> bool:
+    """
+    Check whether a column was computed at conversion time rather than read from the source.
+
+    Derived features are marked in info.json; observation.state.* columns (velocity,
+    normalized) of datasets converted before the marker are recognized by their name.
+    """
+    return bool(features.get(name, {}).get("derived")) or name.startswith("observation.state.")
+
+
+def split_state_columns(columns: Dict[str, np.ndarray], modality: Dict[str, Any],
+                        features: Optional[Dict[str, Any]] = None) -> Dict[str, np.ndarray]:
+    """
+    Recover the obs datasets from observation.state and the separate state columns.
+
+    Slices of observation.state are taken from the modality.json state ranges; entries with
+    an original_key are read from their own column. Derived columns (see is_derived_column)
+    have no source dataset and are skipped.
+    """
+    features = features or {}
+    obs = {}
+    for key, state_range in modality.get("state", {}).items():
+        source = columns.get(state_range.get("original_key", "observation.state"))
+        if source is not None:
+            obs[key] = np.ascontiguousarray(source[:, state_range["start"]:state_range["end"]])
+    for name, values in columns.items():
+        key = name[len("observation."):]
+        if (name.startswith("observation.") and name != "observation.state" and key not in obs
+                and not is_derived_column(name, features)):
+            obs[key] = values
+    return obs
+
+
+def get_frame_chunks(shape: Tuple[int, ...]) -> Optional[Tuple[int, ...]]:
+    """
+    Chunk shape of a (frames, ...) dataset for frame-sequential reads.
+
+    Image stacks get one frame per chunk, so reading a frame decompresses only that frame;
+    low-dimensional arrays are chunked along time. None for empty datasets.
+    """
+    if not shape or shape[0] == 0:
+        return None
+    if len(shape) >= 3:
+        return (1,) + tuple(shape[1:])
+    return (min(shape[0], LOW_DIM_CHUNK_FRAMES),) + tuple(shape[1:])
+
+
+def get_compression_options(compression: Optional[str], compression_level: Optional[int] = None) -> Dict[str, Any]:
+    """h5py create_dataset keyword arguments of a "gzip", "lzf" or None filter."""
+    if compression not in ("gzip", "lzf", None):
+        raise ValueError(f"Unsupported compression '{compression}', expected gzip, lzf or none")
+    if compression is None:
+        return {}
+    options = {"compression": compression}
+    if compression == "gzip" and compression_level is not None:
+        options["compression_opts"] = compression_level
+    return options
+
+
+def write_demo(data_group: Any, demo_key: str, datasets: Dict[str, np.ndarray],
+               compression: Optional[str] = "gzip", compression_level: Optional[int] = 4) -> int:
+    """
+    Write one demo with a single bulk write per dataset, chunked by get_frame_chunks.
+
+    Returns the number of bytes written.
+    """
+    demo_group = data_group.create_group(demo_key)
+    num_frames = len(datasets["actions"])
+    demo_group.attrs["num_samples"] = num_frames
+    num_bytes = 0
+
+    options = get_compression_options(compression, compression_level)
+    for name, values in datasets.items():
+        demo_group.create_dataset(name, data=values, chunks=get_frame_chunks(values.shape), **options)
+        num_bytes += values.nbytes
+
+    return num_bytes
+
+
+def export_task_file(dataset_dir: str, hdf5_path: str, task_entry: Dict[str, Any], episodes: List[Dict[str, Any]],
+                     compression: Optional[str] = "gzip", compression_level: Optional[int] = 4) -> Dict[str, Any]:
+    """
+    Export the episodes of one task into a robomimic-style HDF5 file with data/demo_N groups.
+
+    Episodes are read and written one at a time, so memory use is bounded by one episode.
+
+    Returns:
+        Dict[str, Any]: The written file with its demo, frame and byte counts
+    """
+    import h5py
+
+    info, modality = load_dataset_meta(dataset_dir)
+    streams = get_export_streams(dataset_dir, info)
+    chunks_size = info["chunks_size"]
+    total_frames = 0
+    total_bytes = 0
+
+    tmp_path = hdf5_path + ".tmp"
+    with h5py.File(tmp_path, 'w') as f:
+        data_group = f.create_group("data")
+        problem_info = {key: task_entry[key] for key in ("language_instruction", "problem_name") if key in task_entry}
+        data_group.attrs["problem_info"] = json.dumps(problem_info)
+        if "env_name" in task_entry:
+            data_group.attrs["env_args"] = json.dumps({"env_name": task_entry["env_name"]})
+
+        for demo_number, episode in enumerate(episodes):
+            episode_index = episode["episode_index"]
+            chunk_index = episode_index // chunks_size
+            columns = read_episode_table(dataset_dir, info, chunk_index, episode_index)
+            num_frames = len(columns["action"])
+
+            datasets = {
+                "actions": columns["action"],
+                "dones": columns["next.done"].astype(np.uint8),
+                "rewards": columns["next.reward"],
+            }
+            for key, values in split_state_columns(columns, modality, info["features"]).items():
+                datasets[f"obs/{key}"] = values
+            for stream in streams:
+                datasets[f"obs/{stream['camera_key']}"] = read_stream_frames(dataset_dir, info, stream, chunk_index,
+                                                                            episode_index, num_frames)
+
+            total_bytes += write_demo(data_group, f"demo_{demo_number}", datasets, compression, compression_level)
+            total_frames += num_frames
+
+        data_group.attrs["total"] = total_frames
+    os.replace(tmp_path, hdf5_path)
+
+    return {
+        "hdf5_file": hdf5_path,
+        "task_name": task_entry["task"],
+        "num_demos": len(episodes),
+        "total_frames": total_frames,
+        "total_bytes": total_bytes,
+    }
+
+
+def export_to_hdf5(dataset_dir: str, output_dir: str, compression: Optional[str] = "gzip",
+                   compression_level: Optional[int] = 4, workers: int = 1) -> List[Dict[str, Any]]:
+    """
+    Export a converted LeRobot dataset back to LIBERO/robomimic HDF5 files.
+
+    Every task becomes a <task>_demo.hdf5 file whose data/demo_N groups hold actions, rewards,
+    dones and the obs datasets read by extract_demo_data: the state observations recovered
+    from observation.state and the separate state columns, and the camera streams decoded
+    from the videos (or the PNG frames). Demos are numbered in episode order within a task.
+    Only observations that were converted can be exported, so a dataset converted with the
+    default state keys has no end-effector observations.
+
+    Args:
+        dataset_dir (str): Root of the converted dataset
+        output_dir (str): Directory to write the HDF5 files to
+        compression (str, optional): "gzip", "lzf" or None
+        compression_level (int, optional): gzip level (0-9)
+        workers (int): Number of task files exported in parallel
+
+    Returns:
+        List[Dict[str, Any]]: One entry per written file, see export_task_file
+    """
+    get_compression_options(compression, compression_level)  # Fail before any work on a bad filter
+
+    task_registry = load_task_registry(dataset_dir)
+    episodes_by_task = {}
+    for episode in read_episodes_jsonl(dataset_dir):
+        task_name = next(task for task in episode["tasks"] if task != VALID_TASK)
+        episodes_by_task.setdefault(task_name, []).append(episode)
+
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(dataset_dir, os.path.join(output_dir, f"{task_name}_demo.hdf5"), task_registry.get(task_name, {"task": task_name}),
+             sorted(episodes, key=lambda episode: episode["episode_index"]), compression, compression_level)
+            for task_name, episodes in sorted(episodes_by_task.items())]
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            results = list(executor.map(export_task_file, *zip(*jobs)))
+    else:
+        results = [export_task_file(*job) for job in jobs]
+
+    for result in results:
+        print(f"✅ Exported {result['num_demos']} demos ({result['total_frames']} frames) to {os.path.basename(result['hdf5_file'])}")
+    return results
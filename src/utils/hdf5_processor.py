@@ -1,82 +1,277 @@
-import h5py
-import pandas as pd
+import io
 import numpy as np
 import os
-import time
-from typing import Dict, List, Any, Tuple, Union
-from tqdm import tqdm
-from .image_processing import process_episode_images, create_episode_videos
-from config import FPS, TIMESTEP_DURATION, IMAGE_HEIGHT, IMAGE_WIDTH, IMAGE_CHANNELS, JOINT_COUNT , SLEEP_TIME, OUTPUT_DIR
-
-def extract_demo_data(demo_group: h5py.Group) -> Tuple[np.ndarray, np.ndarray, np.ndarray, 
-                                                      np.ndarray, np.ndarray, np.ndarray, 
-                                                      np.ndarray, np.ndarray, np.ndarray]:
-    """Extract all data from a demo group."""
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Tuple, Union
+from .image_processing import process_episode_images, create_episode_videos, resize_frames
+from .image_processing import get_camera_keys, is_depth_stream, to_uint16_depth
+from .variants import normalize_variants
+from .progress import record_progress
+from .episode_cache import get_episode_cache_key
+from .parquet_writer import with_episode_metadata, write_episode_table
+from .derived_features import compute_derived_features
+from .success_features import compute_success_features
+from .previews import build_episode_previews, write_episode_previews
+from config import FPS, TIMESTEP_DURATION, IMAGE_HEIGHT, IMAGE_WIDTH, IMAGE_CHANNELS, JOINT_COUNT , OUTPUT_DIR, get_default_config
+from config import TASK_DESCRIPTION_DEFAULT, VALIDITY_DEFAULT, DEPTH_SCALE
+
+if TYPE_CHECKING:
+    import h5py
+    import pyarrow as pa
+
+# Proprioceptive observations that can be composed into observation.state
+STATE_OBSERVATION_KEYS = ("ee_ori", "ee_pos", "ee_states", "gripper_states", "joint_states")
+
+# extract_demo_data returns these many low-dimensional arrays before the camera frames
+NUM_LOW_DIM_ARRAYS = 8
+
+def extract_demo_data(demo_group: 'h5py.Group', camera_keys: Optional[List[str]] = None) -> Tuple[np.ndarray, ...]:
+    """
+    Extract all data from a demo group.
+
+    Returns the low-dimensional arrays followed by the frames of every camera stream in
+    camera_keys order; camera_keys defaults to every *_rgb and *_depth dataset of the obs group.
+    """
     actions = demo_group['actions'][:]
     dones = demo_group['dones'][:]
     rewards = demo_group['rewards'][:]
     obs = demo_group['obs']
     
     # Extract observation components
-    agentview_rgb = obs['agentview_rgb'][:]
     ee_ori = obs['ee_ori'][:]
     ee_pos = obs['ee_pos'][:]
     ee_states = obs['ee_states'][:]
-    eye_in_hand_rgb = obs['eye_in_hand_rgb'][:]
     gripper_states = obs['gripper_states'][:]
     joint_states = obs['joint_states'][:]
     
-    return actions, dones, rewards, agentview_rgb, ee_ori, ee_pos, ee_states, eye_in_hand_rgb, gripper_states, joint_states
+    # Camera streams, each read in one go
+    if camera_keys is None:
+        camera_keys = get_camera_keys(obs.keys())
+    camera_frames = tuple(obs[camera_key][:] for camera_key in camera_keys)
+    
+    return (actions, dones, rewards, ee_ori, ee_pos, ee_states, gripper_states, joint_states) + camera_frames
 
 
-def create_timestep_data(t: int, actions: np.ndarray, rewards: np.ndarray, dones: np.ndarray, 
-                        joint_states: np.ndarray, global_episode_index: int, task_index: int) -> Dict[str, Any]:
-    """Create data dictionary for a single timestep."""
-    timestamp = float(t) * TIMESTEP_DURATION  # Assuming 20 FPS (0.05s per frame)
-    
+def get_camera_frames(demo_arrays: Tuple[np.ndarray, ...], camera_keys: List[str]) -> Dict[str, np.ndarray]:
+    """Map the camera frames returned by extract_demo_data to their camera keys."""
+    return dict(zip(camera_keys, demo_arrays[NUM_LOW_DIM_ARRAYS:]))
+
+
+def get_state_arrays(demo_arrays: Tuple[np.ndarray, ...]) -> Dict[str, np.ndarray]:
+    """Map the proprioceptive observations returned by extract_demo_data to their obs keys."""
+    _, _, _, ee_ori, ee_pos, ee_states, gripper_states, joint_states = demo_arrays[:NUM_LOW_DIM_ARRAYS]
     return {
-        'observation.state': actions[t].tolist(),
-        'action': actions[t].tolist(),
-        'timestamp': timestamp,
-        'annotation.human.action.task_description': 0, 
-        'task_index': task_index, 
-        'annotation.human.validity': 1, 
-        'episode_index': global_episode_index, 
-        'index': t,
-        'next.reward': float(rewards[t]),
-        'next.done': bool(dones[t]),
+        "ee_ori": ee_ori,
+        "ee_pos": ee_pos,
+        "ee_states": ee_states,
+        "gripper_states": gripper_states,
+        "joint_states": joint_states,
     }
 
 
-def process_single_demo_for_chunk(demo_group: h5py.Group, episode_index: int, output_dir: str, 
-                                 chunk_index: int, task_name: str, task_index: int) -> Dict[str, Any]:
-    """Process a single demo for a specific chunk."""
+def get_state_layout(datasets: Dict[str, Dict[str, Any]], state_keys: List[str],
+                     state_columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Lay out observation.state and the separate state columns from the per-frame dataset shapes.
+
+    Args:
+        datasets (Dict[str, Dict[str, Any]]): Dataset layouts of an inventory file, e.g. {"obs/joint_states": {"shape": [7]}}
+        state_keys (List[str]): Observation keys concatenated into observation.state, in order
+        state_columns (List[str], optional): Observation keys written as their own observation.<key> columns
+
+    Returns:
+        Dict[str, Any]: {"state": [{"key", "start", "end"}], "columns": [{"key", "dim"}], "action_dim"}
+    """
+    def get_dim(key: str) -> int:
+        if key not in STATE_OBSERVATION_KEYS or f"obs/{key}" not in datasets:
+            raise ValueError(f"Unknown state key '{key}', expected one of: {', '.join(STATE_OBSERVATION_KEYS)}")
+        return int(np.prod(datasets[f"obs/{key}"]["shape"], dtype=np.int64))
+
+    state = []
+    start = 0
+    for key in state_keys:
+        end = start + get_dim(key)
+        state.append({"key": key, "start": start, "end": end})
+        start = end
+
+    return {
+        "state": state,
+        "columns": [{"key": key, "dim": get_dim(key)} for key in state_columns or []],
+        "action_dim": int(np.prod(datasets["actions"]["shape"], dtype=np.int64)),
+    }
+
+
+def compose_state(state_arrays: Dict[str, np.ndarray], state_keys: List[str]) -> np.ndarray:
+    """Concatenate the selected observations into one preallocated (frames, state_dim) float64 array."""
+    num_frames = len(next(iter(state_arrays.values())))
+    parts = [state_arrays[key].reshape(num_frames, -1) for key in state_keys]
+    state = np.empty((num_frames, sum(part.shape[1] for part in parts)), dtype=np.float64)
+    np.concatenate(parts, axis=1, out=state)
+    return state
+
+
+def to_fixed_size_list(values: np.ndarray, dtype=np.float64) -> 'pa.FixedSizeListArray':
+    """Wrap a (frames, dim) array as an Arrow fixed-size list column over its flat buffer."""
+    import pyarrow as pa
+
+    values = np.ascontiguousarray(values, dtype=dtype).reshape(len(values), -1)
+    return pa.FixedSizeListArray.from_arrays(pa.array(values.reshape(-1)), values.shape[1])
+
+
+def build_episode_table(actions: np.ndarray, rewards: np.ndarray, dones: np.ndarray,
+                        global_episode_index: int, task_index: int, state: Optional[np.ndarray] = None,
+                        state_columns: Optional[Dict[str, np.ndarray]] = None) -> 'pa.Table':
+    """
+    Build the parquet table of an episode column by column.
+
+    Every column is built from whole arrays, so the cost does not depend on per-frame Python.
+    observation.state is left out when state is None; state_columns are appended as
+    observation.<key> columns.
+    """
+    import pyarrow as pa
+
+    num_timesteps = len(actions)
+    columns = {}
+    if state is not None:
+        columns["observation.state"] = to_fixed_size_list(state)
+    columns.update({
+        "action": to_fixed_size_list(actions),
+        "timestamp": np.arange(num_timesteps, dtype=np.float64) * TIMESTEP_DURATION,
+        "annotation.human.action.task_description": np.full(num_timesteps, TASK_DESCRIPTION_DEFAULT, dtype=np.int64),
+        "task_index": np.full(num_timesteps, task_index, dtype=np.int64),
+        "annotation.human.validity": np.full(num_timesteps, VALIDITY_DEFAULT, dtype=np.int64),
+        "episode_index": np.full(num_timesteps, global_episode_index, dtype=np.int64),
+        "index": np.arange(num_timesteps, dtype=np.int64),
+        "next.reward": np.asarray(rewards, dtype=np.float64).reshape(-1),
+        "next.done": np.asarray(dones).reshape(-1).astype(bool),
+    })
+    for key, values in (state_columns or {}).items():
+        columns[f"observation.{key}"] = to_fixed_size_list(values)
+
+    return pa.table(columns)
+
+
+def process_single_demo_for_chunk(demo_group: 'h5py.Group', episode_index: int, output_dir: str, 
+                                 chunk_index: int, task_name: str, task_index: int,
+                                 variants: Optional[List[Dict[str, Any]]] = None,
+                                 config: Optional[Dict[str, Any]] = None,
+                                 writer=None, cache=None, encoder=None) -> Dict[str, Any]:
+    """
+    Process a single demo for a specific chunk.
+
+    The demo is read from HDF5 once and then written to every output variant, so extra
+    resolutions or codecs only cost an extra encode. Files go through the AsyncWriter
+    when one is given, the caller must flush it before relying on the files. With an
+    EpisodeCache, a demo that was extracted before (e.g. on a retry) is not read again.
+    observation.state concatenates the observations listed in config["state_keys"]. The
+    camera streams in config["camera_keys"] (all of the demo's streams when None) are read
+    in the same pass, float depth is converted to uint16 with DEPTH_SCALE. With a
+    FrameEncoderPool the frames are handed to its encoder processes through shared memory
+    and only the parquet files are written here; the caller must wait for the pool.
+    The derived features in config["derived_features"] (see compute_derived_features) are
+    appended as extra columns, the normalized ones use config["feature_stats"]. With
+    config["success_features"] the success columns (see compute_success_features) are added
+    and the episode metadata gets the "success_index" of the first successful frame. With
+    config["previews"] a mosaic (and GIF) of strided frames is written to previews/.
+    """
     # print(f"Processing demo_{episode_index}...")
+    if config is None:
+        config = get_default_config()
+    if variants is None:
+        variants = normalize_variants(output_dir, config=config)
     
     # Extract all data
-    actions, dones, rewards, agentview_rgb, ee_ori, ee_pos, ee_states, eye_in_hand_rgb, gripper_states, joint_states = extract_demo_data(demo_group)
+    camera_keys = config["camera_keys"]
+    if camera_keys is None:
+        camera_keys = get_camera_keys(demo_group['obs'].keys())
+    if cache is not None:
+        demo_arrays = cache.get_or_load(get_episode_cache_key(demo_group, camera_keys),
+                                        lambda: extract_demo_data(demo_group, camera_keys))
+    else:
+        demo_arrays = extract_demo_data(demo_group, camera_keys)
+    actions, dones, rewards = demo_arrays[:3]
+    camera_frames = {camera_key: to_uint16_depth(frames, DEPTH_SCALE) if is_depth_stream(camera_key) else frames
+                     for camera_key, frames in get_camera_frames(demo_arrays, camera_keys).items()}
     
     # Get the number of timesteps in this demo
     num_timesteps = len(actions)
-    # print(f"  Saving {num_timesteps} images for agentview and eye_in_hand...")
+    read_bytes = sum(array.nbytes for array in demo_arrays)
     
-    # Process images with progress bar
-    with tqdm(total=num_timesteps, desc=f"Processing images for demo_{episode_index}", 
-              unit="frame", leave=False, position=2) as img_pbar:
-        process_episode_images(episode_index, output_dir, agentview_rgb, eye_in_hand_rgb, num_timesteps, img_pbar)
-    
-    # Create data for each timestep with progress bar
-    demo_data = []
-    with tqdm(total=num_timesteps, desc=f"Creating timestep data for demo_{episode_index}", 
-              unit="timestep", leave=False, position=3) as data_pbar:
-        for t in range(num_timesteps):
-            timestep_data = create_timestep_data(t, actions, rewards, dones, joint_states, episode_index, task_index)
-            demo_data.append(timestep_data)
-            data_pbar.update(1)
-            time.sleep(SLEEP_TIME)
-    
-    # Convert to DataFrame
-    df = pd.DataFrame(demo_data)
+    # Build the columns from whole arrays, the state in the configured key order
+    state_arrays = get_state_arrays(demo_arrays)
+    state = compose_state(state_arrays, config["state_keys"]) if config["state_keys"] else None
+    table = build_episode_table(actions, rewards, dones, episode_index, task_index, state,
+                                {key: state_arrays[key] for key in config["state_columns"]})
+    if config["derived_features"]:
+        derived = compute_derived_features(actions, state, config["derived_features"],
+                                           config["action_chunk_horizon"], config.get("feature_stats"))
+        for name, values in derived.items():
+            table = table.append_column(name, to_fixed_size_list(values, values.dtype))
+    episode_outcome = {}
+    if config["success_features"]:
+        import pyarrow as pa
+        
+        success_features = compute_success_features(rewards, dones, config["return_discount"])
+        for name, values in success_features["columns"].items():
+            table = table.append_column(name, pa.array(values))
+        episode_outcome["success_index"] = success_features["success_index"]
+    table = with_episode_metadata(table, {
+        "episode_index": episode_index,
+        "task_index": task_index,
+        "task_name": task_name,
+        "length": num_timesteps,
+        "source_file": os.path.basename(demo_group.file.filename),
+        "source_demo": demo_group.name.rsplit("/", 1)[-1],
+        **episode_outcome,
+    })
+    
+    # The tabular data is identical for all variants, only the images differ
+    has_media = any(variant["save_images"] or variant["save_videos"] for variant in variants)
+    if encoder is not None and has_media and encoder.submit(episode_index, chunk_index, camera_frames, variants, config):
+        for variant in variants:
+            write_episode_parquet(variant, table, episode_index, chunk_index, config, writer)
+    else:
+        for variant in variants:
+            write_episode_variant(variant, table, episode_index, chunk_index, camera_frames, config, writer)
+    
+    # QA previews from a few frames of the in-memory stacks, encoded once for all variants
+    if config["previews"]:
+        previews = build_episode_previews(camera_frames, config)
+        for variant in variants:
+            write_episode_previews(variant["output_dir"], episode_index, previews, writer)
+    
+    # Create episode metadata
+    episode_metadata = {
+        "episode_index": episode_index,
+        "tasks": [task_name, "valid"],  # Use the actual task name
+        "length": num_timesteps,
+        **episode_outcome
+    }
+    
+    # Counted once the episode is done, so a retried demo is not read twice in the totals
+    record_progress("read", num_timesteps, read_bytes)
+    record_progress("episodes", num_timesteps)
+    return episode_metadata
+
+
+def write_episode_variant(variant: Dict[str, Any], table: 'pa.Table', episode_index: int, chunk_index: int,
+                          camera_frames: Dict[str, np.ndarray],
+                          config: Optional[Dict[str, Any]] = None, writer=None) -> None:
+    """Write the parquet file, images and videos of one episode for a single output variant."""
+    if config is None:
+        config = get_default_config()
+    
+    write_episode_parquet(variant, table, episode_index, chunk_index, config, writer)
+    write_episode_media(variant, episode_index, chunk_index, camera_frames, config, writer)
+
+
+def write_episode_parquet(variant: Dict[str, Any], table: 'pa.Table', episode_index: int, chunk_index: int,
+                          config: Optional[Dict[str, Any]] = None, writer=None) -> None:
+    """Write the parquet file of one episode for a single output variant."""
+    if config is None:
+        config = get_default_config()
+    
+    output_dir = variant["output_dir"]
+    num_timesteps = table.num_rows
     
     # Create episode filename (episode000000, episode000001, etc.)
     episode_filename = f"episode_{episode_index:06d}.parquet"
@@ -85,27 +280,52 @@ def process_single_demo_for_chunk(demo_group: h5py.Group, episode_index: int, ou
     chunk_name = f"chunk-{chunk_index:03d}"
     output_path = os.path.join(output_dir, "data", chunk_name, episode_filename)
     
-    # Save to parquet
-    # print(f"Saving demo_{episode_index} as {episode_filename} with {len(df)} timesteps...")
-    df.to_parquet(output_path, index=False)
+    # Save to parquet, with statistics, page index and bloom filters for filter pushdown
+    compression = config["parquet_compression"]
+    if writer is not None:
+        buffer = io.BytesIO()
+        write_episode_table(table, buffer, compression)
+        writer.write_bytes(output_path, buffer.getvalue())
+        record_progress("parquet", num_timesteps, buffer.getbuffer().nbytes)
+    else:
+        write_episode_table(table, output_path, compression)
+        record_progress("parquet", num_timesteps, os.path.getsize(output_path))
+
+
+def write_episode_media(variant: Dict[str, Any], episode_index: int, chunk_index: int,
+                        camera_frames: Dict[str, np.ndarray],
+                        config: Optional[Dict[str, Any]] = None, writer=None) -> None:
+    """Write the PNG frames and videos of one episode for a single output variant."""
+    from tqdm import tqdm
     
-    # Create episode metadata
-    episode_metadata = {
-        "episode_index": episode_index,
-        "tasks": [task_name, "valid"],  # Use the actual task name
-        "length": len(df)
-    }
+    if config is None:
+        config = get_default_config()
     
-    # print(f"Successfully saved {len(df)} rows to {output_path}")
-    # print(f"  Saved {num_timesteps} agentview images and {num_timesteps} eye_in_hand images")
+    # Images and videos are the expensive stages, skip them entirely when switched off
+    if not variant["save_images"] and not variant["save_videos"]:
+        return
     
-    # Create videos from saved images
-    create_episode_videos(episode_index, output_dir, chunk_index)
+    output_dir = variant["output_dir"]
+    num_timesteps = len(next(iter(camera_frames.values()))) if camera_frames else 0
+    camera_frames = {camera_key: resize_frames(frames, variant["image_height"], variant["image_width"],
+                                               nearest=is_depth_stream(camera_key))
+                     for camera_key, frames in camera_frames.items()}
     
-    return episode_metadata
+    # Process images with progress bar
+    if variant["save_images"]:
+        with tqdm(total=num_timesteps, desc=f"Processing images for demo_{episode_index}", 
+                  unit="frame", leave=False, position=2, disable=not config["enable_progress_bars"]) as img_pbar:
+            process_episode_images(episode_index, output_dir, camera_frames, num_timesteps, img_pbar, writer)
+    
+    # Encode videos straight from the in-memory frames
+    if variant["save_videos"]:
+        create_episode_videos(episode_index, output_dir, chunk_index,
+                              camera_frames=camera_frames,
+                              codec=variant["video_codec"], crf=variant["video_crf"],
+                              writer=writer, tmp_dir=config["local_tmp_dir"])
 
 
-def get_demo_keys(data_group: h5py.Group) -> List[str]:
+def get_demo_keys(data_group: 'h5py.Group') -> List[str]:
     """Get all demo keys from the data group."""
     demo_keys = [key for key in data_group.keys() if key.startswith('demo_')]
     demo_keys.sort()  # Sort to ensure consistent order
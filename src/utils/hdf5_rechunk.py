@@ -0,0 +1,127 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional
+from .hdf5_export import get_frame_chunks, get_compression_options
+from .hdf5_processor import get_demo_keys
+
+
+def benchmark_read(hdf5_path: str) -> Dict[str, Any]:
+    """
+    Measure read throughput the way the converter reads: demo by demo, every dataset in full.
+
+    The OS page cache is not dropped, so a file that was just read or written may be served
+    from memory; compare runs on cold files for storage numbers.
+    """
+    import h5py
+
+    num_bytes = 0
+    start_time = time.perf_counter()
+    with h5py.File(hdf5_path, 'r') as f:
+        data_group = f['data']
+        for demo_key in get_demo_keys(data_group):
+            datasets = []
+            data_group[demo_key].visititems(lambda name, item: datasets.append(item) if isinstance(item, h5py.Dataset) else None)
+            for dataset in datasets:
+                num_bytes += dataset[()].nbytes
+    seconds = time.perf_counter() - start_time
+
+    return {"bytes": num_bytes, "seconds": seconds, "mb_per_s": num_bytes / 1e6 / max(seconds, 1e-9)}
+
+
+def rechunk_hdf5_file(hdf5_path: str, output_path: str, compression: Optional[str] = "lzf",
+                      compression_level: Optional[int] = 4, page_size: Optional[int] = 1024 * 1024) -> Dict[str, Any]:
+    """
+    Rewrite an HDF5 file with frame-aligned chunks, the given filter and consolidated metadata.
+
+    Datasets keep their dtype and attributes and are chunked by get_frame_chunks: one frame per
+    chunk for images, time-chunked low-dimensional arrays. With a page_size the file uses paged
+    aggregation, which packs metadata and small datasets into pages so opening the file and
+    walking its demos takes a few large reads instead of many small ones. Demos are copied one
+    at a time, and output_path is only replaced once the file is complete, so output_path may
+    be hdf5_path itself.
+
+    Returns:
+        Dict[str, Any]: Source and output paths and file sizes
+    """
+    import h5py
+
+    options = get_compression_options(compression, compression_level)
+    file_options = {"libver": "latest"}
+    if page_size:
+        file_options.update({"fs_strategy": "page", "fs_persist": True, "fs_page_size": page_size})
+
+    file_size = os.path.getsize(hdf5_path)
+    tmp_path = output_path + ".tmp"
+    with h5py.File(hdf5_path, 'r') as source, h5py.File(tmp_path, 'w', **file_options) as target:
+        def copy_item(name: str, item: Any) -> None:
+            if isinstance(item, h5py.Group):
+                target.require_group(name).attrs.update(item.attrs)
+                return
+            values = item[()]
+            dataset = target.create_dataset(name, data=values, chunks=get_frame_chunks(values.shape) if values.ndim else None,
+                                            **(options if values.ndim else {}))
+            dataset.attrs.update(item.attrs)
+
+        target.attrs.update(source.attrs)
+        source.visititems(copy_item)
+    os.replace(tmp_path, output_path)
+
+    return {
+        "hdf5_file": hdf5_path,
+        "output_file": output_path,
+        "file_size_before": file_size,
+        "file_size_after": os.path.getsize(output_path),
+    }
+
+
+def rechunk_and_benchmark(hdf5_path: str, output_path: str, compression: Optional[str] = "lzf",
+                          compression_level: Optional[int] = 4, page_size: Optional[int] = 1024 * 1024,
+                          benchmark: bool = True) -> Dict[str, Any]:
+    """Rechunk one file, measuring its read throughput before and after when benchmark is set."""
+    before = benchmark_read(hdf5_path) if benchmark else None
+    result = rechunk_hdf5_file(hdf5_path, output_path, compression, compression_level, page_size)
+    after = benchmark_read(output_path) if benchmark else None
+    result.update({"read_before": before, "read_after": after})
+    return result
+
+
+def rechunk_hdf5_files(hdf5_files: List[str], output_dir: Optional[str] = None, compression: Optional[str] = "lzf",
+                       compression_level: Optional[int] = 4, page_size: Optional[int] = 1024 * 1024,
+                       workers: int = 1, benchmark: bool = True) -> List[Dict[str, Any]]:
+    """
+    Rechunk the given HDF5 files in parallel, see rechunk_hdf5_file.
+
+    Args:
+        hdf5_files (List[str]): Files to rewrite, e.g. from get_hdf5_files
+        output_dir (str, optional): Directory for the rewritten files, None rewrites them in place
+        compression (str, optional): "gzip", "lzf" or None
+        compression_level (int, optional): gzip level (0-9)
+        page_size (int, optional): File space page size in bytes, None disables paged aggregation
+        workers (int): Number of files rewritten in parallel
+        benchmark (bool): Measure the read throughput of every file before and after
+
+    Returns:
+        List[Dict[str, Any]]: One result per file, in input order
+    """
+    get_compression_options(compression, compression_level)  # Fail before any work on a bad filter
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    jobs = [(hdf5_path, os.path.join(output_dir, os.path.basename(hdf5_path)) if output_dir else hdf5_path,
+             compression, compression_level, page_size, benchmark)
+            for hdf5_path in hdf5_files]
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            results = list(executor.map(rechunk_and_benchmark, *zip(*jobs)))
+    else:
+        results = [rechunk_and_benchmark(*job) for job in jobs]
+
+    for result in results:
+        message = f"✅ Rechunked {os.path.basename(result['hdf5_file'])}: " \
+                  f"{result['file_size_before'] / 1e6:.1f} MB -> {result['file_size_after'] / 1e6:.1f} MB"
+        if benchmark:
+            message += f", read {result['read_before']['mb_per_s']:.1f} -> {result['read_after']['mb_per_s']:.1f} MB/s"
+        print(message)
+    return results
@@ -1,26 +1,103 @@
+import io
 import os
-import cv2
+import subprocess
+import tempfile
 import numpy as np
-from PIL import Image
-from typing import List
-from config import FPS, TIMESTEP_DURATION, IMAGE_HEIGHT, IMAGE_WIDTH, IMAGE_CHANNELS, JOINT_COUNT, SLEEP_TIME
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from .blob_store import remove_existing_file
+from .progress import record_progress
+from config import FPS, TIMESTEP_DURATION, IMAGE_HEIGHT, IMAGE_WIDTH, IMAGE_CHANNELS, JOINT_COUNT, SLEEP_TIME, VIDEO_CODEC
 
-def save_image_as_png(image_array: np.ndarray, output_path: str) -> None:
-    """Save a numpy array as a PNG image with proper normalization."""
-    # Convert numpy array to PIL Image and save
+# Camera streams written when a dataset's streams have not been discovered
+DEFAULT_CAMERA_KEYS = ["agentview_rgb", "eye_in_hand_rgb"]
+
+
+def is_depth_stream(camera_key: str) -> bool:
+    """Check whether a camera stream holds depth maps rather than RGB frames."""
+    return camera_key.endswith("_depth")
+
+
+def get_camera_keys(obs_keys: Iterable[str], selected_keys: Optional[List[str]] = None) -> List[str]:
+    """
+    Find the camera streams among the datasets of an obs group.
+
+    Args:
+        obs_keys (Iterable[str]): Dataset names of the obs group
+        selected_keys (List[str], optional): Streams to keep, in this order; defaults to every
+            *_rgb and *_depth dataset in sorted order
+
+    Returns:
+        List[str]: Camera keys, e.g. ["agentview_rgb", "eye_in_hand_rgb"]
+    """
+    discovered = sorted(key for key in obs_keys if key.endswith("_rgb") or is_depth_stream(key))
+    if selected_keys is None:
+        return discovered
+    for key in selected_keys:
+        if key not in discovered:
+            raise ValueError(f"Unknown camera stream '{key}', expected one of: {', '.join(discovered)}")
+    return list(selected_keys)
+
+
+def get_video_key(camera_key: str) -> str:
+    """Get the LeRobot feature and video directory name of a camera stream."""
+    return f"observation.images.{camera_key}"
+
+
+def get_image_dir_name(camera_key: str) -> str:
+    """Get the PNG directory name of a camera stream, e.g. "agentview" for agentview_rgb."""
+    return camera_key[:-len("_rgb")] if camera_key.endswith("_rgb") else camera_key
+
+
+def to_uint16_depth(frames: np.ndarray, depth_scale: float) -> np.ndarray:
+    """Convert a (T, H, W[, 1]) depth stack to uint16; float depth is multiplied by depth_scale and rounded."""
+    frames = frames.reshape(frames.shape[:3])
+    if np.issubdtype(frames.dtype, np.floating):
+        return np.clip(np.rint(frames * depth_scale), 0, np.iinfo(np.uint16).max).astype(np.uint16)
+    return frames.astype(np.uint16, copy=False)
+
+
+def to_png_array(image_array: np.ndarray) -> np.ndarray:
+    """Prepare an image for PNG encoding, 16-bit depth maps stay 16-bit."""
+    if image_array.dtype == np.uint16:
+        return image_array.reshape(image_array.shape[:2])
+    return to_uint8_image(image_array)
+
+
+def to_uint8_image(image_array: np.ndarray) -> np.ndarray:
+    """Convert an image array to uint8, scaling [0, 1] float images to 0-255."""
     if image_array.dtype != np.uint8:
         # Normalize to 0-255 range if needed
         if image_array.max() <= 1.0:
             image_array = (image_array * 255).astype(np.uint8)
         else:
             image_array = image_array.astype(np.uint8)
+    return image_array
+
+
+def save_image_as_png(image_array: np.ndarray, output_path: str) -> None:
+    """Save a numpy array as a PNG image with proper normalization."""
+    from PIL import Image
     
-    pil_image = Image.fromarray(image_array)
+    # Convert numpy array to PIL Image and save
+    pil_image = Image.fromarray(to_png_array(image_array))
+    remove_existing_file(output_path)
     pil_image.save(output_path)
 
 
+def encode_png(image_array: np.ndarray) -> bytes:
+    """Encode a numpy array as PNG bytes, normalized like save_image_as_png."""
+    from PIL import Image
+    
+    buffer = io.BytesIO()
+    Image.fromarray(to_png_array(image_array)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
 def create_video_from_images(image_files: List[str], images_dir: str, video_path: str, fps: float = FPS) -> None:
     """Create a video from a list of image files."""
+    import cv2
+    
     if not image_files:
         print(f"  No images found for video creation")
         return
@@ -31,6 +108,7 @@ def create_video_from_images(image_files: List[str], images_dir: str, video_path
     
     # Define video writer
     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    remove_existing_file(video_path)
     out = cv2.VideoWriter(video_path, fourcc, fps, (width, height))
     
     for img_file in image_files:
@@ -41,27 +119,114 @@ def create_video_from_images(image_files: List[str], images_dir: str, video_path
     # print(f"  Saved video at {video_path}")
 
 
-def process_episode_images(episode_index: int, output_dir: str, agentview_rgb: np.ndarray, 
-                          eye_in_hand_rgb: np.ndarray, num_timesteps: int, pbar=None) -> List[str]:
-    """Process and save images for an episode, return list of image filenames."""
+def resize_frames(frames: np.ndarray, height: int, width: int, nearest: bool = False) -> np.ndarray:
+    """
+    Resize a (T, H, W[, C]) frame stack, returning the input unchanged if it already matches.
+
+    nearest picks nearest-neighbour instead of area interpolation, so depth maps are not
+    averaged across object edges.
+    """
+    if frames.shape[1] == height and frames.shape[2] == width:
+        return frames
+
+    import cv2
+
+    interpolation = cv2.INTER_NEAREST if nearest else cv2.INTER_AREA
+    resized = np.empty((frames.shape[0], height, width) + frames.shape[3:], dtype=frames.dtype)
+    for t in range(frames.shape[0]):
+        resized[t] = cv2.resize(frames[t], (width, height), interpolation=interpolation).reshape(resized.shape[1:])
+    return resized
+
+
+def create_video_from_frames(frames: np.ndarray, video_path: str, fps: float = FPS,
+                             codec: str = VIDEO_CODEC, crf: Optional[int] = None) -> None:
+    """Create a video directly from an in-memory (T, H, W, 3) RGB frame stack."""
+    if len(frames) == 0:
+        print(f"  No frames found for video creation")
+        return
+
+    height, width = frames.shape[1:3]
+
+    if crf is not None:
+        # OpenCV cannot set a rate factor, so pipe raw frames through ffmpeg instead
+        command = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+            "-c:v", "libx264", "-crf", str(crf), "-pix_fmt", "yuv420p", video_path,
+        ]
+        subprocess.run(command, input=np.ascontiguousarray(frames).tobytes(), check=True)
+        return
+
+    import cv2
+
+    fourcc = cv2.VideoWriter_fourcc(*codec)
+    out = cv2.VideoWriter(video_path, fourcc, fps, (width, height))
+
+    for frame in frames:
+        # OpenCV expects BGR channel order
+        out.write(np.ascontiguousarray(frame[:, :, ::-1]))
+
+    out.release()
+
+
+def create_depth_video_from_frames(frames: np.ndarray, video_path: str, fps: float = FPS) -> None:
+    """Encode a (T, H, W) uint16 depth stack losslessly as 16-bit grayscale FFV1."""
+    import cv2
+
+    if len(frames) == 0:
+        print(f"  No frames found for video creation")
+        return
+
+    height, width = frames.shape[1:3]
+    out = cv2.VideoWriter(video_path, cv2.CAP_FFMPEG, cv2.VideoWriter_fourcc(*"FFV1"), fps, (width, height),
+                          [cv2.VIDEOWRITER_PROP_DEPTH, cv2.CV_16U, cv2.VIDEOWRITER_PROP_IS_COLOR, 0])
+    if not out.isOpened():
+        raise RuntimeError("OpenCV cannot write 16-bit FFV1 video, depth streams need its FFmpeg backend")
+
+    for frame in frames:
+        out.write(np.ascontiguousarray(frame))
+
+    out.release()
+
+
+def create_stream_video(camera_key: str, frames: np.ndarray, video_path: str,
+                        codec: str = VIDEO_CODEC, crf: Optional[int] = None) -> None:
+    """Encode one camera stream, depth losslessly and RGB with the given codec."""
+    remove_existing_file(video_path)
+    if is_depth_stream(camera_key):
+        create_depth_video_from_frames(frames, video_path)
+    else:
+        create_video_from_frames(frames, video_path, codec=codec, crf=crf)
+
+
+def process_episode_images(episode_index: int, output_dir: str, camera_frames: Dict[str, np.ndarray],
+                          num_timesteps: int, pbar=None, writer=None) -> List[str]:
+    """
+    Process and save images for an episode, return list of image filenames.
+
+    camera_frames maps camera keys (e.g. "agentview_rgb") to their frames; uint16 depth maps
+    are saved as 16-bit PNGs. With an AsyncWriter the PNGs are encoded in memory and handed
+    off to its writer threads.
+    """
     image_filenames = []
     
     for t in range(num_timesteps):
         timestamp = float(t) * TIMESTEP_DURATION  # Assuming 20 FPS (0.05s per frame)
+        image_filename = f"episode_{episode_index:06d}_timestamp_{timestamp:.3f}.png"
+        num_bytes = 0
         
-        # Save agentview image
-        agentview_img = agentview_rgb[t]
-        agentview_filename = f"episode_{episode_index:06d}_timestamp_{timestamp:.3f}.png"
-        agentview_path = os.path.join(output_dir, "images", "agentview", agentview_filename)
-        save_image_as_png(agentview_img, agentview_path)
+        for camera_key, frames in camera_frames.items():
+            image_path = os.path.join(output_dir, "images", get_image_dir_name(camera_key), image_filename)
+            if writer is not None:
+                png_data = encode_png(frames[t])
+                writer.write_bytes(image_path, png_data)
+                num_bytes += len(png_data)
+            else:
+                save_image_as_png(frames[t], image_path)
+                num_bytes += os.path.getsize(image_path)
         
-        # Save eye_in_hand image
-        eye_in_hand_img = eye_in_hand_rgb[t]
-        eye_in_hand_filename = f"episode_{episode_index:06d}_timestamp_{timestamp:.3f}.png"
-        eye_in_hand_path = os.path.join(output_dir, "images", "eye_in_hand", eye_in_hand_filename)
-        save_image_as_png(eye_in_hand_img, eye_in_hand_path)
-        
-        image_filenames.append(agentview_filename)
+        image_filenames.append(image_filename)
+        record_progress("images", 1, num_bytes)
         
         # Update progress bar if provided
         if pbar:
@@ -73,10 +238,50 @@ def process_episode_images(episode_index: int, output_dir: str, agentview_rgb: n
     return image_filenames
 
 
-def create_episode_videos(episode_index: int, output_dir: str, chunk_index: int = 0) -> None:
-    """Create videos from saved images for an episode."""
-    for cam_type in ["agentview", "eye_in_hand"]:
-        images_dir = os.path.join(output_dir, "images", cam_type)
+def create_episode_videos(episode_index: int, output_dir: str, chunk_index: int = 0,
+                          camera_frames: Optional[Dict[str, np.ndarray]] = None,
+                          codec: str = VIDEO_CODEC, crf: Optional[int] = None,
+                          writer=None, tmp_dir: Optional[str] = None) -> None:
+    """
+    Create videos for an episode.
+
+    Frames are encoded straight from memory when camera_frames is given (keyed by camera key,
+    e.g. "agentview_rgb"), one thread per stream, with depth streams stored as lossless 16-bit
+    FFV1. Otherwise the PNGs previously saved for the default cameras are read back.
+    With an AsyncWriter the encoder writes to a temp file in tmp_dir (local disk) and the
+    finished file is handed off to the writer threads.
+    """
+    chunk_name = f"chunk-{chunk_index:03d}"
+
+    if camera_frames is not None:
+        def encode_stream(camera_key: str, frames: np.ndarray) -> None:
+            video_dir = os.path.join(output_dir, "videos", chunk_name, get_video_key(camera_key))
+            os.makedirs(video_dir, exist_ok=True)
+            video_path = os.path.join(video_dir, f"episode_{episode_index:06d}.mp4")
+            
+            if writer is None:
+                create_stream_video(camera_key, frames, video_path, codec=codec, crf=crf)
+                record_progress("videos", len(frames), os.path.getsize(video_path))
+                return
+            
+            fd, local_path = tempfile.mkstemp(suffix=".mp4", dir=tmp_dir)
+            os.close(fd)
+            try:
+                create_stream_video(camera_key, frames, local_path, codec=codec, crf=crf)
+                record_progress("videos", len(frames), os.path.getsize(local_path))
+                writer.move_file(local_path, video_path)
+            except BaseException:
+                os.remove(local_path)
+                raise
+        
+        # The encoders release the GIL, so the streams of an episode are encoded side by side
+        with ThreadPoolExecutor(max_workers=max(1, len(camera_frames))) as executor:
+            for future in [executor.submit(encode_stream, camera_key, frames) for camera_key, frames in camera_frames.items()]:
+                future.result()
+        return
+
+    for camera_key in DEFAULT_CAMERA_KEYS:
+        images_dir = os.path.join(output_dir, "images", get_image_dir_name(camera_key))
         
         # Find all images for this episode
         prefix = f"episode_{episode_index:06d}_timestamp_"
@@ -86,17 +291,13 @@ def create_episode_videos(episode_index: int, output_dir: str, chunk_index: int
         image_files.sort(key=lambda x: float(x.split("timestamp_")[1].replace(".png", "")))
         
         if not image_files:
-            print(f"  No images found for {cam_type} in episode {episode_index}")
+            print(f"  No images found for {camera_key} in episode {episode_index}")
             continue
         
         # Set video output path using chunk_index
-        chunk_name = f"chunk-{chunk_index:03d}"
-        if cam_type == "agentview":
-            video_dir = os.path.join(output_dir, "videos", chunk_name, "observation.images.agentview_rgb")
-        else:
-            video_dir = os.path.join(output_dir, "videos", chunk_name, "observation.images.eye_in_hand_rgb")
+        video_dir = os.path.join(output_dir, "videos", chunk_name, get_video_key(camera_key))
         
         os.makedirs(video_dir, exist_ok=True)
         video_path = os.path.join(video_dir, f"episode_{episode_index:06d}.mp4")
         
-        create_video_from_images(image_files, images_dir, video_path) 
\ No newline at end of file
+        create_video_from_images(image_files, images_dir, video_path)
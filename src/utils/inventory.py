@@ -0,0 +1,122 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional
+from .task_registry import extract_task_info
+
+
+def to_json_value(value: Any) -> Any:
+    """Convert an HDF5 attribute value to something json.dumps can write."""
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return value
+
+
+def describe_dataset(dataset: Any) -> Dict[str, Any]:
+    """Describe the layout of an HDF5 dataset from its metadata, without reading its data."""
+    return {
+        "shape": list(dataset.shape[1:]),
+        "dtype": str(dataset.dtype),
+        "chunks": list(dataset.chunks) if dataset.chunks else None,
+        "compression": dataset.compression,
+        "compression_opts": to_json_value(dataset.compression_opts),
+        "shuffle": dataset.shuffle,
+        "fletcher32": dataset.fletcher32,
+    }
+
+
+def scan_hdf5_file(hdf5_path: str) -> Dict[str, Any]:
+    """
+    Scan the metadata of a LIBERO HDF5 file.
+
+    Only shapes, dtypes, chunk layouts, filters and attributes are read, no pixel data.
+
+    Args:
+        hdf5_path (str): Path to the HDF5 file
+
+    Returns:
+        Dict[str, Any]: File inventory with per-demo frame counts and per-dataset layout and sizes
+    """
+    import h5py
+    from .hdf5_processor import get_demo_keys
+
+    demos = []
+    datasets = {}
+
+    with h5py.File(hdf5_path, 'r') as f:
+        data_group = f['data']
+        attrs = {key: to_json_value(value) for key, value in data_group.attrs.items()}
+        task_info = extract_task_info(hdf5_path, data_group.attrs)
+
+        for demo_key in get_demo_keys(data_group):
+            demo_group = data_group[demo_key]
+            demo_datasets = []
+            demo_group.visititems(lambda name, item: demo_datasets.append((name, item))
+                                  if isinstance(item, h5py.Dataset) else None)
+
+            demo_bytes = 0
+            for name, dataset in demo_datasets:
+                num_bytes = dataset.size * dataset.dtype.itemsize
+                demo_bytes += num_bytes
+
+                if name not in datasets:
+                    datasets[name] = describe_dataset(dataset)
+                    datasets[name].update({"total_bytes": 0, "stored_bytes": 0})
+                datasets[name]["total_bytes"] += num_bytes
+                datasets[name]["stored_bytes"] += dataset.id.get_storage_size()
+
+            demos.append({
+                "demo_key": demo_key,
+                "num_frames": demo_group['actions'].shape[0],
+                "num_bytes": demo_bytes,
+            })
+
+    return {
+        "file": hdf5_path,
+        "file_name": os.path.basename(hdf5_path),
+        "file_size": os.path.getsize(hdf5_path),
+        "task": task_info,
+        "attrs": attrs,
+        "num_demos": len(demos),
+        "total_frames": sum(demo["num_frames"] for demo in demos),
+        "total_bytes": sum(demo["num_bytes"] for demo in demos),
+        "demos": demos,
+        "datasets": datasets,
+    }
+
+
+def build_inventory(hdf5_files: List[str], num_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Scan the metadata of all HDF5 files in parallel and summarize the dataset.
+
+    Args:
+        hdf5_files (List[str]): Paths to the HDF5 files, in conversion order
+        num_workers (int, optional): Number of scanning processes, defaults to one per CPU
+
+    Returns:
+        Dict[str, Any]: Totals over all files plus the per-file inventories
+    """
+    num_workers = min(num_workers or os.cpu_count() or 1, max(len(hdf5_files), 1))
+
+    if num_workers > 1:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            files = list(executor.map(scan_hdf5_file, hdf5_files))
+    else:
+        files = [scan_hdf5_file(path) for path in hdf5_files]
+
+    bytes_per_dataset = {}
+    for file_inventory in files:
+        for name, dataset in file_inventory["datasets"].items():
+            bytes_per_dataset[name] = bytes_per_dataset.get(name, 0) + dataset["total_bytes"]
+
+    return {
+        "num_files": len(files),
+        "total_demos": sum(entry["num_demos"] for entry in files),
+        "total_frames": sum(entry["total_frames"] for entry in files),
+        "total_bytes": sum(entry["total_bytes"] for entry in files),
+        "total_file_size": sum(entry["file_size"] for entry in files),
+        "max_demo_frames": max((demo["num_frames"] for entry in files for demo in entry["demos"]), default=0),
+        "bytes_per_dataset": bytes_per_dataset,
+        "files": files,
+    }
@@ -0,0 +1,178 @@
+import os
+from typing import Dict, List, Any, Optional
+
+# Resident memory of an idle worker: interpreter, numpy, h5py, pyarrow and cv2
+WORKER_BASE_BYTES = 256 * 1024 * 1024
+
+# Resident memory of an idle encoder process
+ENCODER_PROCESS_BASE_BYTES = 128 * 1024 * 1024
+
+# Copies of the largest demo a worker holds while converting it: the extracted arrays,
+# converted/resized frames and the encoded parquet, PNG and video buffers
+EPISODE_MEMORY_FACTOR = 3
+
+# Fractions of the budget above which no further worker is started, and below which one more is
+HIGH_WATERMARK = 0.9
+LOW_WATERMARK = 0.7
+
+# Seconds between memory samples while workers are running
+GOVERNOR_POLL_SECONDS = 2.0
+
+# Suffixes accepted by parse_memory_size
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_memory_size(value: str) -> int:
+    """Parse a byte size such as "512M", "16G" or "1073741824"."""
+    text = str(value).strip().upper().rstrip("B").rstrip("I")
+    unit = text[-1] if text and text[-1] in SIZE_UNITS else ""
+    try:
+        return int(float(text[:len(text) - len(unit)]) * SIZE_UNITS[unit])
+    except ValueError:
+        raise ValueError(f"Invalid memory size '{value}', expected e.g. 512M or 16G")
+
+
+def get_episode_memory_bytes(inventory: Dict[str, Any]) -> int:
+    """Bytes of the largest demo in the inventory, every dataset of the demo included."""
+    return max((demo["num_bytes"] for entry in inventory["files"] for demo in entry["demos"]), default=0)
+
+
+def plan_memory(inventory: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Size the workers and their in-flight episodes to fit config["memory_budget_bytes"].
+
+    A worker needs its base memory, EPISODE_MEMORY_FACTOR copies of the largest demo and
+    room for one episode of queued writes (and one ring slot with encoder processes). The
+    worker count is the number of such workers that fit, at most config["workers"]. The
+    rest of each worker's share goes to queued writes, ring slots and the episode cache, in
+    that order, each capped at its configured value. An unset (None) episode cache gets room
+    for the largest demo, enough to retry an episode without reading it again.
+
+    Returns:
+        Dict[str, Any]: "workers", "worker_bytes", "episode_bytes" and the config overrides
+            "max_inflight_write_bytes", "encoder_ring_slots" and "episode_cache_bytes"
+    """
+    budget = config["memory_budget_bytes"]
+    episode_bytes = max(get_episode_memory_bytes(inventory), 1)
+    encoder_processes = config["encoder_processes"]
+
+    min_worker_bytes = (WORKER_BASE_BYTES + episode_bytes * (EPISODE_MEMORY_FACTOR + 1)
+                        + encoder_processes * ENCODER_PROCESS_BASE_BYTES + (episode_bytes if encoder_processes else 0))
+    workers = max(1, min(config["workers"], budget // min_worker_bytes))
+    if budget < min_worker_bytes:
+        print(f"⚠️ Memory budget of {budget / 1e9:.2f} GB is below the {min_worker_bytes / 1e9:.2f} GB "
+              f"estimated for one worker, converting with a single worker")
+
+    spare = max(0, budget // workers - min_worker_bytes)
+    max_inflight_write_bytes = min(config["max_inflight_write_bytes"], episode_bytes + spare)
+    spare -= max(0, max_inflight_write_bytes - episode_bytes)
+
+    encoder_ring_slots = config["encoder_ring_slots"]
+    if encoder_processes:
+        wanted_slots = encoder_ring_slots or 2 * encoder_processes
+        encoder_ring_slots = max(1, min(wanted_slots, 1 + spare // episode_bytes))
+        spare -= (encoder_ring_slots - 1) * episode_bytes
+
+    return {
+        "workers": int(workers),
+        "worker_bytes": int(budget // workers),
+        "episode_bytes": int(episode_bytes),
+        "max_inflight_write_bytes": int(max_inflight_write_bytes),
+        "encoder_ring_slots": encoder_ring_slots,
+        "episode_cache_bytes": int(min(episode_bytes if config["episode_cache_bytes"] is None
+                                       else config["episode_cache_bytes"], spare)),
+    }
+
+
+def get_process_rss_bytes(pid: int) -> Optional[int]:
+    """Resident memory of a process from /proc, None where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def get_descendant_pids(pid: int) -> List[int]:
+    """Pids of all children of a process and their children (e.g. workers and their encoder processes)."""
+    children = {}
+    try:
+        names = os.listdir("/proc")
+    except OSError:
+        return []
+    for name in names:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", 'r') as f:
+                # The command name may contain spaces, the parent pid is the second field after it
+                parent = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(parent, []).append(int(name))
+
+    descendants = []
+    stack = [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            descendants.append(child)
+            stack.append(child)
+    return descendants
+
+
+class MemoryGovernor:
+    """
+    Adapts the number of concurrently converted files to the observed memory use.
+
+    The resident memory of the converter and all its worker and encoder processes is
+    sampled whenever a file is about to be started. Above HIGH_WATERMARK of the budget the
+    worker limit drops by one (running files are never interrupted, no new one starts
+    until a file finishes). It only drops again once the running files are within the
+    limit, i.e. once per finished file, as the memory of the files still running above it
+    is already accounted for. Below LOW_WATERMARK, with room for the largest worker seen
+    so far, it grows by one up to max_workers.
+    """
+
+    def __init__(self, budget_bytes: int, max_workers: int, initial_workers: int, pid: Optional[int] = None):
+        self.budget_bytes = budget_bytes
+        self.max_workers = max_workers
+        self.worker_limit = max(1, min(initial_workers, max_workers))
+        self.pid = os.getpid() if pid is None else pid
+        self.peak_bytes = 0
+        self.worker_peak_bytes = 0
+
+    def sample(self, running: int) -> Optional[int]:
+        """Total resident bytes of the process tree, None where it cannot be measured."""
+        own_bytes = get_process_rss_bytes(self.pid)
+        if own_bytes is None:
+            return None
+        descendants = [get_process_rss_bytes(pid) or 0 for pid in get_descendant_pids(self.pid)]
+        total_bytes = own_bytes + sum(descendants)
+        self.peak_bytes = max(self.peak_bytes, total_bytes)
+        if running:
+            self.worker_peak_bytes = max(self.worker_peak_bytes, sum(descendants) // running)
+        return total_bytes
+
+    def get_worker_limit(self, running: int) -> int:
+        """Number of files that may be converted at once, given the files running now."""
+        total_bytes = self.sample(running)
+        if total_bytes is None:
+            return self.worker_limit
+
+        if total_bytes > self.budget_bytes * HIGH_WATERMARK:
+            if self.worker_limit > 1 and running <= self.worker_limit:
+                self.worker_limit -= 1
+                print(f"\n⚠️ Using {total_bytes / 1e9:.2f} GB of the {self.budget_bytes / 1e9:.2f} GB memory budget, "
+                      f"lowering the worker limit to {self.worker_limit}")
+        elif (running >= self.worker_limit and self.worker_limit < self.max_workers
+              and total_bytes + self.worker_peak_bytes <= self.budget_bytes * LOW_WATERMARK):
+            self.worker_limit += 1
+        return self.worker_limit
+
+
+def create_memory_governor(config: Dict[str, Any], memory_plan: Optional[Dict[str, Any]],
+                           max_workers: int) -> Optional[MemoryGovernor]:
+    """Create the governor of config["memory_budget_bytes"], None without a budget."""
+    if not config["memory_budget_bytes"] or memory_plan is None:
+        return None
+    return MemoryGovernor(config["memory_budget_bytes"], max_workers, memory_plan["workers"])
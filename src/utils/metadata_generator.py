@@ -1,6 +1,23 @@
 import os
 import json
-from typing import Dict, List, Any
+import glob
+from typing import Dict, List, Any, Optional
+from .image_processing import DEFAULT_CAMERA_KEYS
+from config import JOINT_COUNT
+
+# observation.state layout (see get_state_layout) of metadata created without one: the joint states
+DEFAULT_STATE_LAYOUT = {
+    "state": [{"key": "joints", "start": 0, "end": JOINT_COUNT}],
+    "columns": [],
+    "action_dim": JOINT_COUNT,
+}
+
+# Episode metadata of every part (the episodes of one source file in one split) is
+# appended here while converting and merged at the end
+PARTIAL_EPISODES_DIR = os.path.join("meta", "partial")
+
+# Episodes that still failed after all retries, listed instead of converted
+FAILED_EPISODES_FILE = os.path.join("meta", "failed_episodes.jsonl")
 
 
 def create_info_json(episodes_data: List[Dict], task_descriptions: List[str], total_episodes: int) -> Dict[str, Any]:
@@ -91,28 +108,38 @@ def create_info_json(episodes_data: List[Dict], task_descriptions: List[str], to
     }
 
 
-def create_modality_json() -> Dict[str, Any]:
-    """Create the modality.json metadata structure."""
+def create_modality_json(state_layout: Optional[Dict[str, Any]] = None,
+                         camera_keys: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Create the modality.json metadata structure with a video entry per camera stream.
+
+    The state ranges follow the observation.state layout of get_state_layout
+    (DEFAULT_STATE_LAYOUT when None). Keys that are only written as separate
+    observation.<key> columns point at their column with original_key. Without camera_keys
+    the DEFAULT_CAMERA_KEYS get a video entry.
+    """
+    if state_layout is None:
+        state_layout = DEFAULT_STATE_LAYOUT
+    if camera_keys is None:
+        camera_keys = DEFAULT_CAMERA_KEYS
+    state = {entry["key"]: {"start": entry["start"], "end": entry["end"]} for entry in state_layout["state"]}
+    for column in state_layout["columns"]:
+        if column["key"] not in state:
+            state[column["key"]] = {"start": 0, "end": column["dim"], "original_key": f"observation.{column['key']}"}
+
     return {
-    "state": {
-      "joints": {
-        "start": 0,
-        "end": 7
-      }
-    },
+    "state": state,
     "action": {
       "joints": {
         "start": 0,
-        "end": 7
+        "end": state_layout["action_dim"]
       }
     },
     "video": {
-      "agentview_rgb": {
-        "original_key": "observation.images.agentview_rgb"
-      },
-      "eye_in_hand_rgb": {
-        "original_key": "observation.images.eye_in_hand_rgb"
+      camera_key: {
+        "original_key": f"observation.images.{camera_key}"
       }
+      for camera_key in camera_keys
     },
     "annotation": {
       "human.action.task_description": {},
@@ -121,19 +148,162 @@ def create_modality_json() -> Dict[str, Any]:
   }
 
 
-def create_stats_json() -> Dict[str, Any]:
-    """Create the stats.json metadata structure."""
+def create_stats_json(feature_stats: Optional[Dict[str, Any]] = None,
+                      state_layout: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Create the stats.json metadata structure, from computed feature stats when given.
+
+    Otherwise placeholder stats are sized like observation.state and action in state_layout
+    (see get_state_layout, DEFAULT_STATE_LAYOUT when None); without state keys there is no
+    observation.state entry.
+    """
+    if feature_stats is not None:
+        return feature_stats
+    if state_layout is None:
+        state_layout = DEFAULT_STATE_LAYOUT
+    state_dim = state_layout["state"][-1]["end"] if state_layout["state"] else 0
+    action_dim = state_layout["action_dim"]
+
+    def placeholder(dim: int) -> Dict[str, List[float]]:
+        return {"mean": [0.0] * dim, "std": [1.0] * dim, "min": [-1.0] * dim, "max": [1.0] * dim}
+
+    stats = {"observation.state": placeholder(state_dim), "action": placeholder(action_dim)}
+    if not state_dim:
+        del stats["observation.state"]
+    return stats
+
+
+def get_partial_episodes_path(output_dir: str, part_index: int) -> str:
+    """Get the path of the partial episodes file of a part."""
+    return os.path.join(output_dir, PARTIAL_EPISODES_DIR, f"part-{part_index:05d}.jsonl")
+
+
+def open_partial_episodes_file(output_dir: str, part_index: int):
+    """Open (and truncate) the partial episodes file of a part for appending episode metadata."""
+    partial_path = get_partial_episodes_path(output_dir, part_index)
+    os.makedirs(os.path.dirname(partial_path), exist_ok=True)
+    return open(partial_path, 'w')
+
+
+def append_episode_metadata(partial_file, episode_metadata: Dict[str, Any]) -> None:
+    """Append one finished episode to a partial episodes file, flushed so it survives a crash."""
+    partial_file.write(json.dumps(episode_metadata) + '\n')
+    partial_file.flush()
+
+
+def read_partial_episodes(output_dir: str, part_index: int) -> List[Dict[str, Any]]:
+    """Read the episodes listed in the partial episodes file of a part, empty if there is none."""
+    partial_path = get_partial_episodes_path(output_dir, part_index)
+    if not os.path.exists(partial_path):
+        return []
+    with open(partial_path, 'r') as partial_file:
+        return [json.loads(line) for line in partial_file if line.strip()]
+
+
+def write_partial_episodes(output_dir: str, part_index: int, episodes: List[Dict[str, Any]]) -> None:
+    """Replace the partial episodes file of a part."""
+    partial_path = get_partial_episodes_path(output_dir, part_index)
+    os.makedirs(os.path.dirname(partial_path), exist_ok=True)
+    with open(partial_path + ".tmp", 'w') as partial_file:
+        for episode in episodes:
+            partial_file.write(json.dumps(episode) + '\n')
+    os.replace(partial_path + ".tmp", partial_path)
+
+
+def write_failed_episodes(output_dir: str, failed_episodes: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Write the quarantined episodes to meta/failed_episodes.jsonl.
+
+    A stale file from an earlier run is removed when nothing failed. Returns the path, or None.
+    """
+    failed_path = os.path.join(output_dir, FAILED_EPISODES_FILE)
+    if not failed_episodes:
+        if os.path.exists(failed_path):
+            os.remove(failed_path)
+        return None
+
+    with open(failed_path + ".tmp", 'w') as failed_file:
+        for failed_episode in failed_episodes:
+            failed_file.write(json.dumps(failed_episode) + '\n')
+    os.replace(failed_path + ".tmp", failed_path)
+    return failed_path
+
+
+def merge_partial_episodes(output_dir: str, part_indices: Optional[List[int]] = None,
+                           chunks_size: int = 1000, remove_partials: bool = True) -> Dict[str, Any]:
+    """
+    Stream the partial episodes files into meta/episodes.jsonl.
+
+    Episodes are copied line by line, so memory use does not grow with the dataset size.
+    Parts are merged in order, which is episode index order, and the episodes are grouped
+    into chunks of chunks_size consecutive episode indices.
+
+    Args:
+        output_dir (str): Dataset root directory
+        part_indices (List[int], optional): Parts to merge, defaults to every partial file on disk
+        chunks_size (int): Number of episodes per chunk
+        remove_partials (bool): Delete the partial files once episodes.jsonl is written
+
+    Returns:
+        Dict[str, Any]: Episode and frame totals plus a summary of every chunk
+    """
+    if part_indices is None:
+        partial_paths = sorted(glob.glob(os.path.join(output_dir, PARTIAL_EPISODES_DIR, "part-*.jsonl")))
+    else:
+        partial_paths = [get_partial_episodes_path(output_dir, index) for index in sorted(part_indices)]
+
+    episodes_path = os.path.join(output_dir, "meta", "episodes.jsonl")
+    tmp_path = episodes_path + ".tmp"
+    total_episodes = 0
+    total_frames = 0
+    chunks_info = {}
+
+    with open(tmp_path, 'w') as episodes_file:
+        for partial_path in partial_paths:
+            if not os.path.exists(partial_path):
+                continue
+
+            with open(partial_path, 'r') as partial_file:
+                for line in partial_file:
+                    if not line.strip():
+                        continue
+                    episode = json.loads(line)
+                    episodes_file.write(line if line.endswith('\n') else line + '\n')
+
+                    chunk_index = episode["episode_index"] // chunks_size
+                    if chunk_index not in chunks_info:
+                        chunks_info[chunk_index] = {
+                            "chunk_index": chunk_index,
+                            "chunk_name": f"chunk-{chunk_index:03d}",
+                            "task_names": [],
+                            "episodes_count": 0,
+                            "total_frames": 0,
+                            "global_episode_start": episode["episode_index"],
+                            "global_episode_end": episode["episode_index"],
+                        }
+                    chunk_info = chunks_info[chunk_index]
+                    chunk_info["episodes_count"] += 1
+                    chunk_info["total_frames"] += episode["length"]
+                    chunk_info["global_episode_end"] = episode["episode_index"]
+                    if episode["tasks"][0] not in chunk_info["task_names"]:
+                        chunk_info["task_names"].append(episode["tasks"][0])
+
+                    total_episodes += 1
+                    total_frames += episode["length"]
+
+    os.replace(tmp_path, episodes_path)
+
+    if remove_partials:
+        for partial_path in partial_paths:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        partial_dir = os.path.join(output_dir, PARTIAL_EPISODES_DIR)
+        if os.path.isdir(partial_dir) and not os.listdir(partial_dir):
+            os.rmdir(partial_dir)
+
     return {
-        "observation.state": {
-            "mean": [0.0] * 7,
-            "std": [1.0] * 7,
-            "min": [-1.0] * 7,
-            "max": [1.0] * 7
-        },
-        "action": {
-            "mean": [0.0] * 7,
-            "std": [1.0] * 7,
-            "min": [-1.0] * 7,
-            "max": [1.0] * 7
-        }
-    } 
\ No newline at end of file
+        "episodes_path": episodes_path,
+        "total_episodes": total_episodes,
+        "total_frames": total_frames,
+        "chunks_info": [chunks_info[chunk_index] for chunk_index in sorted(chunks_info)],
+    }
@@ -0,0 +1,130 @@
+import os
+import glob
+import inspect
+import functools
+from typing import TYPE_CHECKING, Dict, Any, FrozenSet, Optional
+from .blob_store import remove_existing_file
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# Columns with a bloom filter, so readers can skip files that do not hold an episode or task
+BLOOM_FILTER_COLUMNS = ("episode_index", "task_index")
+
+# Distinct values the bloom filters are sized for; an episode file holds one of each
+BLOOM_FILTER_NDV = 16
+BLOOM_FILTER_FPP = 0.01
+
+# Summary of the row group statistics of every episode file, with paths relative to meta/
+SUMMARY_METADATA_FILE = os.path.join("meta", "_metadata")
+
+
+@functools.lru_cache(maxsize=None)
+def get_parquet_writer_options() -> FrozenSet[str]:
+    """Keyword arguments the installed pyarrow's parquet writer accepts."""
+    import pyarrow.parquet as pq
+
+    return frozenset(inspect.signature(pq.ParquetWriter.__init__).parameters)
+
+
+def supports_bloom_filters() -> bool:
+    """Check whether the installed pyarrow can write parquet bloom filters."""
+    return "bloom_filter_options" in get_parquet_writer_options()
+
+
+def supports_page_index() -> bool:
+    """Check whether the installed pyarrow can write the parquet page index (pyarrow 13+)."""
+    return "write_page_index" in get_parquet_writer_options()
+
+
+def supports_sorting_columns() -> bool:
+    """Check whether the installed pyarrow can declare sorting columns (pyarrow 13+)."""
+    import pyarrow.parquet as pq
+
+    return "sorting_columns" in get_parquet_writer_options() and hasattr(pq, "SortingColumn")
+
+
+def get_parquet_write_options(table: 'pa.Table', compression: Optional[str] = "snappy") -> Dict[str, Any]:
+    """
+    Keyword arguments of pq.write_table for an episode table.
+
+    Column statistics are written for every column. The page index, the declaration that
+    the frames are sorted by "index" and the episode_index/task_index bloom filters are
+    added when the installed pyarrow supports them.
+    """
+    import pyarrow.parquet as pq
+
+    options = {
+        "compression": None if compression == "none" else compression,
+        "write_statistics": True,
+    }
+    if supports_page_index():
+        options["write_page_index"] = True
+    if "index" in table.column_names and supports_sorting_columns():
+        options["sorting_columns"] = [pq.SortingColumn(table.schema.get_field_index("index"))]
+    if supports_bloom_filters():
+        options["bloom_filter_options"] = {column: {"ndv": BLOOM_FILTER_NDV, "fpp": BLOOM_FILTER_FPP}
+                                           for column in BLOOM_FILTER_COLUMNS if column in table.column_names}
+    return options
+
+
+def with_episode_metadata(table: 'pa.Table', episode_metadata: Dict[str, Any]) -> 'pa.Table':
+    """Add (or update) key-value metadata of the file, e.g. task name, length and source demo."""
+    metadata = dict(table.schema.metadata or {})
+    metadata.update({str(key).encode(): str(value).encode() for key, value in episode_metadata.items()})
+    return table.replace_schema_metadata(metadata)
+
+
+def write_episode_table(table: 'pa.Table', where: Any, compression: Optional[str] = "snappy") -> None:
+    """
+    Write an episode table (to a path or buffer) with statistics, page index and bloom filters.
+
+    An existing file at the path is replaced, never written into (see remove_existing_file).
+    """
+    import pyarrow.parquet as pq
+
+    if isinstance(where, str):
+        remove_existing_file(where)
+    pq.write_table(table, where, **get_parquet_write_options(table, compression))
+
+
+def write_parquet_summary(output_dir: str) -> Optional[str]:
+    """
+    Write meta/_metadata with the footers of all episode files.
+
+    Only the footers are read. Engines that understand the summary file (e.g.
+    pyarrow.dataset.parquet_dataset) can prune episodes by their column statistics, e.g. all
+    frames of one task, from this single file instead of opening every episode file.
+
+    Returns:
+        str: Path of the summary file, None when there are no episode files
+    """
+    import pyarrow.parquet as pq
+
+    summary_path = os.path.join(output_dir, SUMMARY_METADATA_FILE)
+    parquet_paths = sorted(glob.glob(os.path.join(output_dir, "data", "chunk-*", "episode_*.parquet")))
+    if not parquet_paths:
+        return None
+
+    collector = []
+    schema = None
+    for parquet_path in parquet_paths:
+        parquet_file = pq.ParquetFile(parquet_path)
+        metadata = parquet_file.metadata
+        metadata.set_file_path(os.path.relpath(parquet_path, os.path.dirname(summary_path)).replace(os.sep, "/"))
+        collector.append(metadata)
+        if schema is None:
+            # The per-episode key-value metadata does not describe the whole dataset
+            schema = parquet_file.schema_arrow.remove_metadata()
+
+    os.makedirs(os.path.dirname(summary_path), exist_ok=True)
+    try:
+        pq.write_metadata(schema, summary_path + ".tmp", metadata_collector=collector)
+    except (RuntimeError, ValueError) as e:
+        # Row groups can only be summarized for files with one schema
+        print(f"⚠️ Skipping {SUMMARY_METADATA_FILE}: {e}")
+        if os.path.exists(summary_path + ".tmp"):
+            os.remove(summary_path + ".tmp")
+        return None
+    os.replace(summary_path + ".tmp", summary_path)
+    return summary_path
@@ -0,0 +1,138 @@
+import io
+import os
+import json
+import html
+import numpy as np
+from typing import Dict, List, Any, Optional
+from .blob_store import remove_existing_file
+from .image_processing import is_depth_stream, resize_frames
+from config import FPS
+
+# Directory of the preview images under the output root
+PREVIEWS_DIR = "previews"
+
+
+def get_preview_paths(output_dir: str, episode_index: int) -> Dict[str, str]:
+    """Paths of the mosaic and GIF preview of an episode."""
+    stem = os.path.join(output_dir, PREVIEWS_DIR, f"episode_{episode_index:06d}")
+    return {"mosaic": stem + ".jpg", "gif": stem + ".gif"}
+
+
+def get_strided_indices(num_frames: int, num_samples: int) -> np.ndarray:
+    """num_samples frame indices spread evenly from the first to the last frame."""
+    return np.unique(np.linspace(0, num_frames - 1, min(num_samples, num_frames)).round().astype(np.int64))
+
+
+def select_preview_frames(camera_frames: Dict[str, np.ndarray], indices: np.ndarray, tile_size: int) -> np.ndarray:
+    """Stack the selected frames of every RGB stream as (cameras, frames, tile_size, tile_size, 3)."""
+    return np.stack([resize_frames(frames[indices], tile_size, tile_size)
+                     for camera_key, frames in camera_frames.items() if not is_depth_stream(camera_key)])
+
+
+def build_mosaic(tiles: np.ndarray) -> np.ndarray:
+    """Tile (cameras, frames, H, W, C) into one (cameras * H, frames * W, C) image, one row per camera."""
+    num_cameras, num_frames, height, width, channels = tiles.shape
+    return tiles.transpose(0, 2, 1, 3, 4).reshape(num_cameras * height, num_frames * width, channels)
+
+
+def build_gif_frames(tiles: np.ndarray) -> np.ndarray:
+    """Place the cameras side by side in every frame: (frames, H, cameras * W, C)."""
+    num_cameras, num_frames, height, width, channels = tiles.shape
+    return tiles.transpose(1, 2, 0, 3, 4).reshape(num_frames, height, num_cameras * width, channels)
+
+
+def encode_mosaic(mosaic: np.ndarray, quality: int = 80) -> bytes:
+    """Encode a mosaic as JPEG bytes."""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.fromarray(mosaic).save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def encode_gif(frames: np.ndarray, fps: float) -> bytes:
+    """Encode a (frames, H, W, 3) stack as a looping GIF."""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    images = [Image.fromarray(frame) for frame in frames]
+    images[0].save(buffer, format="GIF", save_all=True, append_images=images[1:],
+                   duration=int(1000 / fps), loop=0)
+    return buffer.getvalue()
+
+
+def build_episode_previews(camera_frames: Dict[str, np.ndarray], config: Dict[str, Any]) -> Dict[str, bytes]:
+    """
+    Encode the previews of an episode from its in-memory frames.
+
+    The mosaic holds config["preview_frames"] evenly strided frames of every RGB stream, one
+    row per camera; with config["preview_gif"] a GIF plays the episode at
+    config["preview_gif_fps"] frames per second. Only the sampled frames are resized.
+
+    Returns:
+        Dict[str, bytes]: "mosaic" and optionally "gif" bytes, empty without RGB frames
+    """
+    rgb_frames = {camera_key: frames for camera_key, frames in camera_frames.items() if not is_depth_stream(camera_key)}
+    num_frames = len(next(iter(rgb_frames.values()))) if rgb_frames else 0
+    if num_frames == 0:
+        return {}
+
+    tile_size = config["preview_tile_size"]
+    previews = {
+        "mosaic": encode_mosaic(build_mosaic(select_preview_frames(
+            rgb_frames, get_strided_indices(num_frames, config["preview_frames"]), tile_size))),
+    }
+    if config["preview_gif"]:
+        stride = max(1, int(round(FPS / config["preview_gif_fps"])))
+        tiles = select_preview_frames(rgb_frames, np.arange(0, num_frames, stride), tile_size)
+        previews["gif"] = encode_gif(build_gif_frames(tiles), FPS / stride)
+    return previews
+
+
+def write_episode_previews(output_dir: str, episode_index: int, previews: Dict[str, bytes], writer=None) -> None:
+    """Write the encoded previews of an episode, through the writer when one is given."""
+    paths = get_preview_paths(output_dir, episode_index)
+    os.makedirs(os.path.join(output_dir, PREVIEWS_DIR), exist_ok=True)
+    for name, data in previews.items():
+        if writer is not None:
+            writer.write_bytes(paths[name], data)
+        else:
+            remove_existing_file(paths[name])
+            with open(paths[name], 'wb') as f:
+                f.write(data)
+
+
+def write_preview_index(output_dir: str) -> Optional[str]:
+    """
+    Write previews/index.html with the previews of every episode in meta/episodes.jsonl.
+
+    Returns:
+        str: Path of the index, None when the dataset has no previews
+    """
+    previews_dir = os.path.join(output_dir, PREVIEWS_DIR)
+    episodes_path = os.path.join(output_dir, "meta", "episodes.jsonl")
+    if not os.path.isdir(previews_dir) or not os.path.exists(episodes_path):
+        return None
+
+    rows: List[str] = []
+    with open(episodes_path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            episode = json.loads(line)
+            paths = get_preview_paths(output_dir, episode["episode_index"])
+            if not os.path.exists(paths["mosaic"]):
+                continue
+            name = f"episode_{episode['episode_index']:06d}"
+            gif = f' <a href="{name}.gif">gif</a>' if os.path.exists(paths["gif"]) else ""
+            success = f", success at {episode['success_index']}" if episode.get("success_index") is not None else ""
+            rows.append(f'<figure><img src="{name}.jpg" loading="lazy"><figcaption>{name}: '
+                        f'{html.escape(episode["tasks"][0])}, {episode["length"]} frames{success}{gif}</figcaption></figure>')
+
+    index_path = os.path.join(previews_dir, "index.html")
+    with open(index_path, 'w') as f:
+        f.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Episode previews</title>'
+                '<style>figure{display:inline-block;margin:8px}img{display:block}</style></head><body>\n')
+        f.write("\n".join(rows))
+        f.write("\n</body></html>\n")
+    return index_path
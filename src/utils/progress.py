@@ -0,0 +1,130 @@
+import time
+import threading
+import multiprocessing
+from typing import Dict
+
+# Pipeline stages with their own frame and byte counters. "read" counts the uncompressed bytes
+# read from HDF5 for converted episodes, the output stages count bytes written, "episodes"
+# counts finished frames (relinked episodes included) and "skipped" the frames of quarantined
+# demos, which are taken off the total.
+STAGES = ("read", "parquet", "images", "videos", "episodes", "skipped")
+
+# Stages whose rates are shown next to the bar
+RATE_STAGES = ("read", "parquet", "images", "videos")
+
+# Counters of the current process, shared with the main process when running in a worker
+_counters = None
+
+
+def create_progress_counters():
+    """Create frame and byte counters for every stage, shareable with worker processes."""
+    return multiprocessing.Array('d', 2 * len(STAGES))
+
+
+def set_progress_counters(counters) -> None:
+    """Make this process report into the given counters (use as a process pool initializer)."""
+    global _counters
+    _counters = counters
+
+
+def get_progress_counters():
+    """Get the counters this process reports into, to hand them on to its own worker processes."""
+    return _counters
+
+
+def record_progress(stage: str, frames: int = 0, num_bytes: int = 0) -> None:
+    """Add processed frames and bytes to a stage, a no-op when no counters are set."""
+    if _counters is None:
+        return
+    offset = 2 * STAGES.index(stage)
+    with _counters.get_lock():
+        _counters[offset] += frames
+        _counters[offset + 1] += num_bytes
+
+
+def read_progress(counters) -> Dict[str, Dict[str, float]]:
+    """Take a snapshot of the counters."""
+    with counters.get_lock():
+        values = list(counters)
+    return {
+        stage: {"frames": values[2 * i], "bytes": values[2 * i + 1]}
+        for i, stage in enumerate(STAGES)
+    }
+
+
+class ProgressMonitor:
+    """
+    Progress bar in frames, fed by the shared stage counters.
+
+    A background thread polls the counters, advances the bar by finished frames and shows
+    the live frames/s and MB/s of each stage, so the ETA reflects actual work rather than
+    the number of files.
+    """
+
+    def __init__(self, total_frames: int, total_bytes: int = 0, desc: str = "Converting frames",
+                 interval: float = 0.5, counters=None, disable: bool = False):
+        self.total_frames = total_frames
+        self.total_bytes = total_bytes
+        self.desc = desc
+        self.interval = interval
+        self.disable = disable
+        self.counters = counters if counters is not None else create_progress_counters()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pbar = None
+        self._rates = {}
+
+    def __enter__(self) -> "ProgressMonitor":
+        from tqdm import tqdm
+
+        set_progress_counters(self.counters)
+        self._pbar = tqdm(total=self.total_frames, desc=self.desc, unit="frame",
+                          unit_scale=True, position=0, leave=True, disable=self.disable)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._update(read_progress(self.counters))
+        self._pbar.close()
+        set_progress_counters(None)
+
+    def _run(self) -> None:
+        previous = read_progress(self.counters)
+        last_time = time.monotonic()
+
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            current = read_progress(self.counters)
+            elapsed = max(now - last_time, 1e-6)
+
+            for stage in STAGES:
+                frame_rate = (current[stage]["frames"] - previous[stage]["frames"]) / elapsed
+                byte_rate = (current[stage]["bytes"] - previous[stage]["bytes"]) / elapsed
+                old_frame_rate, old_byte_rate = self._rates.get(stage, (frame_rate, byte_rate))
+                # Smooth the instantaneous rates so a single slow episode does not jump the display
+                self._rates[stage] = (0.3 * frame_rate + 0.7 * old_frame_rate, 0.3 * byte_rate + 0.7 * old_byte_rate)
+
+            self._update(current)
+            previous, last_time = current, now
+
+    def _update(self, current: Dict[str, Dict[str, float]]) -> None:
+        total = self.total_frames - int(current["skipped"]["frames"])
+        if total != self._pbar.total:
+            self._pbar.total = total
+        finished = int(current["episodes"]["frames"])
+        if finished > self._pbar.n:
+            self._pbar.update(finished - self._pbar.n)
+
+        parts = []
+        for stage in RATE_STAGES:
+            if stage in self._rates and current[stage]["frames"] > 0:
+                frame_rate, byte_rate = self._rates[stage]
+                parts.append(f"{stage} {frame_rate:.0f}fps {byte_rate / 1e6:.1f}MB/s")
+        if self.total_bytes:
+            parts.append(f"{current['read']['bytes'] / 1e6:.0f}/{self.total_bytes / 1e6:.0f}MB read")
+        if parts:
+            self._pbar.set_postfix_str(" | ".join(parts), refresh=False)
+        self._pbar.refresh()
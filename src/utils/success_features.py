@@ -0,0 +1,98 @@
+import numpy as np
+from typing import Dict, Any, Optional
+
+# Most frames whose discounted returns are computed in one cumulative sum
+RETURN_BLOCK_FRAMES = 256
+
+# Smallest discount power within a block, far above float64 underflow; small discounts get shorter blocks
+MIN_RETURN_POWER = 1e-150
+
+
+def parse_discount(value: str) -> float:
+    """Parse a return discount, which must be between 0 and 1."""
+    discount = float(value)
+    if not 0 <= discount <= 1:
+        raise ValueError(f"The return discount must be between 0 and 1, got {value}")
+    return discount
+
+
+def get_return_block_frames(discount: float) -> int:
+    """Frames per cumulative sum of get_discounted_returns, so discount powers stay above MIN_RETURN_POWER."""
+    if discount >= 1:
+        return RETURN_BLOCK_FRAMES
+    return max(1, min(RETURN_BLOCK_FRAMES, int(np.log(MIN_RETURN_POWER) / np.log(discount)) + 1))
+
+
+def get_success_mask(rewards: np.ndarray, dones: np.ndarray) -> np.ndarray:
+    """Frames at which the task is solved: LIBERO marks success with a positive sparse reward or a done flag."""
+    return (np.asarray(rewards).reshape(-1) > 0) | np.asarray(dones).reshape(-1).astype(bool)
+
+
+def get_first_success_index(success: np.ndarray) -> Optional[int]:
+    """Index of the first successful frame, None if the episode never succeeds."""
+    if not success.any():
+        return None
+    return int(np.argmax(success))
+
+
+def get_steps_to_success(num_frames: int, first_success_index: Optional[int]) -> np.ndarray:
+    """Frames until the first success, 0 from the success on and -1 everywhere if it never succeeds."""
+    if first_success_index is None:
+        return np.full(num_frames, -1, dtype=np.int64)
+    return np.maximum(first_success_index - np.arange(num_frames, dtype=np.int64), 0)
+
+
+def get_discounted_returns(rewards: np.ndarray, discount: float) -> np.ndarray:
+    """
+    Discounted return sum_k discount**k * rewards[t + k] of every frame.
+
+    Each block of frames (see get_return_block_frames) is one reversed cumulative sum of the
+    rewards weighted by the discount powers; the return at the block end is carried over to
+    the previous block, so the powers never underflow, on long episodes or small discounts.
+    """
+    if not 0 <= discount <= 1:
+        raise ValueError(f"The return discount must be between 0 and 1, got {discount}")
+    rewards = np.asarray(rewards, dtype=np.float64).reshape(-1)
+    if discount == 0:
+        return rewards.copy()
+
+    block_frames = get_return_block_frames(discount)
+    returns = np.empty_like(rewards)
+    carry = 0.0
+    for end in range(len(rewards), 0, -block_frames):
+        start = max(0, end - block_frames)
+        powers = discount ** np.arange(end - start, dtype=np.float64)
+        block = np.cumsum((rewards[start:end] * powers)[::-1])[::-1] / powers
+        returns[start:end] = block + carry * discount * powers[::-1]
+        carry = returns[start]
+    return returns
+
+
+def compute_success_features(rewards: np.ndarray, dones: np.ndarray, discount: float) -> Dict[str, Any]:
+    """
+    Success columns of an episode from its whole reward and done arrays.
+
+    Returns:
+        Dict[str, Any]: "columns" (column name -> per-frame array: next.success, from the first
+            success on, steps_to_success and discounted_return) and the episode's "success_index"
+    """
+    success = get_success_mask(rewards, dones)
+    first_success_index = get_first_success_index(success)
+    num_frames = len(success)
+    return {
+        "columns": {
+            "next.success": np.arange(num_frames) >= (num_frames if first_success_index is None else first_success_index),
+            "steps_to_success": get_steps_to_success(num_frames, first_success_index),
+            "discounted_return": get_discounted_returns(rewards, discount),
+        },
+        "success_index": first_success_index,
+    }
+
+
+def get_success_features_info(discount: float) -> Dict[str, Dict[str, Any]]:
+    """info.json feature entries of the success columns."""
+    return {
+        "next.success": {"dtype": "bool", "shape": [1]},
+        "steps_to_success": {"dtype": "int64", "shape": [1]},
+        "discounted_return": {"dtype": "float64", "shape": [1], "discount": discount},
+    }
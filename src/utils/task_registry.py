@@ -0,0 +1,114 @@
+import os
+import json
+from typing import Dict, List, Any, Optional
+
+# Task appended to every episode's task list, indexed after the real tasks
+VALID_TASK = "valid"
+
+
+def extract_task_name_from_filename(filename: str) -> str:
+    """Extract task name from HDF5 filename."""
+    # Remove path and extension
+    basename = os.path.basename(filename)
+    task_name = basename.replace("_demo.hdf5", "")
+    return task_name
+
+
+def parse_json_attribute(value: Any) -> Dict[str, Any]:
+    """Parse a JSON string HDF5 attribute, returning an empty dict if it is missing or malformed."""
+    if value is None:
+        return {}
+    if isinstance(value, bytes):
+        value = value.decode("utf-8")
+    try:
+        parsed = json.loads(value)
+    except (TypeError, ValueError):
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def extract_task_info(hdf5_path: str, data_attrs: Any) -> Dict[str, Any]:
+    """Build the task description of a file from its name and the `data` group attributes."""
+    problem_info = parse_json_attribute(data_attrs.get("problem_info"))
+    env_args = parse_json_attribute(data_attrs.get("env_args"))
+
+    task_info = {"task": extract_task_name_from_filename(hdf5_path)}
+    if problem_info.get("language_instruction"):
+        task_info["language_instruction"] = problem_info["language_instruction"]
+    if problem_info.get("problem_name"):
+        task_info["problem_name"] = problem_info["problem_name"]
+    if env_args.get("env_name"):
+        task_info["env_name"] = env_args["env_name"]
+    return task_info
+
+
+def read_task_info(hdf5_path: str) -> Dict[str, Any]:
+    """Read the task description of an HDF5 file from its attributes only, without loading any datasets."""
+    import h5py
+
+    with h5py.File(hdf5_path, 'r') as f:
+        data_attrs = f['data'].attrs if 'data' in f else {}
+        return extract_task_info(hdf5_path, data_attrs)
+
+
+def load_task_registry(output_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Load the task registry persisted in meta/tasks.jsonl, or an empty registry if there is none."""
+    tasks_path = os.path.join(output_dir, "meta", "tasks.jsonl")
+    task_registry = {}
+
+    if not os.path.exists(tasks_path):
+        return task_registry
+
+    with open(tasks_path, 'r') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                task_registry[entry["task"]] = entry
+
+    return dict(sorted(task_registry.items(), key=lambda item: item[1]["task_index"]))
+
+
+def build_task_registry(task_infos: List[Dict[str, Any]],
+                        existing_registry: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Build the task registry mapping task names to their tasks.jsonl entries.
+
+    Tasks already in the existing registry keep their index so incremental runs and shards
+    stay consistent. New tasks are appended in sorted order, followed by the "valid" task.
+
+    Args:
+        task_infos (List[Dict[str, Any]]): Task descriptions, see read_task_info
+        existing_registry (Dict[str, Dict[str, Any]], optional): Registry loaded from a previous run
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Task name -> {"task_index", "task", ...} ordered by task index
+    """
+    task_registry = dict(existing_registry or {})
+    next_index = max((entry["task_index"] for entry in task_registry.values()), default=-1) + 1
+
+    infos_by_task = {info["task"]: info for info in task_infos}
+    new_tasks = sorted(task for task in infos_by_task if task not in task_registry and task != VALID_TASK)
+    if VALID_TASK not in task_registry:
+        new_tasks.append(VALID_TASK)
+
+    for task in new_tasks:
+        entry = {"task_index": next_index}
+        entry.update(infos_by_task.get(task, {"task": task}))
+        task_registry[task] = entry
+        next_index += 1
+
+    return task_registry
+
+
+def write_tasks_jsonl(output_dir: str, task_registry: Dict[str, Dict[str, Any]]) -> str:
+    """Write the task registry to meta/tasks.jsonl, replacing the file atomically."""
+    tasks_path = os.path.join(output_dir, "meta", "tasks.jsonl")
+    os.makedirs(os.path.dirname(tasks_path), exist_ok=True)
+
+    tmp_path = tasks_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        for entry in sorted(task_registry.values(), key=lambda entry: entry["task_index"]):
+            f.write(json.dumps(entry) + '\n')
+    os.replace(tmp_path, tasks_path)
+
+    return tasks_path
@@ -0,0 +1,87 @@
+import os
+import shutil
+from typing import Dict, List, Any, Optional
+from config import IMAGE_HEIGHT, IMAGE_WIDTH, IMAGE_CHANNELS, VIDEO_CODEC, VIDEO_CRF
+
+# Codec names reported in info.json for the OpenCV fourcc codes we write with
+FOURCC_TO_CODEC_NAME = {
+    "mp4v": "mpeg4",
+    "avc1": "h264",
+    "h264": "h264",
+    "hvc1": "hevc",
+    "FFV1": "ffv1",
+    "MJPG": "mjpeg",
+}
+
+
+def create_variant(output_dir: str, name: Optional[str] = None, image_height: int = IMAGE_HEIGHT,
+                   image_width: int = IMAGE_WIDTH, video_codec: str = VIDEO_CODEC,
+                   video_crf: Optional[int] = VIDEO_CRF, save_images: bool = True,
+                   save_videos: bool = True) -> Dict[str, Any]:
+    """Create an output variant describing where and how a converted demo is written."""
+    return {
+        "name": name or os.path.basename(os.path.normpath(output_dir)),
+        "output_dir": output_dir,
+        "image_height": image_height,
+        "image_width": image_width,
+        "video_codec": video_codec,
+        "video_crf": video_crf,
+        "save_images": save_images,
+        "save_videos": save_videos,
+    }
+
+
+def normalize_variants(output_dir: str, variants: Optional[List[Dict[str, Any]]] = None,
+                       config: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Fill in defaults for every output variant.
+
+    Args:
+        output_dir (str): Output directory used when a variant does not set one
+        variants (List[Dict[str, Any]], optional): Partial variant dicts, see OUTPUT_VARIANTS in config.py
+        config (Dict[str, Any], optional): Runtime configuration providing the default codec and CRF;
+            its enable_image_saving/enable_video_creation switches turn those stages off in every variant
+
+    Returns:
+        List[Dict[str, Any]]: Complete variants, a single default variant if none were given
+    """
+    defaults = {}
+    if config is not None:
+        defaults = {"video_codec": config["video_codec"], "video_crf": config["video_crf"]}
+
+    normalized = []
+    for variant in variants or [{"output_dir": output_dir}]:
+        options = dict(defaults, **variant)
+        if not options.get("output_dir") and not options.get("name"):
+            raise ValueError("Each output variant needs a name or an output_dir")
+        variant_output_dir = options.pop("output_dir", None) or os.path.join(output_dir, options["name"])
+        normalized.append(create_variant(variant_output_dir, **options))
+
+    if config is not None:
+        for variant in normalized:
+            variant["save_images"] = variant["save_images"] and config["enable_image_saving"]
+            variant["save_videos"] = variant["save_videos"] and config["enable_video_creation"]
+
+    output_dirs = [os.path.abspath(variant["output_dir"]) for variant in normalized]
+    if len(set(output_dirs)) != len(output_dirs):
+        raise ValueError("Output variants must write to distinct output directories")
+
+    if any(variant["save_videos"] and variant["video_crf"] is not None for variant in normalized) \
+            and shutil.which("ffmpeg") is None:
+        raise RuntimeError("video_crf requires the ffmpeg executable on PATH")
+
+    return normalized
+
+
+def get_variant_video_info(variant: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the video settings of a variant as they are reported in info.json."""
+    if variant["video_crf"] is not None:
+        codec_name = "h264"
+    else:
+        codec_name = FOURCC_TO_CODEC_NAME.get(variant["video_codec"], variant["video_codec"])
+
+    return {
+        "shape": [variant["image_height"], variant["image_width"], IMAGE_CHANNELS],
+        "codec": codec_name,
+        "crf": variant["video_crf"],
+    }